@@ -6,6 +6,9 @@ class Settings(BaseSettings):
     # Supabase
     supabase_url: str
     supabase_key: str
+    supabase_read_url: Optional[str] = None  # Read replica API URL; unset sends every read to the primary
+    supabase_read_key: Optional[str] = None  # Defaults to supabase_key
+    read_your_writes_window: float = 10.0  # Seconds after a client's write during which its reads use the primary
     
     # Email
     email_host: Optional[str] = "smtp.gmail.com"
@@ -13,6 +16,75 @@ class Settings(BaseSettings):
     email_username: Optional[str] = None
     email_password: str  # This is the SendGrid API key
     email_from: str
+
+    # Mail transport
+    email_transport: str = "sendgrid"  # 'sendgrid' (HTTP API) or 'smtp' (email_host / email_port)
+    email_fallback_transport: Optional[str] = None  # Used while the primary fails; the other of the two
+    email_failover_threshold: int = 3  # Consecutive failures before mail goes straight to the fallback
+    email_failover_reset: float = 60.0  # Seconds before the primary is tried again
+    smtp_password: Optional[str] = None  # Defaults to email_password (SendGrid's SMTP relay: username 'apikey')
+    smtp_use_tls: bool = False  # Implicit TLS (port 465); STARTTLS is used whenever the server offers it
+    smtp_pool_size: int = 4  # Persistent connections per worker
+    smtp_max_messages_per_connection: int = 100  # Reconnect after this many messages
+    smtp_idle_timeout: float = 60.0  # Seconds; idle connections older than this are reopened
+    smtp_timeout: float = 30.0
+    
+    # CSV import email validation
+    email_validation_offline: bool = False  # Syntax-only, no DNS (air-gapped runs)
+    email_dns_timeout: float = 5.0
+    email_dns_workers: int = 16
+    email_domain_cache_ttl: int = 3600
+    
+    # Check-in
+    scan_dedupe_window: float = 2.0  # Seconds a repeat QR scan reuses the first outcome
+    
+    # Registration waiting room
+    registration_concurrency: int = 8
+    registration_queue_limit: int = 500
+    registration_queue_timeout: float = 30.0
+    registration_rate_limit_ip: int = 20  # Attempts per minute
+    registration_rate_limit_email: int = 3  # Attempts per minute
+    
+    # Idempotency keys
+    idempotency_backend: str = "memory"  # 'memory' or 'database'
+    idempotency_ttl: int = 86400
+    
+    # Responses
+    compression_min_size: int = 1024  # Bytes; smaller responses are sent as-is
+    static_watch: bool = False  # Reload changed static files (development only; stats files on requests)
+    
+    # Archival
+    archive_uri: str = "archive"  # Local directory or fsspec URL (e.g. s3://bucket/archive)
+    archive_retention_days: int = 90
+    
+    # Degraded mode (database circuit breaker + local check-in journal)
+    db_breaker_failure_threshold: int = 5  # Consecutive backend failures before the circuit opens
+    db_breaker_reset_timeout: float = 15.0  # Seconds before a probe request is let through
+    checkin_journal_path: str = "checkin_journal.db"  # SQLite file
+    checkin_journal_replay_interval: float = 5.0
+    checkin_roster_refresh_interval: float = 300.0
+    
+    # Campaigns
+    campaign_rate_limit: float = 10.0  # Emails per second per campaign
+    campaign_batch_size: int = 100  # Recipients per SendGrid request (max 1000)
+    campaign_lease_timeout: float = 120.0  # Seconds without a heartbeat before start() may take over a sending campaign
+    
+    # SendGrid event webhook
+    sendgrid_webhook_public_key: Optional[str] = None  # Base64 verification key from the SendGrid settings page
+    sendgrid_webhook_max_age: int = 600  # Seconds; older signed timestamps are rejected
+    email_events_flush_size: int = 1000  # Buffered events that trigger a bulk insert
+    email_events_flush_interval: float = 2.0  # Seconds between time-triggered flushes
+    email_events_max_buffer: int = 100000  # Webhook answers 503 above this, SendGrid retries
+    
+    # Printed tickets
+    ticket_cache_dir: str = "ticket_cache"  # Rendered badges, shared by workers
+    ticket_render_workers: int = 2  # Render processes
+    ticket_dpi: int = 300
+    
+    # Request profiling (disabled unless a token is set)
+    profiling_token: Optional[str] = None  # Required as X-Profile-Token by the X-Profile header and /debug endpoints
+    profiling_buffer_size: int = 20  # Profiles kept per worker
+    profiling_sample_interval: float = 0.001  # Seconds between stack samples in 'sample' mode
     
     # App
     app_name: str = "Event Ticketing System"
@@ -20,6 +92,12 @@ class Settings(BaseSettings):
     debug: bool = True
     secret_key: str
     
+    # Serving
+    workers: int = 1
+    database_url: Optional[str] = None  # Direct Postgres DSN (LISTEN/NOTIFY)
+    invalidation_backend: str = "local"  # 'local', 'unix' or 'postgres'
+    invalidation_socket_dir: str = "/tmp/ticketing-invalidation"
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
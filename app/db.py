@@ -1,10 +1,105 @@
-from supabase import create_client, Client
+"""
+Supabase clients: the primary, and an optional read replica
+
+Everything goes to the primary unless the caller explicitly tolerates
+stale data and uses read(). Stale-tolerant reads (dashboards: check-in
+stats, recent check-ins, registration and participant lists) go to the
+replica at settings.supabase_read_url when one is configured, except:
+
+- Read-your-writes: for settings.read_your_writes_window seconds after a
+  client's own write, that client reads the primary, so a just-checked-in
+  attendee never shows up as not checked in on the scanning desk. Writes
+  are marked per client (a cookie / X-Last-Write header, see
+  app/middleware/read_your_writes.py) and checked by allow_stale_reads,
+  so other dashboards keep using the replica. The window should exceed
+  the replica's usual lag.
+- Replica outages: backend failures open a circuit breaker and reads fall
+  back to the primary until the replica answers again.
+"""
+import time
+from typing import Callable, Dict, Optional, TypeVar, TYPE_CHECKING
 from app.config import settings
 
-# Initialize Supabase client
-supabase: Client = create_client(settings.supabase_url, settings.supabase_key)
+if TYPE_CHECKING:
+    from supabase import Client
+
+T = TypeVar('T')
+
+# Supabase clients, created on first use so importing this module stays cheap
+_client: Optional["Client"] = None
+_read_client: Optional["Client"] = None
+_read_breaker = None
+
+
+def get_supabase() -> "Client":
+    """Get Supabase client instance (created lazily on first call)"""
+    global _client
+    if _client is None:
+        from supabase import create_client
+        _client = create_client(settings.supabase_url, settings.supabase_key)
+    return _client
+
+
+def replica_configured() -> bool:
+    return bool(settings.supabase_read_url)
+
+
+def get_supabase_read() -> "Client":
+    """Get the read-replica client (the primary if no replica is configured)"""
+    global _read_client
+    if not replica_configured():
+        return get_supabase()
+    if _read_client is None:
+        from supabase import create_client
+        _read_client = create_client(settings.supabase_read_url, settings.supabase_read_key or settings.supabase_key)
+    return _read_client
+
+
+def _replica_breaker():
+    global _read_breaker
+    if _read_breaker is None:
+        from app.services.circuit_breaker import CircuitBreaker
+        _read_breaker = CircuitBreaker(name='Read replica')
+    return _read_breaker
+
+
+def recently_written(written_at: Optional[str]) -> bool:
+    """True if a client's last write (epoch seconds, as marked) is inside the read-your-writes window"""
+    try:
+        return time.time() - float(written_at) < settings.read_your_writes_window
+    except (TypeError, ValueError):
+        return False
+
+
+def read(query: Callable[["Client"], T], stale_ok: bool = False) -> T:
+    """
+    Run a read-only query against the replica when allowed, else the primary
+
+    Args:
+        query: Builds and executes the query on the client it is given
+        stale_ok: Caller accepts replica lag (and has not just written, see
+            allow_stale_reads); False always reads the primary
+    """
+    if stale_ok and replica_configured():
+        breaker = _replica_breaker()
+        if breaker.allow():
+            from app.services.circuit_breaker import is_backend_failure
+            try:
+                result = query(get_supabase_read())
+            except Exception as e:
+                if not is_backend_failure(e):
+                    raise
+                breaker.record_failure()
+                print(f"⚠️ Read replica failed, reading from primary: {type(e).__name__}: {str(e)}")
+            else:
+                breaker.record_success()
+                return result
+    return query(get_supabase())
 
 
-def get_supabase() -> Client:
-    """Get Supabase client instance"""
-    return supabase
\ No newline at end of file
+def replica_status() -> Dict:
+    return {
+        'configured': replica_configured(),
+        'breaker': _replica_breaker().status() if replica_configured() else None,
+        'read_your_writes_window': settings.read_your_writes_window
+    }
@@ -0,0 +1,192 @@
+import asyncio
+from typing import Optional
+from fastapi import Cookie, FastAPI, Header, Request
+from app.config import settings
+from app.db import get_supabase, recently_written
+from app.middleware.read_your_writes import LAST_WRITE_COOKIE
+from app.services.csv_service import CSVService
+from app.services.checkin_service import CheckInService
+from app.services.event_mode import EventModeService
+from app.services.coalescing import RequestCoalescer
+from app.services.waiting_room import WaitingRoom
+from app.services.idempotency import IdempotencyService
+from app.services import email_templates
+from app.services.static_assets import AssetPipeline
+from app.services.analytics_service import AnalyticsService
+from app.services.archive_service import ArchiveService
+from app.services.checkin_journal import CheckInJournal
+from app.services.search_index import SearchIndex
+from app.services.campaign_service import CampaignService
+from app.services.email_events import EmailEventService
+from app.services.ticket_renderer import TicketRenderService
+from app.services.invalidation_bus import get_invalidation_bus, EVENT_MODE, EVENTS
+from app.services.registration_service import RegistrationService
+
+
+def init_services(app: FastAPI) -> None:
+    """
+    Create the app-lifetime service singletons and attach them to app.state
+
+    Called once from the lifespan handler in main.py. CheckInService reuses
+    the shared CSVService instead of building its own; it and
+    RegistrationService read archived events through the ArchiveService,
+    and check-ins fall back to the local CheckInJournal while the database
+    is unreachable.
+    Construction does not touch the network; the Supabase client is created
+    on first use.
+    """
+    csv_service = CSVService()
+    event_mode = EventModeService()
+    archive = ArchiveService()
+    app.state.csv_service = csv_service
+    app.state.event_mode = event_mode
+    app.state.archive_service = archive
+    journal = CheckInJournal()
+    app.state.checkin_journal = journal
+    app.state.checkin_service = CheckInService(
+        csv_service=csv_service,
+        event_mode=event_mode,
+        archive=archive,
+        journal=journal
+    )
+    registration_service = RegistrationService(event_mode=event_mode, archive=archive)
+    app.state.registration_service = registration_service
+    app.state.waiting_room = WaitingRoom(registration_service.get_remaining_capacity)
+    app.state.analytics_service = AnalyticsService()
+    app.state.search_index = SearchIndex()
+    app.state.campaign_service = CampaignService()
+    app.state.email_events = EmailEventService()
+    app.state.ticket_renderer = TicketRenderService()
+    app.state.coalescer = RequestCoalescer()
+    app.state.idempotency = IdempotencyService()
+    email_templates.preload()
+    assets = AssetPipeline(watch=settings.static_watch)
+    assets.load()
+    app.state.assets = assets
+    # Event mode toggles may reset check-in state; don't replay old outcomes
+    bus = get_invalidation_bus()
+    bus.subscribe(EVENT_MODE, lambda key: app.state.coalescer.forget_event(None))
+    # Capacity changes elsewhere (other workers, event edits) reset the cached count
+    bus.subscribe(EVENTS, app.state.waiting_room.invalidate_capacity)
+    app.state.ready = False
+
+
+def warm_up() -> bool:
+    """
+    Create the Supabase client and open its HTTP connection
+
+    Returns:
+        True if the warm-up query succeeded
+    """
+    try:
+        get_supabase().table('events').select('id').limit(1).execute()
+        print("✅ Supabase connection warmed up")
+        return True
+    except Exception as e:
+        print(f"⚠️ Supabase warm-up failed: {type(e).__name__}: {str(e)}")
+        return False
+
+
+async def warm_up_until_ready(app: FastAPI, retry_seconds: float = 5.0) -> None:
+    """
+    Run warm_up() off the event loop, retrying until it succeeds
+
+    Sets app.state.ready once connections are warm; /ready reports it.
+    """
+    while not app.state.ready:
+        app.state.ready = await asyncio.to_thread(warm_up)
+        if not app.state.ready:
+            await asyncio.sleep(retry_seconds)
+
+
+def allow_stale_reads(
+    consistency: Optional[str] = Header(default=None, alias="X-Read-Consistency"),
+    last_write: Optional[str] = Header(default=None, alias="X-Last-Write"),
+    last_write_cookie: Optional[str] = Cookie(default=None, alias=LAST_WRITE_COOKIE)
+) -> bool:
+    """
+    Flag for endpoints that tolerate replica lag
+    
+    Their reads may go to the read replica, except for a client that wrote
+    within settings.read_your_writes_window (its last_write cookie or
+    X-Last-Write header, see app/middleware/read_your_writes.py). A client
+    can always send X-Read-Consistency: strong to read the primary.
+    """
+    if (consistency or '').lower() == 'strong':
+        return False
+    return not recently_written(last_write or last_write_cookie)
+
+
+def get_csv_service(request: Request) -> CSVService:
+    """Shared CSVService instance"""
+    return request.app.state.csv_service
+
+
+def get_checkin_service(request: Request) -> CheckInService:
+    """Shared CheckInService instance"""
+    return request.app.state.checkin_service
+
+
+def get_checkin_journal(request: Request) -> CheckInJournal:
+    """Shared CheckInJournal instance"""
+    return request.app.state.checkin_journal
+
+
+def get_registration_service(request: Request) -> RegistrationService:
+    """Shared RegistrationService instance"""
+    return request.app.state.registration_service
+
+
+def get_analytics_service(request: Request) -> AnalyticsService:
+    """Shared AnalyticsService instance"""
+    return request.app.state.analytics_service
+
+
+def get_archive_service(request: Request) -> ArchiveService:
+    """Shared ArchiveService instance"""
+    return request.app.state.archive_service
+
+
+def get_search_index(request: Request) -> SearchIndex:
+    """Shared in-memory SearchIndex"""
+    return request.app.state.search_index
+
+
+def get_campaign_service(request: Request) -> CampaignService:
+    """Shared CampaignService instance"""
+    return request.app.state.campaign_service
+
+
+def get_email_event_service(request: Request) -> EmailEventService:
+    """Shared EmailEventService instance (SendGrid webhook buffer)"""
+    return request.app.state.email_events
+
+
+def get_ticket_renderer(request: Request) -> TicketRenderService:
+    """Shared TicketRenderService instance"""
+    return request.app.state.ticket_renderer
+
+
+def get_coalescer(request: Request) -> RequestCoalescer:
+    """Shared RequestCoalescer instance"""
+    return request.app.state.coalescer
+
+
+def get_waiting_room(request: Request) -> WaitingRoom:
+    """Shared WaitingRoom instance"""
+    return request.app.state.waiting_room
+
+
+def get_idempotency(request: Request) -> IdempotencyService:
+    """Shared IdempotencyService instance"""
+    return request.app.state.idempotency
+
+
+def get_assets(request: Request) -> AssetPipeline:
+    """Shared in-memory static AssetPipeline"""
+    return request.app.state.assets
+
+
+def get_event_mode(request: Request) -> EventModeService:
+    """Shared EventModeService instance"""
+    return request.app.state.event_mode
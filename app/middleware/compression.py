@@ -0,0 +1,125 @@
+"""
+Response compression with zstd/gzip content negotiation
+
+Buffers single-message responses with a compressible content type and,
+if the body is at least `minimum_size` bytes, compresses it with the best
+encoding the client accepts (zstd preferred over gzip). Responses that
+already carry a Content-Encoding (e.g. precompressed static files),
+server-sent events and streamed responses (more than one body message)
+pass through untouched, so they are never held back until they end.
+"""
+import gzip
+from typing import List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'text/',
+    'application/javascript',
+    'image/svg+xml',
+)
+NEVER_BUFFERED_TYPES = ('text/event-stream',)
+
+
+def negotiate_encoding(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """
+    Pick the first of `supported` the client accepts (q > 0)
+
+    Args:
+        accept_encoding: Accept-Encoding header value
+        supported: Encodings in server preference order
+    """
+    accepted = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token.strip().lower()] = q
+    for encoding in supported:
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        zstd_level: int = 3
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+        self.encodings = ['gzip']
+        try:
+            import zstandard
+            self._zstd = zstandard.ZstdCompressor(level=zstd_level)
+            self.encodings.insert(0, 'zstd')
+        except ImportError:
+            self._zstd = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding', ''), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, passthrough
+            if message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                content_type = headers.get('content-type', '')
+                if 'content-encoding' in headers\
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)\
+                        or content_type.startswith(NEVER_BUFFERED_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+
+            if passthrough or message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            if message.get('more_body', False):
+                # Streamed: send it on as it comes instead of buffering to the end
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            headers = MutableHeaders(raw=start['headers'])
+            if len(body) >= self.minimum_size:
+                body = self._compress(body, encoding)
+                headers['Content-Encoding'] = encoding
+                headers['Content-Length'] = str(len(body))
+                headers.add_vary_header('Accept-Encoding')
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == 'zstd':
+            return self._zstd.compress(body)
+        return gzip.compress(body, compresslevel=self.gzip_level)
@@ -0,0 +1,43 @@
+"""
+Request profiling hook (see app/services/profiler.py)
+
+Profiles a request when the profiler chooses it (X-Profile header with a
+valid token, or the sampling toggle) and tags the response with
+X-Profile-Id. Does nothing while profiling is disabled.
+"""
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.services.profiler import get_profiler
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = get_profiler()
+        if scope['type'] != 'http' or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        mode = profiler.choose(scope['method'], scope['path'], Headers(scope=scope))
+        started = profiler.begin(mode, scope['method'], scope['path']) if mode else None
+        if started is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile, token = started
+        status: Optional[int] = None
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                MutableHeaders(scope=message)['X-Profile-Id'] = profile.id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.end(profile, token, status)
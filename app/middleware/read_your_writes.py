@@ -0,0 +1,44 @@
+"""
+Read-your-writes marker for the read replica (see app/db.py)
+
+Successful writes (POST, PUT, PATCH or DELETE answered below 400) get a
+`last_write` cookie and an X-Last-Write header with the time of the
+write. For settings.read_your_writes_window seconds afterwards,
+allow_stale_reads sends that client's dashboard reads to the primary;
+every other client keeps reading the replica. Clients that don't keep
+cookies can echo X-Last-Write back instead. Does nothing without a
+replica.
+"""
+import math
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+from app.db import replica_configured
+
+LAST_WRITE_COOKIE = 'last_write'
+WRITE_METHODS = frozenset(('POST', 'PUT', 'PATCH', 'DELETE'))
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] not in WRITE_METHODS or not replica_configured():
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message: Message) -> None:
+            if message['type'] == 'http.response.start' and message['status'] < 400:
+                written_at = f"{time.time():.3f}"
+                headers = MutableHeaders(scope=message)
+                headers['X-Last-Write'] = written_at
+                headers.append(
+                    'Set-Cookie',
+                    f"{LAST_WRITE_COOKIE}={written_at}; Max-Age={math.ceil(settings.read_your_writes_window)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
@@ -0,0 +1,9 @@
+from pydantic import BaseModel, Field
+from typing import Literal
+
+
+class CampaignCreate(BaseModel):
+    event_id: int
+    subject: str = Field(..., min_length=1, max_length=200)
+    body: str = Field(..., min_length=1)  # HTML; -name- and -ticket_id- are filled per recipient
+    audience: Literal['all', 'checked_in', 'not_checked_in'] = 'all'
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -41,6 +41,11 @@ class CheckInResponse(BaseModel):
         from_attributes = True
 
 
+class CheckInBatchRequest(BaseModel):
+    event_id: int
+    emails: List[str] = Field(..., min_length=1, max_length=500)
+
+
 class CSVUploadResponse(BaseModel):
     message: str
     total_rows: int
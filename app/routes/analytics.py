@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.dependencies import get_analytics_service
+from app.services.analytics_service import AnalyticsService
+from typing import Optional
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+@router.get("/{event_id}/arrivals", response_model=dict)
+async def get_arrival_curve(
+    event_id: int,
+    bucket_minutes: int = Query(default=1, ge=1, le=60),
+    service: AnalyticsService = Depends(get_analytics_service)
+):
+    """
+    Check-in arrival curve for an event
+    
+    Args:
+        bucket_minutes: Bucket size (default 1 minute)
+    """
+    try:
+        return service.arrival_curve(event_id, bucket_minutes)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{event_id}/peak", response_model=dict)
+async def get_peak_throughput(event_id: int, service: AnalyticsService = Depends(get_analytics_service)):
+    """Busiest 1, 5 and 15 minute windows for an event"""
+    try:
+        return service.peak_throughput(event_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{event_id}/projection", response_model=dict)
+async def get_completion_projection(
+    event_id: int,
+    expected: Optional[int] = Query(default=None, ge=0),
+    rate_window: int = Query(default=15, ge=1, le=120),
+    service: AnalyticsService = Depends(get_analytics_service)
+):
+    """
+    Projected completion time at the recent arrival rate
+    
+    Args:
+        expected: Expected attendance (default: registrations, plus hackathon
+            participants for hackathon-day events)
+        rate_window: Minutes of recent arrivals used for the rate
+    """
+    try:
+        return service.projection(event_id, expected, rate_window)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/{event_id}/rebuild", response_model=dict)
+async def rebuild_rollups(event_id: int, service: AnalyticsService = Depends(get_analytics_service)):
+    """Recompute an event's per-minute rollups from raw check-ins"""
+    try:
+        return {"message": "Rollups rebuilt", "rows": service.rebuild(event_id)}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
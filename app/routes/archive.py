@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.dependencies import get_archive_service
+from app.services.archive_service import ArchiveService
+
+router = APIRouter(prefix="/archive", tags=["Archive"])
+
+
+@router.post("/run", response_model=dict)
+async def archive_expired_events(
+    dry_run: bool = Query(default=False),
+    service: ArchiveService = Depends(get_archive_service)
+):
+    """
+    Archive every event older than the retention window
+    
+    Args:
+        dry_run: Only list the events that would be archived
+    """
+    try:
+        return service.archive_expired(dry_run=dry_run)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/events", response_model=list)
+async def list_archived_events(service: ArchiveService = Depends(get_archive_service)):
+    """Summaries of all archived events"""
+    try:
+        return service.list_archived()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/events/{event_id}", response_model=dict)
+async def archive_event(
+    event_id: int,
+    force: bool = Query(default=False),
+    service: ArchiveService = Depends(get_archive_service)
+):
+    """
+    Move an event's registrations and check-ins to cold storage
+    
+    Args:
+        force: Archive even if the event is inside the retention window
+    """
+    try:
+        return service.archive_event(event_id, force=force)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/events/{event_id}/registrations", response_model=list)
+async def get_archived_registrations(event_id: int, service: ArchiveService = Depends(get_archive_service)):
+    """Registrations of an archived event, read from Parquet"""
+    if not service.get_summary(event_id):
+        raise HTTPException(status_code=404, detail="Event is not archived")
+    return service.read('registrations', event_id)
+
+
+@router.get("/events/{event_id}/check-ins", response_model=list)
+async def get_archived_checkins(event_id: int, service: ArchiveService = Depends(get_archive_service)):
+    """Check-ins of an archived event, read from Parquet"""
+    if not service.get_summary(event_id):
+        raise HTTPException(status_code=404, detail="Event is not archived")
+    return service.read('check_ins', event_id)
@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.dependencies import get_campaign_service
+from app.models.campaign import CampaignCreate
+from app.services.campaign_service import CampaignService
+from app.services.mail_transport import get_mail_transport
+from typing import Optional
+
+router = APIRouter(prefix="/campaigns", tags=["Campaigns"])
+
+
+@router.post("/", response_model=dict)
+async def create_campaign(campaign: CampaignCreate, service: CampaignService = Depends(get_campaign_service)):
+    """
+    Create a draft announcement campaign for an event's registrants
+    
+    The body is HTML; -name- and -ticket_id- are replaced per recipient.
+    Nothing is sent until the campaign is started.
+    """
+    try:
+        return service.create(campaign.event_id, campaign.subject, campaign.body, campaign.audience)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/", response_model=list)
+async def list_campaigns(event_id: Optional[int] = None, service: CampaignService = Depends(get_campaign_service)):
+    """List campaigns, newest first"""
+    try:
+        return service.list_campaigns(event_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/transport", response_model=dict)
+async def mail_transport_status():
+    """Mail transport in use by this worker, with counters and failover circuits"""
+    return get_mail_transport().status()
+
+
+@router.get("/{campaign_id}", response_model=dict)
+async def get_campaign(campaign_id: int, service: CampaignService = Depends(get_campaign_service)):
+    """Campaign status and delivery counters"""
+    try:
+        return service.get(campaign_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/{campaign_id}/start", response_model=dict)
+async def start_campaign(campaign_id: int, service: CampaignService = Depends(get_campaign_service)):
+    """
+    Start a draft campaign, or resume a paused one from where it stopped
+
+    Also takes over a running or pausing campaign whose worker stopped
+    heartbeating for longer than CAMPAIGN_LEASE_TIMEOUT.
+    """
+    try:
+        return await service.start(campaign_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/{campaign_id}/pause", response_model=dict)
+async def pause_campaign(campaign_id: int, service: CampaignService = Depends(get_campaign_service)):
+    """
+    Stop a running campaign after its current batch
+
+    The campaign stays 'pausing' until that batch is recorded, then 'paused'.
+    """
+    try:
+        return service.pause(campaign_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/{campaign_id}/cancel", response_model=dict)
+async def cancel_campaign(campaign_id: int, service: CampaignService = Depends(get_campaign_service)):
+    """Cancel a campaign; it cannot be resumed"""
+    try:
+        return service.cancel(campaign_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
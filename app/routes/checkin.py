@@ -1,43 +1,74 @@
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
+from app.dependencies import get_checkin_service, get_checkin_journal, get_coalescer, get_idempotency, allow_stale_reads
+from app.db import replica_status
 from app.services.checkin_service import CheckInService
+from app.services.checkin_journal import CheckInJournal
+from app.services.coalescing import RequestCoalescer
+from app.services.idempotency import IdempotencyService, fingerprint
+from app.models.checkin import CheckInBatchRequest
 from typing import Optional
 
 router = APIRouter(prefix="/checkin", tags=["Check-in"])
 
 
 @router.post("/qr", response_model=dict)
-async def checkin_by_qr(ticket_id: str, event_id: int):
+async def checkin_by_qr(
+    ticket_id: str,
+    event_id: int,
+    response: Response,
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    service: CheckInService = Depends(get_checkin_service),
+    coalescer: RequestCoalescer = Depends(get_coalescer),
+    idempotency: IdempotencyService = Depends(get_idempotency)
+):
     """
     Check-in participant using QR code (ticket ID)
     
+    Repeat scans of the same ticket within the dedupe window return the
+    first outcome without another database call. A retry sent with the same
+    Idempotency-Key header returns the original outcome.
+    
     Args:
         ticket_id: The ticket ID from QR code
         event_id: The event ID for this check-in
     """
-    service = CheckInService()
-    
-    try:
-        result = service.check_in_by_qr(ticket_id, event_id)
+    async def handle():
+        try:
+            result = await coalescer.check_in(
+                ticket_id,
+                event_id,
+                lambda: service.check_in_by_qr(ticket_id, event_id)
+            )
+            
+            if not result['success']:
+                raise HTTPException(
+                    status_code=400,
+                    detail=result
+                )
+            
+            return result
         
-        if not result['success']:
+        except HTTPException:
+            raise
+        except Exception as e:
             raise HTTPException(
-                status_code=400,
-                detail=result
+                status_code=500,
+                detail=f"Check-in failed: {str(e)}"
             )
-        
-        return result
     
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Check-in failed: {str(e)}"
-        )
+    body, replayed = await idempotency.execute(
+        'checkin_qr',
+        idempotency_key,
+        fingerprint(ticket_id, event_id),
+        handle
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
 
 
 @router.post("/email", response_model=dict)
-async def checkin_by_email(email: str, event_id: int):
+async def checkin_by_email(email: str, event_id: int, service: CheckInService = Depends(get_checkin_service)):
     """
     Check-in participant using email lookup (for hackathon participants)
     
@@ -45,8 +76,6 @@ async def checkin_by_email(email: str, event_id: int):
         email: Participant's email
         event_id: The event ID for this check-in
     """
-    service = CheckInService()
-    
     try:
         result = service.check_in_by_email(email, event_id)
         
@@ -67,10 +96,37 @@ async def checkin_by_email(email: str, event_id: int):
         )
 
 
+@router.post("/email/batch", response_model=dict)
+async def checkin_by_email_batch(
+    batch: CheckInBatchRequest,
+    service: CheckInService = Depends(get_checkin_service)
+):
+    """
+    Check-in a group of hackathon participants by email in one request
+    
+    Returns a per-email result for every address, using the same reason
+    codes as /checkin/email (not_found, has_ticket, already_checked_in).
+    Each result carries `input` (the address as sent) and `email` (trimmed,
+    lower-cased).
+    """
+    try:
+        return service.check_in_by_email_batch(batch.emails, batch.event_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch check-in failed: {str(e)}"
+        )
+
+
 @router.get("/stats/{event_id}", response_model=dict)
-async def get_checkin_stats(event_id: int):
+async def get_checkin_stats(
+    event_id: int,
+    stale_ok: bool = Depends(allow_stale_reads),
+    service: CheckInService = Depends(get_checkin_service),
+    coalescer: RequestCoalescer = Depends(get_coalescer)
+):
     """
-    Get check-in statistics for an event
+    Get check-in statistics for an event (read replica unless X-Read-Consistency: strong)
     
     Returns:
         - Total registrations
@@ -78,28 +134,69 @@ async def get_checkin_stats(event_id: int):
         - CSV check-ins
         - Remaining capacity
     """
-    service = CheckInService()
-    
     try:
-        stats = service.get_event_checkin_stats(event_id)
+        # Identical concurrent requests share one set of queries
+        stats = await coalescer.single_flight(
+            ('stats', event_id, stale_ok),
+            lambda: service.get_event_checkin_stats(event_id, stale_ok)
+        )
         return stats
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/recent/{event_id}", response_model=list)
-async def get_recent_checkins(event_id: int, limit: int = Query(default=10, le=50)):
+async def get_recent_checkins(
+    event_id: int,
+    limit: int = Query(default=10, le=50),
+    stale_ok: bool = Depends(allow_stale_reads),
+    service: CheckInService = Depends(get_checkin_service),
+    coalescer: RequestCoalescer = Depends(get_coalescer)
+):
     """
-    Get recent check-ins for an event
+    Get recent check-ins for an event (read replica unless X-Read-Consistency: strong)
     
     Args:
         event_id: Event ID
         limit: Maximum number of check-ins to return (default 10, max 50)
     """
-    service = CheckInService()
-    
     try:
-        checkins = service.get_recent_checkins(event_id, limit)
+        checkins = await coalescer.single_flight(
+            ('recent', event_id, limit, stale_ok),
+            lambda: service.get_recent_checkins(event_id, limit, stale_ok)
+        )
         return checkins
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/journal", response_model=dict)
+async def get_journal_status(journal: CheckInJournal = Depends(get_checkin_journal)):
+    """
+    Degraded-mode status: database circuit state, journal entries waiting
+    for replay, events with a local roster, and the read replica's circuit
+    """
+    return {**journal.status(), 'read_replica': replica_status()}
+
+
+@router.post("/journal/replay", response_model=dict)
+async def replay_journal(journal: CheckInJournal = Depends(get_checkin_journal)):
+    """Flush pending journal admissions to the database now"""
+    try:
+        return journal.replay()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Replay failed: {str(e)}")
+
+
+@router.post("/journal/roster/{event_id}", response_model=dict)
+async def refresh_roster(event_id: int, journal: CheckInJournal = Depends(get_checkin_journal)):
+    """
+    Snapshot an event's roster for degraded-mode check-in
+    
+    Rosters are also taken automatically after an event's first online
+    check-in; call this before doors open to have one from the start.
+    """
+    try:
+        return journal.refresh_roster(event_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
+from app.dependencies import get_csv_service, allow_stale_reads
 from app.services.csv_service import CSVService
 from app.models.checkin import CSVUploadResponse
 from typing import List
@@ -7,7 +8,7 @@ router = APIRouter(prefix="/csv", tags=["CSV Upload"])
 
 
 @router.post("/upload", response_model=dict)
-async def upload_hackathon_csv(file: UploadFile = File(...)):
+async def upload_hackathon_csv(file: UploadFile = File(...), service: CSVService = Depends(get_csv_service)):
     """
     Upload CSV file with hackathon participants
     
@@ -28,7 +29,6 @@ async def upload_hackathon_csv(file: UploadFile = File(...)):
         content = await file.read()
         
         # Parse and import
-        service = CSVService()
         results = service.parse_csv(content)
         
         return {
@@ -47,23 +47,62 @@ async def upload_hackathon_csv(file: UploadFile = File(...)):
         )
 
 
-@router.get("/participants", response_model=List[dict])
-async def get_all_participants():
-    """Get all imported hackathon participants"""
-    service = CSVService()
+@router.post("/sync", response_model=dict)
+async def sync_hackathon_csv(
+    file: UploadFile = File(...),
+    delete_missing: bool = False,
+    dry_run: bool = False,
+    force: bool = False,
+    service: CSVService = Depends(get_csv_service)
+):
+    """
+    Re-sync hackathon participants from an updated CSV
+    
+    Only new, changed and (optionally) removed participants are written,
+    so there is no need to delete everything and re-upload. Run with
+    dry_run=true first and check the summary before applying it.
+    
+    Args:
+        delete_missing: Remove participants not present in the file (skipped
+            when the file has row errors or no valid rows, unless force)
+        dry_run: Return the change summary without applying it
+        force: Apply deletes despite row errors or an empty file
+    """
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=400,
+            detail="Only CSV files are allowed"
+        )
     
     try:
-        participants = service.get_all_participants()
+        content = await file.read()
+        results = service.sync_csv(content, delete_missing=delete_missing, dry_run=dry_run, force=force)
+        results['error_details'] = results['error_details'][:10]  # Limit error details
+        return {"message": "CSV sync dry run complete" if dry_run else "CSV synced successfully", **results}
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error syncing CSV: {str(e)}"
+        )
+
+
+@router.get("/participants", response_model=List[dict])
+async def get_all_participants(
+    stale_ok: bool = Depends(allow_stale_reads),
+    service: CSVService = Depends(get_csv_service)
+):
+    """Get all imported hackathon participants (read replica unless X-Read-Consistency: strong)"""
+    try:
+        participants = service.get_all_participants(stale_ok)
         return participants
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/participants/{email}")
-async def get_participant_by_email(email: str):
+async def get_participant_by_email(email: str, service: CSVService = Depends(get_csv_service)):
     """Check if email exists in hackathon participants"""
-    service = CSVService()
-    
     try:
         exists = service.check_participant_exists(email)
         
@@ -83,10 +122,8 @@ async def get_participant_by_email(email: str):
 
 
 @router.delete("/participants", response_model=dict)
-async def delete_all_participants():
+async def delete_all_participants(service: CSVService = Depends(get_csv_service)):
     """Delete all hackathon participants (use with caution!)"""
-    service = CSVService()
-    
     try:
         deleted_count = service.delete_all_participants()
         return {
@@ -98,12 +135,13 @@ async def delete_all_participants():
 
 
 @router.get("/stats", response_model=dict)
-async def get_csv_stats():
-    """Get statistics about imported hackathon participants"""
-    service = CSVService()
-    
+async def get_csv_stats(
+    stale_ok: bool = Depends(allow_stale_reads),
+    service: CSVService = Depends(get_csv_service)
+):
+    """Get statistics about imported hackathon participants (read replica unless X-Read-Consistency: strong)"""
     try:
-        participants = service.get_all_participants()
+        participants = service.get_all_participants(stale_ok)
         
         return {
             "total_participants": len(participants),
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from app.models.event import EventCreate, EventResponse
 from app.db import get_supabase
+from app.dependencies import get_event_mode
+from app.services.event_mode import EventModeService
+from app.services.invalidation_bus import get_invalidation_bus, EVENTS
 from typing import List
 
 router = APIRouter(prefix="/events", tags=["Events"])
@@ -22,6 +25,7 @@ async def create_event(event: EventCreate):
     
     try:
         result = db.table('events').insert(event_data).execute()
+        get_invalidation_bus().publish(EVENTS, result.data[0]['id'])
         return {"message": "Event created successfully", "event": result.data[0]}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -85,6 +89,7 @@ async def toggle_registration(event_id: int):
             .update({'registration_open': new_state})\
             .eq('id', event_id)\
             .execute()
+        get_invalidation_bus().publish(EVENTS, event_id)
         
         return {
             "message": f"Registration {'opened' if new_state else 'closed'}",
@@ -93,4 +98,37 @@ async def toggle_registration(event_id: int):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/event-mode/status", response_model=dict)
+async def get_event_mode_status(event_mode: EventModeService = Depends(get_event_mode)):
+    """List events whose tickets are held in memory for live check-in"""
+    return event_mode.status()
+
+
+@router.post("/{event_id}/event-mode", response_model=dict)
+async def activate_event_mode(event_id: int, event_mode: EventModeService = Depends(get_event_mode)):
+    """
+    Turn on event mode: preload this event's tickets into memory
+    
+    QR check-ins and ticket verification for the event are then answered
+    without a database round-trip; admissions are written through in the
+    background.
+    """
+    try:
+        return {"message": "Event mode activated", **event_mode.activate(event_id)}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/{event_id}/event-mode", response_model=dict)
+async def deactivate_event_mode(event_id: int, event_mode: EventModeService = Depends(get_event_mode)):
+    """Turn off event mode after writing pending check-ins to the database"""
+    try:
+        event_mode.deactivate(event_id)
+        return {"message": "Event mode deactivated", "event_id": event_id}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
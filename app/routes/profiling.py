@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from app.services.profiler import Profiler, get_profiler
+from typing import Optional
+
+
+def require_profiling_token(token: Optional[str] = Header(default=None, alias="X-Profile-Token")) -> Profiler:
+    """The profiler, if profiling is enabled and the request carries its token"""
+    profiler = get_profiler()
+    if not profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILING_TOKEN)")
+    if not profiler.check_token(token):
+        raise HTTPException(status_code=403, detail="Invalid X-Profile-Token")
+    return profiler
+
+
+router = APIRouter(prefix="/debug", tags=["Profiling"])
+
+
+class ProfilingToggle(BaseModel):
+    enabled: bool
+    mode: str = Field(default='sample', pattern="^(cprofile|sample)$")
+    sample_rate: float = Field(default=0.01, ge=0.0, le=1.0)
+    path_prefix: str = ''
+
+
+@router.get("/profiling", response_model=dict)
+async def get_profiling_status(profiler: Profiler = Depends(require_profiling_token)):
+    """Sampling toggle and ring buffer state for this worker"""
+    return profiler.status()
+
+
+@router.put("/profiling", response_model=dict)
+async def set_profiling_toggle(toggle: ProfilingToggle, profiler: Profiler = Depends(require_profiling_token)):
+    """
+    Profile a fraction of requests in every worker
+    
+    Example: {"enabled": true, "mode": "sample", "sample_rate": 0.05, "path_prefix": "/checkin"}
+    Single requests can be profiled instead with the headers
+    X-Profile: cprofile|sample and X-Profile-Token.
+    """
+    try:
+        profiler.set_toggle(toggle.enabled, toggle.mode, toggle.sample_rate, toggle.path_prefix)
+        return profiler.status()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/profiles", response_model=list)
+async def list_profiles(profiler: Profiler = Depends(require_profiling_token)):
+    """Captured profiles in this worker, newest first, with DB/QR/email/app section times"""
+    return profiler.list_profiles()
+
+
+@router.delete("/profiles", response_model=dict)
+async def clear_profiles(profiler: Profiler = Depends(require_profiling_token)):
+    """Empty this worker's ring buffer"""
+    return {"deleted": profiler.clear()}
+
+
+@router.get("/profiles/{profile_id}/pstats")
+async def download_pstats(profile_id: str, profiler: Profiler = Depends(require_profiling_token)):
+    """cProfile stats file; open with `python -m pstats FILE` or snakeviz"""
+    try:
+        profile = profiler.get(profile_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if profile.pstats_data is None:
+        raise HTTPException(status_code=409, detail="pstats is only available for cprofile-mode profiles")
+    return Response(
+        content=profile.pstats_data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.pstats"'}
+    )
+
+
+@router.get("/profiles/{profile_id}/collapsed", response_class=PlainTextResponse)
+async def download_collapsed(profile_id: str, profiler: Profiler = Depends(require_profiling_token)):
+    """
+    Collapsed stacks for flamegraph.pl or speedscope
+    
+    Sample-mode values are sample counts, with the section ([db], [qr],
+    [email], [app]) as the root frame; cprofile-mode values are µs
+    approximated from the call graph.
+    """
+    try:
+        profile = profiler.get(profile_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return PlainTextResponse(
+        profile.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.collapsed.txt"'}
+    )
+
+
+@router.get("/profiles/{profile_id}", response_model=dict)
+async def get_profile(profile_id: str, profiler: Profiler = Depends(require_profiling_token)):
+    """Summary of one captured profile"""
+    try:
+        return profiler.get(profile_id).summary()
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -1,51 +1,156 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Request, Response, status
 from app.models.registration import RegistrationCreate, RegistrationResponse
+from app.dependencies import get_registration_service, get_event_mode, get_waiting_room, get_idempotency, get_email_event_service, allow_stale_reads
+from app.services.idempotency import IdempotencyService, fingerprint
+from app.services.email_events import EmailEventService
+from app.services.event_mode import EventModeService
 from app.services.registration_service import RegistrationService
-from typing import List
+from app.services.waiting_room import WaitingRoom, WaitingRoomRejected
+from pydantic import EmailStr
+from typing import List, Optional
 
 router = APIRouter(prefix="/registrations", tags=["Registrations"])
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def register_for_event(registration: RegistrationCreate):
+async def register_for_event(
+    registration: RegistrationCreate,
+    request: Request,
+    response: Response,
+    queue_token: Optional[str] = Header(default=None, alias="X-Queue-Token"),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+    service: RegistrationService = Depends(get_registration_service),
+    waiting_room: WaitingRoom = Depends(get_waiting_room),
+    idempotency: IdempotencyService = Depends(get_idempotency)
+):
     """
     Register a participant for an event
     Generates ticket and sends email
+    
+    Requests pass through the waiting room: rate-limited per IP and email,
+    rejected early once the event is full, otherwise queued FIFO for a
+    processing slot. To poll your position at GET /registrations/queue, get
+    a token from POST /registrations/queue/token and send it as the
+    X-Queue-Token header.
+    
+    Send an Idempotency-Key header to make retries safe: a retry with the
+    same key returns the original outcome without registering (or emailing)
+    again.
     """
-    service = RegistrationService()
+    async def handle():
+        try:
+            client_ip = request.client.host if request.client else "unknown"
+            waiting_room.check_rate(client_ip, registration.email.lower())
+            
+            async with waiting_room.admit(registration.event_id, queue_token):
+                result = await service.create_registration(registration)
+            
+            return {
+                "message": "Registration successful! Check your email for the ticket.",
+                "registration_id": result['registration_id'],
+                "ticket_id": result['ticket_id'],
+                "email_sent": result['email_sent']
+            }
+        except WaitingRoomRejected as e:
+            headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+            raise HTTPException(status_code=e.status_code, detail=e.message, headers=headers)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
     
+    body, replayed = await idempotency.execute(
+        'registrations',
+        idempotency_key,
+        fingerprint(registration.model_dump(mode='json')),
+        handle
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return body
+
+
+@router.post("/queue/token", response_model=dict)
+async def issue_queue_token(waiting_room: WaitingRoom = Depends(get_waiting_room)):
+    """Issue a single-use X-Queue-Token for polling a registration's queue position"""
+    return {"token": waiting_room.issue_token()}
+
+
+@router.get("/queue", response_model=dict)
+async def get_queue_status(token: Optional[str] = None, waiting_room: WaitingRoom = Depends(get_waiting_room)):
+    """
+    Registration waiting room status
+    
+    Returns queue length and estimated wait; with ?token= (the issued
+    X-Queue-Token sent on the registration request) also that request's
+    position.
+    """
+    return waiting_room.status(token)
+
+
+@router.get("/event/{event_id}", response_model=List[dict])
+async def get_event_registrations(
+    event_id: int,
+    stale_ok: bool = Depends(allow_stale_reads),
+    service: RegistrationService = Depends(get_registration_service)
+):
+    """Get all registrations for a specific event (read replica unless X-Read-Consistency: strong)"""
     try:
-        result = await service.create_registration(registration)
-        
-        return {
-            "message": "Registration successful! Check your email for the ticket.",
-            "registration_id": result['registration_id'],
-            "ticket_id": result['ticket_id'],
-            "email_sent": result['email_sent']
-        }
-    except ValueError as e:
+        registrations = service.get_registrations_by_event(event_id, stale_ok)
+        return registrations
+    except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/event/{event_id}/bounced", response_model=List[dict])
+async def get_bounced_registrations(event_id: int, service: EmailEventService = Depends(get_email_event_service)):
+    """
+    Registrations whose latest ticket email bounced or was dropped
+    
+    Fix the address and resend with POST /registrations/ticket/{ticket_id}/resend.
+    """
+    try:
+        return service.bounced(event_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/event/{event_id}", response_model=List[dict])
-async def get_event_registrations(event_id: int):
-    """Get all registrations for a specific event"""
-    service = RegistrationService()
+@router.get("/ticket/{ticket_id}/delivery", response_model=dict)
+async def get_ticket_delivery(ticket_id: str, service: EmailEventService = Depends(get_email_event_service)):
+    """
+    Delivery state of a ticket email from SendGrid webhook events
     
+    status is the latest of processed, deferred, delivered, bounce or
+    dropped ('unknown' before any event arrived).
+    """
     try:
-        registrations = service.get_registrations_by_event(event_id)
-        return registrations
+        return service.delivery_status(ticket_id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/ticket/{ticket_id}/resend", response_model=dict)
+async def resend_ticket(
+    ticket_id: str,
+    email: Optional[EmailStr] = Body(default=None, embed=True),
+    service: RegistrationService = Depends(get_registration_service)
+):
+    """
+    Send the ticket email again, optionally to a corrected address
+    
+    Body: {"email": "fixed@example.com"} (optional)
+    """
+    try:
+        return await service.resend_ticket(ticket_id, email)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Resend failed: {str(e)}")
+
+
 @router.get("/ticket/{ticket_id}", response_model=dict)
-async def get_registration_by_ticket(ticket_id: str):
+async def get_registration_by_ticket(ticket_id: str, service: RegistrationService = Depends(get_registration_service)):
     """Get registration details by ticket ID"""
-    service = RegistrationService()
-    
     try:
         registration = service.get_registration_by_ticket(ticket_id)
         
@@ -60,12 +165,19 @@ async def get_registration_by_ticket(ticket_id: str):
 
 
 @router.get("/verify/{ticket_id}", response_model=dict)
-async def verify_ticket(ticket_id: str):
+async def verify_ticket(
+    ticket_id: str,
+    service: RegistrationService = Depends(get_registration_service),
+    event_mode: EventModeService = Depends(get_event_mode)
+):
     """
     Verify if a ticket is valid
     Used for quick validation without full details
     """
-    service = RegistrationService()
+    # Answered from memory when the ticket's event is in event mode
+    cached = event_mode.verify(ticket_id)
+    if cached is not None:
+        return cached
     
     try:
         registration = service.get_registration_by_ticket(ticket_id)
@@ -0,0 +1,45 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.dependencies import get_search_index
+from app.services.search_index import SearchIndex
+from typing import Optional
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("", response_model=list)
+async def search_people(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(default=20, ge=1, le=100),
+    kind: Optional[str] = Query(default=None, pattern="^(participant|registration)$"),
+    event_id: Optional[int] = None,
+    index: SearchIndex = Depends(get_search_index)
+):
+    """
+    Find hackathon participants and registrations by name, email, college
+    or ticket ID, tolerating typos and partial input
+    
+    Args:
+        q: Search text
+        kind: Only 'participant' or only 'registration' results
+        event_id: Only registrations for this event
+    """
+    try:
+        return await asyncio.to_thread(index.search, q, limit=limit, kind=kind, event_id=event_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+
+@router.get("/stats", response_model=dict)
+async def get_search_stats(index: SearchIndex = Depends(get_search_index)):
+    """Size of the search index"""
+    return index.stats()
+
+
+@router.post("/rebuild", response_model=dict)
+async def rebuild_search_index(index: SearchIndex = Depends(get_search_index)):
+    """Reload the search index from the database"""
+    try:
+        return index.rebuild()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rebuild failed: {str(e)}")
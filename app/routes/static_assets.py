@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from app.dependencies import get_assets
+from app.middleware.compression import negotiate_encoding
+from app.services.static_assets import (
+    AssetPipeline,
+    StaticAsset,
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL
+)
+
+router = APIRouter(tags=["Static"])
+
+
+def asset_response(request: Request, asset: StaticAsset, cache_control: str) -> Response:
+    """
+    Serve an in-memory asset, honouring If-None-Match and Accept-Encoding
+    """
+    headers = {
+        'Cache-Control': cache_control,
+        'ETag': asset.etag,
+        'Vary': 'Accept-Encoding'
+    }
+    if request.headers.get('if-none-match') == asset.etag:
+        return Response(status_code=304, headers=headers)
+
+    encoding = negotiate_encoding(
+        request.headers.get('accept-encoding', ''),
+        [e for e in ('br', 'gzip') if e in asset.variants]
+    )
+    if encoding is not None:
+        headers['Content-Encoding'] = encoding
+        body = asset.variants[encoding]
+    else:
+        body = asset.variants['identity']
+    return Response(content=body, media_type=asset.content_type, headers=headers)
+
+
+@router.get("/static/{path:path}", include_in_schema=False)
+async def static_file(path: str, request: Request, assets: AssetPipeline = Depends(get_assets)):
+    """Static files from memory; fingerprinted URLs are cached immutably"""
+    asset, fingerprinted = assets.lookup(path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return asset_response(
+        request,
+        asset,
+        IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL
+    )
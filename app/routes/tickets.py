@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from app.dependencies import get_ticket_renderer
+from app.services.ticket_renderer import TicketRenderService
+
+router = APIRouter(prefix="/tickets", tags=["Tickets"])
+
+MEDIA_TYPES = {'pdf': 'application/pdf', 'png': 'image/png'}
+
+
+@router.get("/status", response_model=dict)
+async def get_render_status(service: TicketRenderService = Depends(get_ticket_renderer)):
+    """Badge cache location and hit/render counters for this worker"""
+    return service.status()
+
+
+@router.get("/event/{event_id}/badges")
+async def print_event_badges(event_id: int, service: TicketRenderService = Depends(get_ticket_renderer)):
+    """
+    One PDF with a printable badge for every ticket of the event
+    
+    Badges are sorted by participant name. Cached badges are reused and
+    the whole PDF is cached until the event's tickets change.
+    """
+    try:
+        path, pages = await service.event_file(event_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rendering failed: {str(e)}")
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES['pdf'],
+        filename=f"event-{event_id}-badges.pdf",
+        headers={"X-Page-Count": str(pages)}
+    )
+
+
+@router.get("/{ticket_id}/badge")
+async def print_ticket_badge(
+    ticket_id: str,
+    format: str = Query(default='pdf', pattern="^(pdf|png)$"),
+    refresh: bool = Query(default=False),
+    service: TicketRenderService = Depends(get_ticket_renderer)
+):
+    """
+    Printable badge (event, name, QR code) for a walk-in attendee
+    
+    Args:
+        format: 'pdf' (4x6 in page) or 'png' (300 dpi)
+        refresh: Re-render instead of serving the cached badge
+    """
+    try:
+        path = await service.ticket_file(ticket_id, format, refresh)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rendering failed: {str(e)}")
+    return FileResponse(
+        path,
+        media_type=MEDIA_TYPES[format],
+        filename=f"{ticket_id}.{format}",
+        content_disposition_type="inline"
+    )
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from app.dependencies import get_email_event_service
+from app.services.email_events import EmailEventService, InvalidSignature, BufferFull
+from typing import Optional
+import orjson
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"])
+
+
+@router.post("/sendgrid", status_code=204)
+async def sendgrid_events(
+    request: Request,
+    signature: Optional[str] = Header(default=None, alias="X-Twilio-Email-Event-Webhook-Signature"),
+    timestamp: Optional[str] = Header(default=None, alias="X-Twilio-Email-Event-Webhook-Timestamp"),
+    service: EmailEventService = Depends(get_email_event_service)
+):
+    """
+    SendGrid Event Webhook (enable Signed Event Webhook in SendGrid)
+    
+    Verifies the signature over the raw body and buffers the batch; events
+    are written to email_events in bulk by a background writer. Answers 503
+    while the writer is behind so SendGrid retries the batch later.
+    """
+    if not service.configured:
+        raise HTTPException(status_code=503, detail="SENDGRID_WEBHOOK_PUBLIC_KEY is not configured")
+    
+    body = await request.body()
+    try:
+        service.verify_signature(body, signature, timestamp)
+    except InvalidSignature as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    
+    try:
+        events = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Body is not valid JSON")
+    if not isinstance(events, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of events")
+    
+    try:
+        service.ingest([event for event in events if isinstance(event, dict)])
+    except BufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return Response(status_code=204)
+
+
+@router.get("/sendgrid/status", response_model=dict)
+async def sendgrid_events_status(service: EmailEventService = Depends(get_email_event_service)):
+    """Webhook buffer and writer counters for this worker"""
+    return service.status()
+
+
+@router.get("/sendgrid/set-aside", response_model=list)
+async def sendgrid_events_set_aside(service: EmailEventService = Depends(get_email_event_service)):
+    """Recent events the database refused (data or constraint errors) in this worker"""
+    return service.set_aside()
@@ -0,0 +1,167 @@
+from app.db import get_supabase
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+SOURCES = ('qr', 'csv', 'manual')
+
+
+def _parse_minute(value: str) -> datetime:
+    minute = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return minute if minute.tzinfo else minute.replace(tzinfo=timezone.utc)
+
+
+class AnalyticsService:
+    """
+    Check-in arrival analytics answered from checkin_rollups
+
+    The rollup table (one row per event, minute and source) is kept current
+    by a trigger on check_ins; see migrations/003_checkin_rollups.sql.
+    """
+    
+    @property
+    def db(self):
+        return get_supabase()
+    
+    def get_rollups(self, event_id: int) -> List[Dict]:
+        """Per-minute rows for an event, oldest first"""
+        rows = []
+        offset = 0
+        while True:
+            page = self.db.table('checkin_rollups')\
+                .select('minute, source, count')\
+                .eq('event_id', event_id)\
+                .order('minute')\
+                .range(offset, offset + 999)\
+                .execute()
+            rows.extend(page.data)
+            if len(page.data) < 1000:
+                return rows
+            offset += 1000
+    
+    def rebuild(self, event_id: int) -> int:
+        """Recompute an event's rollups from check_ins (backfill/repair)"""
+        result = self.db.rpc('rebuild_checkin_rollups', {'p_event_id': event_id}).execute()
+        return result.data or 0
+    
+    def _per_minute(self, event_id: int) -> Dict[datetime, Dict[str, int]]:
+        minutes: Dict[datetime, Dict[str, int]] = {}
+        for row in self.get_rollups(event_id):
+            if row['count'] <= 0:
+                continue
+            counts = minutes.setdefault(_parse_minute(row['minute']), dict.fromkeys(SOURCES, 0))
+            counts[row['source']] = counts.get(row['source'], 0) + row['count']
+        return minutes
+    
+    def arrival_curve(self, event_id: int, bucket_minutes: int = 1) -> Dict:
+        """
+        Check-ins per bucket (by source) with a running total
+        
+        Empty buckets between the first and last arrival are included so
+        the series can be charted directly.
+        """
+        minutes = self._per_minute(event_id)
+        if not minutes:
+            return {'event_id': event_id, 'bucket_minutes': bucket_minutes, 'total': 0, 'buckets': []}
+        
+        first, last = min(minutes), max(minutes)
+        step = timedelta(minutes=bucket_minutes)
+        buckets = []
+        cumulative = 0
+        start = first
+        while start <= last:
+            counts = dict.fromkeys(SOURCES, 0)
+            minute = start
+            while minute < start + step:
+                for source, n in minutes.get(minute, {}).items():
+                    counts[source] = counts.get(source, 0) + n
+                minute += timedelta(minutes=1)
+            total = sum(counts.values())
+            cumulative += total
+            buckets.append({
+                'start': start.isoformat(),
+                'total': total,
+                'by_source': counts,
+                'cumulative': cumulative
+            })
+            start += step
+        
+        return {'event_id': event_id, 'bucket_minutes': bucket_minutes, 'total': cumulative, 'buckets': buckets}
+    
+    def peak_throughput(self, event_id: int, windows: tuple = (1, 5, 15)) -> Dict:
+        """Busiest sliding window of each length, in check-ins and check-ins/minute"""
+        minutes = self._per_minute(event_id)
+        totals = {minute: sum(counts.values()) for minute, counts in minutes.items()}
+        peaks = []
+        for window in windows:
+            best_start, best = None, 0
+            span = timedelta(minutes=window)
+            for start in totals:
+                count = sum(n for minute, n in totals.items() if start <= minute < start + span)
+                if count > best:
+                    best_start, best = start, count
+            peaks.append({
+                'window_minutes': window,
+                'start': best_start.isoformat() if best_start else None,
+                'checkins': best,
+                'per_minute': round(best / window, 2)
+            })
+        return {'event_id': event_id, 'total': sum(totals.values()), 'peaks': peaks}
+    
+    def expected_attendance(self, event_id: int) -> int:
+        """Registrations, plus hackathon participants for hackathon-day events"""
+        event = self.db.table('events')\
+            .select('event_type')\
+            .eq('id', event_id)\
+            .single()\
+            .execute()
+        
+        registrations = self.db.table('registrations')\
+            .select('id', count='exact')\
+            .eq('event_id', event_id)\
+            .limit(1)\
+            .execute()
+        expected = registrations.count or 0
+        
+        if event.data and event.data['event_type'] == 'hackathon_day':
+            participants = self.db.table('hackathon_participants')\
+                .select('id', count='exact')\
+                .limit(1)\
+                .execute()
+            expected += participants.count or 0
+        return expected
+    
+    def projection(self, event_id: int, expected: Optional[int] = None, rate_window: int = 15) -> Dict:
+        """
+        Projected time at which everyone expected has checked in
+        
+        Uses the average arrival rate over the last `rate_window` minutes
+        that had any arrivals.
+        """
+        minutes = self._per_minute(event_id)
+        arrived = sum(sum(counts.values()) for counts in minutes.values())
+        if expected is None:
+            expected = self.expected_attendance(event_id)
+        remaining = max(expected - arrived, 0)
+        
+        rate = 0.0
+        if minutes:
+            last = max(minutes)
+            since = last - timedelta(minutes=rate_window - 1)
+            recent = sum(sum(c.values()) for m, c in minutes.items() if m >= since)
+            rate = recent / rate_window
+        
+        completion = None
+        if remaining == 0:
+            completion = max(minutes).isoformat() if minutes else None
+        elif rate > 0:
+            completion = (datetime.now(timezone.utc) + timedelta(minutes=remaining / rate)).isoformat()
+        
+        return {
+            'event_id': event_id,
+            'expected': expected,
+            'checked_in': arrived,
+            'remaining': remaining,
+            'recent_rate_per_minute': round(rate, 2),
+            'rate_window_minutes': rate_window,
+            'projected_completion': completion
+        }
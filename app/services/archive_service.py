@@ -0,0 +1,275 @@
+"""
+Cold-storage archival of finished events
+
+Registrations and check-ins of events older than the retention window are
+written to zstd-compressed Parquet files (local directory or any fsspec
+URL, e.g. s3://bucket/prefix with s3fs installed) and verified. Then the
+archive_event_rows RPC (migrations/008) deletes exactly the rows that
+were written and inserts the `archived_events` summary in one
+transaction, leaving checkin_rollups intact so analytics keep the
+timeline. Stats and exports for archived events are answered from the
+summary row and the Parquet files.
+
+Layout: <archive_uri>/event_id=<id>/{registrations,check_ins}.parquet
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from cachetools import TTLCache
+from app.config import settings
+from app.db import get_supabase
+from app.services.invalidation_bus import get_invalidation_bus, EVENTS, REGISTRATIONS, REGISTRATIONS_ARCHIVED
+
+# qr_code_url is left out: it is derived from ticket_id and dominates row size
+REGISTRATION_COLUMNS = 'id, event_id, name, email, phone, college, ticket_id, checked_in, checked_in_at, created_at'
+CHECK_IN_COLUMNS = 'id, event_id, email, ticket_id, source, checked_in_at'
+TIMESTAMP_COLUMNS = ('checked_in_at', 'created_at')
+# Even with force, an event must have started at least this long ago
+MIN_AGE_FOR_FORCE = timedelta(days=1)
+
+
+def _schemas():
+    import pyarrow as pa
+    ts = pa.timestamp('us', tz='UTC')
+    registrations = pa.schema([
+        ('id', pa.int64()), ('event_id', pa.int64()), ('name', pa.string()),
+        ('email', pa.string()), ('phone', pa.string()), ('college', pa.string()),
+        ('ticket_id', pa.string()), ('checked_in', pa.bool_()),
+        ('checked_in_at', ts), ('created_at', ts)
+    ])
+    check_ins = pa.schema([
+        ('id', pa.int64()), ('event_id', pa.int64()), ('email', pa.string()),
+        ('ticket_id', pa.string()), ('source', pa.string()), ('checked_in_at', ts)
+    ])
+    return {'registrations': registrations, 'check_ins': check_ins}
+
+
+def _to_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _to_iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class ArchiveService:
+    def __init__(self, archive_uri: Optional[str] = None, retention_days: Optional[int] = None):
+        self.archive_uri = (archive_uri or settings.archive_uri).rstrip('/')
+        self.retention_days = settings.archive_retention_days if retention_days is None else retention_days
+        self._summaries: TTLCache = TTLCache(maxsize=1000, ttl=300)
+        self._lock = threading.Lock()
+        get_invalidation_bus().subscribe(EVENTS, self._forget)
+
+    @property
+    def db(self):
+        return get_supabase()
+
+    def _fs(self):
+        """(filesystem, root path) for archive_uri"""
+        import fsspec
+        return fsspec.core.url_to_fs(self.archive_uri)
+
+    @staticmethod
+    def _path(root: str, event_id: int, table: str) -> str:
+        return f"{root}/event_id={event_id}/{table}.parquet"
+
+    # -- archiving --
+
+    def expired_events(self) -> List[Dict]:
+        """Events older than the retention window that are not archived yet"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=self.retention_days)).isoformat()
+        events = self.db.table('events')\
+            .select('id, name, event_date')\
+            .lt('event_date', cutoff)\
+            .order('event_date')\
+            .execute()
+        archived = self.db.table('archived_events')\
+            .select('event_id')\
+            .in_('event_id', [e['id'] for e in events.data] or [0])\
+            .execute()
+        done = {row['event_id'] for row in archived.data}
+        return [e for e in events.data if e['id'] not in done]
+
+    def archive_expired(self, dry_run: bool = False) -> Dict:
+        """Archive every expired event"""
+        candidates = self.expired_events()
+        if dry_run:
+            return {'dry_run': True, 'events': candidates}
+        archived, failed = [], []
+        for event in candidates:
+            try:
+                archived.append(self.archive_event(event['id']))
+            except Exception as e:
+                failed.append({'event_id': event['id'], 'error': str(e)})
+        return {'dry_run': False, 'archived': archived, 'failed': failed}
+
+    def archive_event(self, event_id: int, force: bool = False) -> Dict:
+        """
+        Move one event's registrations and check-ins to Parquet
+
+        Args:
+            force: Archive even if the event is inside the retention window
+                (never while registration is open or within a day of the
+                event start, when check-ins may still arrive)
+
+        Returns:
+            The archived_events summary row
+        """
+        event = self.db.table('events')\
+            .select('*')\
+            .eq('id', event_id)\
+            .single()\
+            .execute()
+        if not event.data:
+            raise ValueError("Event not found")
+        # Re-archiving would overwrite the files with the now-empty hot tables
+        if self.get_summary(event_id):
+            raise ValueError("Event is already archived")
+
+        event_date = _to_datetime(event.data['event_date'])
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        if not force and event_date >= cutoff:
+            raise ValueError(f"Event is within the {self.retention_days}-day retention window")
+        if force and (event.data.get('registration_open') or event_date > datetime.now(timezone.utc) - MIN_AGE_FOR_FORCE):
+            raise ValueError("Event is still open; close registration and wait a day after it starts before archiving")
+
+        registrations = self._fetch_all('registrations', REGISTRATION_COLUMNS, event_id)
+        check_ins = self._fetch_all('check_ins', CHECK_IN_COLUMNS, event_id)
+
+        self._write('registrations', event_id, registrations)
+        self._write('check_ins', event_id, check_ins)
+
+        # Verify before deleting anything from the hot tables
+        if len(self.read('registrations', event_id)) != len(registrations) \
+                or len(self.read('check_ins', event_id)) != len(check_ins):
+            raise RuntimeError("Archive verification failed; hot tables left untouched")
+
+        # One transaction: only the archived ids are deleted, the summary goes in last
+        summary = self._summarise(event.data, registrations, check_ins)
+        self.db.rpc('archive_event_rows', {
+            'p_summary': summary,
+            'p_registration_ids': [row['id'] for row in registrations],
+            'p_check_in_ids': [row['id'] for row in check_ins]
+        }).execute()
+
+        get_invalidation_bus().publish(EVENTS, event_id)
+        get_invalidation_bus().publish(REGISTRATIONS, REGISTRATIONS_ARCHIVED)
+        print(f"🗄️ Archived event {event_id}: {len(registrations)} registrations, {len(check_ins)} check-ins")
+        return summary
+
+    def _fetch_all(self, table: str, columns: str, event_id: int) -> List[Dict]:
+        rows = []
+        last_id = 0
+        while True:
+            page = self.db.table(table)\
+                .select(columns)\
+                .eq('event_id', event_id)\
+                .gt('id', last_id)\
+                .order('id')\
+                .limit(1000)\
+                .execute()
+            rows.extend(page.data)
+            if len(page.data) < 1000:
+                return rows
+            last_id = page.data[-1]['id']
+
+    def _write(self, table: str, event_id: int, rows: List[Dict]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _schemas()[table]
+        records = [
+            {name: (_to_datetime(row.get(name)) if name in TIMESTAMP_COLUMNS else row.get(name)) for name in schema.names}
+            for row in rows
+        ]
+        arrow_table = pa.Table.from_pylist(records, schema=schema)
+
+        fs, root = self._fs()
+        path = self._path(root, event_id, table)
+        fs.makedirs(path.rsplit('/', 1)[0], exist_ok=True)
+        with fs.open(path, 'wb') as f:
+            pq.write_table(arrow_table, f, compression='zstd')
+
+    def _summarise(self, event: Dict, registrations: List[Dict], check_ins: List[Dict]) -> Dict:
+        by_source: Dict[str, int] = {}
+        for row in check_ins:
+            by_source[row['source']] = by_source.get(row['source'], 0) + 1
+        times = sorted(_to_iso(c['checked_in_at']) for c in check_ins if c.get('checked_in_at'))
+        return {
+            'event_id': event['id'],
+            'name': event['name'],
+            'event_type': event['event_type'],
+            'event_date': event['event_date'],
+            'capacity': event['capacity'],
+            'total_registrations': len(registrations),
+            'checked_in_registrations': sum(1 for r in registrations if r.get('checked_in')),
+            'csv_checkins': by_source.get('csv', 0),
+            'total_checkins': len(check_ins),
+            'checkins_by_source': by_source,
+            'first_checkin_at': times[0] if times else None,
+            'last_checkin_at': times[-1] if times else None,
+            'archive_uri': f"{self.archive_uri}/event_id={event['id']}",
+            'archived_at': datetime.now(timezone.utc).isoformat()
+        }
+
+    # -- read-through --
+
+    def get_summary(self, event_id: int) -> Optional[Dict]:
+        """archived_events row for an event, or None if it is still live (cached)"""
+        with self._lock:
+            if event_id in self._summaries:
+                return self._summaries[event_id]
+        result = self.db.table('archived_events')\
+            .select('*')\
+            .eq('event_id', event_id)\
+            .execute()
+        summary = result.data[0] if result.data else None
+        with self._lock:
+            self._summaries[event_id] = summary
+        return summary
+
+    def list_archived(self) -> List[Dict]:
+        result = self.db.table('archived_events')\
+            .select('*')\
+            .order('event_date', desc=True)\
+            .execute()
+        return result.data
+
+    def checkin_stats(self, summary: Dict) -> Dict:
+        """Same shape as CheckInService.get_event_checkin_stats"""
+        return {
+            'event_name': summary['name'],
+            'capacity': summary['capacity'],
+            'total_registrations': summary['total_registrations'],
+            'checked_in_registrations': summary['checked_in_registrations'],
+            'csv_checkins': summary['csv_checkins'],
+            'total_checkins': summary['total_checkins'],
+            'remaining_capacity': summary['capacity'] - summary['total_checkins'],
+            'archived': True
+        }
+
+    def read(self, table: str, event_id: int) -> List[Dict]:
+        """Rows of an archived table as dicts (timestamps as ISO strings)"""
+        import pyarrow.parquet as pq
+
+        fs, root = self._fs()
+        path = self._path(root, event_id, table)
+        if not fs.exists(path):
+            return []
+        with fs.open(path, 'rb') as f:
+            rows = pq.read_table(f).to_pylist()
+        for row in rows:
+            for name in TIMESTAMP_COLUMNS:
+                if name in row:
+                    row[name] = _to_iso(row[name])
+        return rows
+
+    def _forget(self, event_id: Optional[str]) -> None:
+        with self._lock:
+            if event_id is None or not event_id.isdigit():
+                self._summaries.clear()
+            else:
+                self._summaries.pop(int(event_id), None)
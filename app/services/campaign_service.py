@@ -0,0 +1,330 @@
+"""
+Throttled announcement campaigns to an event's registrants
+
+A campaign pages through `registrations` by id (keyset) and sends each
+page as one bulk send (one SendGrid request with a personalization per
+recipient, or one message each over the SMTP pool, see
+mail_transport.py), at no more than settings.campaign_rate_limit emails
+per second. Before every
+batch the sender waits until no ticket email is being sent in this
+worker, so transactional mail always goes first.
+
+Progress (cursor_id and the sent/failed counters) is written to the
+`campaigns` row after every batch, so pause/resume, restarts and other
+workers pick up where the last batch ended. Pausing or cancelling only
+changes the status: the sending worker records its in-flight batch, sees
+the status and stops. A pause goes through 'pausing', which only the
+sending worker turns into 'paused' once its batch is recorded, so a
+campaign can't be resumed (and that batch resent) while it is still in
+flight. Each run gets a run_token, and a worker whose progress update no
+longer matches it (the campaign was restarted elsewhere) stops without
+writing.
+
+The sending worker refreshes heartbeat_at every lease_timeout / 4
+seconds. If it dies (OOM, SIGKILL) the campaign stays 'running' or
+'pausing'; once the heartbeat is older than lease_timeout, start() takes
+it over: it is moved to 'paused' and resumed from its cursor.
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.config import settings
+from app.db import get_supabase
+from app.services import email_service
+from app.services.email_templates import render_announcement_email
+from app.services.mail_transport import BulkIncomplete
+from app.services.profiler import follow
+
+AUDIENCES = ('all', 'checked_in', 'not_checked_in')
+RESUMABLE = ('draft', 'paused')
+SENDING = ('running', 'pausing')
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class CampaignService:
+    def __init__(self, rate_limit: Optional[float] = None, batch_size: Optional[int] = None, lease_timeout: Optional[float] = None):
+        self.rate_limit = rate_limit or settings.campaign_rate_limit
+        self.lease_timeout = lease_timeout or settings.campaign_lease_timeout
+        self.batch_size = min(batch_size or settings.campaign_batch_size, 1000)  # SendGrid max personalizations
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self._tokens: Dict[int, str] = {}
+
+    @property
+    def db(self):
+        return get_supabase()
+
+    # -- campaign records --
+
+    def create(self, event_id: int, subject: str, body: str, audience: str = 'all') -> Dict:
+        """Create a draft campaign; `total` is the audience size right now"""
+        if audience not in AUDIENCES:
+            raise ValueError(f"audience must be one of {', '.join(AUDIENCES)}")
+        event = self.db.table('events')\
+            .select('id')\
+            .eq('id', event_id)\
+            .execute()
+        if not event.data:
+            raise ValueError("Event not found")
+
+        total = self._audience_query('id', event_id, audience, count='exact').limit(1).execute().count or 0
+        result = self.db.table('campaigns').insert({
+            'event_id': event_id,
+            'subject': subject,
+            'body': body,
+            'audience': audience,
+            'status': 'draft',
+            'total': total,
+            'sent': 0,
+            'failed': 0,
+            'cursor_id': 0
+        }).execute()
+        return result.data[0]
+
+    def get(self, campaign_id: int) -> Dict:
+        result = self.db.table('campaigns')\
+            .select('*')\
+            .eq('id', campaign_id)\
+            .execute()
+        if not result.data:
+            raise ValueError("Campaign not found")
+        campaign = result.data[0]
+        campaign['sending_here'] = campaign_id in self._tasks
+        campaign['lease_expired'] = self._lease_expired(campaign)
+        return campaign
+
+    def _lease_expired(self, campaign: Dict) -> bool:
+        """True if a sending campaign's worker has stopped heartbeating"""
+        if campaign['status'] not in SENDING or campaign['id'] in self._tasks:
+            return False
+        beat = campaign.get('heartbeat_at') or campaign.get('started_at')
+        if not beat:
+            return True
+        beat_at = datetime.fromisoformat(beat)
+        if beat_at.tzinfo is None:
+            beat_at = beat_at.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - beat_at).total_seconds() > self.lease_timeout
+
+    def list_campaigns(self, event_id: Optional[int] = None) -> List[Dict]:
+        query = self.db.table('campaigns').select('*')
+        if event_id is not None:
+            query = query.eq('event_id', event_id)
+        return query.order('created_at', desc=True).execute().data
+
+    def _audience_query(self, columns: str, event_id: int, audience: str, count: Optional[str] = None):
+        query = self.db.table('registrations')\
+            .select(columns, count=count)\
+            .eq('event_id', event_id)
+        if audience == 'checked_in':
+            query = query.eq('checked_in', True)
+        elif audience == 'not_checked_in':
+            query = query.eq('checked_in', False)
+        return query
+
+    # -- control --
+
+    async def start(self, campaign_id: int) -> Dict:
+        """
+        Start a draft campaign or resume a paused one in this worker
+
+        A 'running' or 'pausing' campaign whose worker stopped heartbeating
+        is taken over: moved to 'paused', then resumed from its cursor.
+        """
+        campaign = self.get(campaign_id)
+        if campaign['lease_expired']:
+            taken = self.db.table('campaigns')\
+                .update({'status': 'paused', 'last_error': 'Sending worker stopped responding; taken over'})\
+                .eq('id', campaign_id)\
+                .eq('status', campaign['status'])\
+                .eq('run_token', campaign['run_token'])\
+                .execute()
+            if not taken.data:
+                raise ValueError("Campaign was changed concurrently; reload and retry")
+            print(f"♻️ Campaign {campaign_id} taken over from a worker that stopped at registration {campaign['cursor_id']}")
+            campaign = self.get(campaign_id)
+        if campaign['status'] == 'pausing':
+            raise ValueError("Campaign is still finishing its current batch; retry in a moment")
+        if campaign['status'] not in RESUMABLE:
+            raise ValueError(f"Campaign is {campaign['status']}; only draft or paused campaigns can be started")
+
+        token = uuid.uuid4().hex
+        updates = {'status': 'running', 'run_token': token, 'last_error': None, 'heartbeat_at': _now()}
+        if not campaign.get('started_at'):
+            updates['started_at'] = datetime.utcnow().isoformat()
+        claimed = self.db.table('campaigns')\
+            .update(updates)\
+            .eq('id', campaign_id)\
+            .eq('status', campaign['status'])\
+            .execute()
+        if not claimed.data:
+            raise ValueError("Campaign was changed concurrently; reload and retry")
+
+        self._tokens[campaign_id] = token
+        self._tasks[campaign_id] = asyncio.get_running_loop().create_task(self._run(claimed.data[0], token))
+        return self.get(campaign_id)
+
+    def pause(self, campaign_id: int) -> Dict:
+        """
+        Stop sending after the current batch; start() resumes from the cursor
+
+        The campaign is 'pausing' until the sending worker has recorded that
+        batch and marked it 'paused'.
+        """
+        return self._stop(campaign_id, 'pausing')
+
+    def cancel(self, campaign_id: int) -> Dict:
+        """Stop sending for good"""
+        return self._stop(campaign_id, 'cancelled', allowed=('draft', 'running', 'pausing', 'paused'))
+
+    def _stop(self, campaign_id: int, status: str, allowed=('running',)) -> Dict:
+        campaign = self.get(campaign_id)
+        if campaign['status'] not in allowed:
+            raise ValueError(f"Campaign is {campaign['status']}")
+        # The sending worker notices at its next progress update
+        updated = self.db.table('campaigns')\
+            .update({'status': status})\
+            .eq('id', campaign_id)\
+            .eq('status', campaign['status'])\
+            .execute()
+        if not updated.data:
+            raise ValueError("Campaign was changed concurrently; reload and retry")
+        return self.get(campaign_id)
+
+    async def shutdown(self) -> None:
+        """Pause campaigns sending in this worker so they can be resumed later"""
+        for campaign_id, task in list(self._tasks.items()):
+            task.cancel()
+            try:
+                self.db.table('campaigns')\
+                    .update({'status': 'paused'})\
+                    .eq('id', campaign_id)\
+                    .in_('status', SENDING)\
+                    .eq('run_token', self._tokens.get(campaign_id))\
+                    .execute()
+            except Exception as e:
+                print(f"⚠️ Could not pause campaign {campaign_id}: {type(e).__name__}: {str(e)}")
+        self._tasks.clear()
+        self._tokens.clear()
+
+    # -- sending --
+
+    async def _run(self, campaign: Dict, token: str) -> None:
+        campaign_id = campaign['id']
+        heartbeat = asyncio.get_running_loop().create_task(self._heartbeat(campaign_id, token))
+        try:
+            await self._send_all(campaign, token)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Campaign {campaign_id} stopped: {type(e).__name__}: {str(e)}")
+            self.db.table('campaigns')\
+                .update({'status': 'paused', 'last_error': str(e)})\
+                .eq('id', campaign_id)\
+                .in_('status', SENDING)\
+                .eq('run_token', token)\
+                .execute()
+        finally:
+            heartbeat.cancel()
+            if self._tokens.get(campaign_id) == token:
+                self._tasks.pop(campaign_id, None)
+                self._tokens.pop(campaign_id, None)
+
+    async def _heartbeat(self, campaign_id: int, token: str) -> None:
+        # Keeps the run's lease while batches, throttling and ticket-email waits go on
+        while True:
+            await asyncio.sleep(self.lease_timeout / 4)
+            try:
+                await asyncio.to_thread(follow(self._beat), campaign_id, token)
+            except Exception as e:
+                print(f"⚠️ Campaign {campaign_id} heartbeat failed: {type(e).__name__}: {str(e)}")
+
+    def _beat(self, campaign_id: int, token: str) -> None:
+        self.db.table('campaigns')\
+            .update({'heartbeat_at': _now()})\
+            .eq('id', campaign_id)\
+            .eq('run_token', token)\
+            .in_('status', SENDING)\
+            .execute()
+
+    async def _send_all(self, campaign: Dict, token: str) -> None:
+        campaign_id = campaign['id']
+        event = self.db.table('events')\
+            .select('name')\
+            .eq('id', campaign['event_id'])\
+            .single()\
+            .execute()
+        html_content = render_announcement_email(event.data['name'], campaign['body'])
+        custom_args = {'campaign_id': campaign_id, 'event_id': campaign['event_id']}
+        cursor, sent, failed = campaign['cursor_id'], campaign['sent'], campaign['failed']
+        print(f"📣 Campaign {campaign_id} sending from registration {cursor} at {self.rate_limit}/s")
+
+        while True:
+            # Ticket emails first
+            while email_service.transactional_in_flight():
+                await asyncio.sleep(0.05)
+
+            page = self._audience_query('id, name, email, ticket_id', campaign['event_id'], campaign['audience'])\
+                .gt('id', cursor)\
+                .order('id')\
+                .limit(self.batch_size)\
+                .execute()
+            if not page.data:
+                break
+
+            started = time.monotonic()
+            error = None
+            accepted = 0
+            try:
+                accepted = await email_service.send_bulk_email(
+                    campaign['subject'], html_content, page.data, custom_args
+                )
+            except BulkIncomplete as e:
+                accepted = e.sent
+                error = f"{len(e.remaining)} not sent: {str(e)}"
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e)}"
+            sent += accepted
+            failed += len(page.data) - accepted
+            if error:
+                print(f"⚠️ Campaign {campaign_id} batch failed: {error}")
+            cursor = page.data[-1]['id']
+
+            progress = {'cursor_id': cursor, 'sent': sent, 'failed': failed, 'heartbeat_at': _now()}
+            if error:
+                progress['last_error'] = error
+            updated = self.db.table('campaigns')\
+                .update(progress)\
+                .eq('id', campaign_id)\
+                .eq('run_token', token)\
+                .execute()
+            if not updated.data:
+                print(f"⏸️ Campaign {campaign_id} restarted elsewhere; stopping here")
+                return
+            if updated.data[0]['status'] == 'pausing':
+                # The batch is recorded; only now may start() pick it up again
+                self.db.table('campaigns')\
+                    .update({'status': 'paused'})\
+                    .eq('id', campaign_id)\
+                    .eq('status', 'pausing')\
+                    .eq('run_token', token)\
+                    .execute()
+                print(f"⏸️ Campaign {campaign_id} paused after {sent} sent")
+                return
+            if updated.data[0]['status'] != 'running':
+                print(f"⏸️ Campaign {campaign_id} {updated.data[0]['status']} after {sent} sent")
+                return
+
+            # Throttle: a batch of n emails takes at least n / rate_limit seconds
+            await asyncio.sleep(max(0.0, len(page.data) / self.rate_limit - (time.monotonic() - started)))
+
+        self.db.table('campaigns')\
+            .update({'status': 'completed', 'completed_at': datetime.utcnow().isoformat()})\
+            .eq('id', campaign_id)\
+            .in_('status', SENDING)\
+            .eq('run_token', token)\
+            .execute()
+        print(f"✅ Campaign {campaign_id} completed: {sent} sent, {failed} failed")
@@ -0,0 +1,523 @@
+"""
+Local write-ahead journal for check-ins while the database is unreachable
+
+While the database circuit breaker is open, QR and email check-ins are
+validated against the last known roster (a local SQLite copy of each
+event's tickets, check-ins and the hackathon participant list) and the
+admissions are appended to a journal table in the same fsync'd SQLite
+file. A background replayer flushes the journal to `registrations` and
+`check_ins` in batches once the backend answers again; replays use the
+same conditional update / ON CONFLICT DO NOTHING writes as the online path,
+so replaying an entry twice or racing an online scan is harmless.
+
+Rosters are snapshotted for every event that gets an online check-in and
+refreshed periodically while the database is reachable. Online admissions
+are noted in memory and written to the roster by the background worker,
+so the online path never waits on an fsync.
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from app.config import settings
+from app.db import get_supabase
+from app.services.circuit_breaker import CircuitBreaker, get_db_breaker, is_backend_failure
+from app.services.event_mode import INDEX_COLUMNS
+from app.services.invalidation_bus import get_invalidation_bus, CHECKINS, TICKETS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS roster_events (
+    event_id INTEGER PRIMARY KEY,
+    name TEXT,
+    refreshed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS roster_tickets (
+    ticket_id TEXT PRIMARY KEY,
+    registration_id INTEGER NOT NULL,
+    event_id INTEGER NOT NULL,
+    name TEXT,
+    email TEXT NOT NULL,
+    college TEXT,
+    checked_in INTEGER NOT NULL DEFAULT 0,
+    checked_in_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_roster_tickets_event_email ON roster_tickets(event_id, email);
+CREATE TABLE IF NOT EXISTS roster_participants (
+    email TEXT PRIMARY KEY,
+    name TEXT,
+    college TEXT
+);
+CREATE TABLE IF NOT EXISTS roster_checkins (
+    event_id INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    checked_in_at TEXT,
+    PRIMARY KEY (event_id, email)
+);
+-- status: pending -> replayed, or conflict if the database already had the check-in
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    ticket_id TEXT,
+    registration_id INTEGER,
+    source TEXT NOT NULL,
+    checked_in_at TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    UNIQUE (event_id, email)
+);
+CREATE INDEX IF NOT EXISTS idx_journal_status ON journal(status, id);
+"""
+
+BACKEND_UNAVAILABLE = {
+    'success': False,
+    'message': 'Database unreachable and no local roster for this event',
+    'reason': 'backend_unavailable'
+}
+
+
+class CheckInJournal:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        replay_interval: Optional[float] = None,
+        roster_refresh_interval: Optional[float] = None,
+        batch_size: int = 200
+    ):
+        self.path = path or settings.checkin_journal_path
+        self.breaker = breaker or get_db_breaker()
+        self.replay_interval = replay_interval or settings.checkin_journal_replay_interval
+        self.roster_refresh_interval = roster_refresh_interval or settings.checkin_roster_refresh_interval
+        self.batch_size = batch_size
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._rosters: Dict[int, float] = {}  # event id -> refreshed_at
+        self._wanted: Set[int] = set()
+        self._admitted: List[Tuple[int, str, Optional[str], str]] = []
+        self._admitted_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def db(self):
+        return get_supabase()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Journal database, opened on first use"""
+        if self._conn is not None:
+            return self._conn
+        with self._lock:
+            if self._conn is None:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.execute('PRAGMA journal_mode=WAL')
+                # Every admission commit is fsync'd before the scan is answered
+                conn.execute('PRAGMA synchronous=FULL')
+                conn.executescript(SCHEMA)
+                self._rosters = {
+                    row['event_id']: row['refreshed_at']
+                    for row in conn.execute('SELECT event_id, refreshed_at FROM roster_events')
+                }
+                self._conn = conn
+            return self._conn
+
+    # -- roster --
+
+    def track_event(self, event_id: int) -> None:
+        """Keep a roster for this event (snapshotted by the background worker)"""
+        if event_id not in self._rosters:
+            self._wanted.add(event_id)
+
+    def has_roster(self, event_id: int) -> bool:
+        self.conn  # opening the journal loads the known rosters
+        return event_id in self._rosters
+
+    def refresh_roster(self, event_id: int) -> Dict:
+        """
+        Snapshot an event's tickets and check-ins plus all hackathon
+        participants into the local roster
+
+        Admissions still pending in the journal stay marked as checked in.
+        """
+        event = self.db.table('events')\
+            .select('id, name')\
+            .eq('id', event_id)\
+            .single()\
+            .execute()
+        if not event.data:
+            raise ValueError("Event not found")
+
+        tickets = self._fetch_all('registrations', INDEX_COLUMNS, event_id=event_id)
+        check_ins = self._fetch_all('check_ins', 'id, email, checked_in_at', event_id=event_id)
+        participants = self._fetch_all('hackathon_participants', 'id, email, name, college')
+        refreshed_at = time.time()
+
+        with self._lock, self.conn as conn:
+            conn.execute('DELETE FROM roster_tickets WHERE event_id = ?', (event_id,))
+            conn.executemany(
+                'INSERT OR REPLACE INTO roster_tickets VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (r['ticket_id'], r['id'], r['event_id'], r['name'], r['email'], r.get('college'),
+                     int(bool(r.get('checked_in'))), r.get('checked_in_at'))
+                    for r in tickets if r.get('ticket_id')
+                ]
+            )
+            conn.execute('DELETE FROM roster_checkins WHERE event_id = ?', (event_id,))
+            conn.executemany(
+                'INSERT OR IGNORE INTO roster_checkins VALUES (?, ?, ?)',
+                [(event_id, r['email'], r.get('checked_in_at')) for r in check_ins]
+            )
+            conn.execute('DELETE FROM roster_participants')
+            conn.executemany(
+                'INSERT OR REPLACE INTO roster_participants VALUES (?, ?, ?)',
+                [(r['email'], r['name'], r.get('college')) for r in participants]
+            )
+            # Re-apply admissions the database has not seen yet
+            conn.execute("""
+                UPDATE roster_tickets SET checked_in = 1, checked_in_at = (
+                    SELECT checked_in_at FROM journal WHERE journal.ticket_id = roster_tickets.ticket_id
+                )
+                WHERE ticket_id IN (SELECT ticket_id FROM journal WHERE event_id = ? AND status = 'pending')
+            """, (event_id,))
+            conn.execute("""
+                INSERT OR IGNORE INTO roster_checkins
+                SELECT event_id, email, checked_in_at FROM journal WHERE event_id = ? AND status = 'pending'
+            """, (event_id,))
+            conn.execute(
+                'INSERT OR REPLACE INTO roster_events VALUES (?, ?, ?)',
+                (event_id, event.data['name'], refreshed_at)
+            )
+            self._rosters[event_id] = refreshed_at
+            self._wanted.discard(event_id)
+        # Admissions noted while the snapshot was being fetched
+        self.persist_admitted()
+
+        print(f"📋 Roster for event {event_id}: {len(tickets)} tickets, {len(check_ins)} check-ins, {len(participants)} participants")
+        return {
+            'event_id': event_id,
+            'tickets': len(tickets),
+            'check_ins': len(check_ins),
+            'participants': len(participants)
+        }
+
+    def _fetch_all(self, table: str, columns: str, **filters) -> List[Dict]:
+        rows = []
+        last_id = 0
+        while True:
+            query = self.db.table(table).select(columns)
+            for column, value in filters.items():
+                query = query.eq(column, value)
+            page = query.gt('id', last_id).order('id').limit(1000).execute()
+            rows.extend(page.data)
+            if len(page.data) < 1000:
+                return rows
+            last_id = page.data[-1]['id']
+
+    def mark_admitted(self, event_id: int, email: str, ticket_id: Optional[str], checked_in_at: Optional[str] = None) -> None:
+        """
+        Note an online admission so degraded mode won't repeat it
+
+        Only kept in memory here; persist_admitted() writes it to the roster
+        from the background worker (or before the next degraded lookup).
+        """
+        if not self.has_roster(event_id):
+            return
+        checked_in_at = checked_in_at or datetime.utcnow().isoformat()
+        with self._admitted_lock:
+            self._admitted.append((event_id, email, ticket_id, checked_in_at))
+
+    def persist_admitted(self) -> int:
+        """Write admissions noted by mark_admitted() to the roster"""
+        with self._admitted_lock:
+            admitted, self._admitted = self._admitted, []
+        if not admitted:
+            return 0
+        with self._lock, self.conn as conn:
+            conn.executemany(
+                'UPDATE roster_tickets SET checked_in = 1, checked_in_at = ? WHERE ticket_id = ? AND checked_in = 0',
+                [(checked_in_at, ticket_id) for _, _, ticket_id, checked_in_at in admitted if ticket_id]
+            )
+            conn.executemany(
+                'INSERT OR IGNORE INTO roster_checkins VALUES (?, ?, ?)',
+                [(event_id, email, checked_in_at) for event_id, email, _, checked_in_at in admitted]
+            )
+        return len(admitted)
+
+    # -- degraded check-in --
+
+    def check_in_by_qr(self, ticket_id: str, event_id: int) -> Dict:
+        """Same result dict as CheckInService.check_in_by_qr, from the local roster"""
+        if not self.has_roster(event_id):
+            return dict(BACKEND_UNAVAILABLE)
+
+        self.persist_admitted()
+        with self._lock:
+            ticket = self.conn.execute('SELECT * FROM roster_tickets WHERE ticket_id = ?', (ticket_id,)).fetchone()
+            if ticket is None:
+                return {
+                    'success': False,
+                    'message': 'Invalid ticket',
+                    'reason': 'not_found',
+                    'degraded': True
+                }
+
+            if ticket['event_id'] != event_id:
+                return {
+                    'success': False,
+                    'message': f"This ticket is for {self._event_name(ticket['event_id'])}, not the current event",
+                    'reason': 'wrong_event',
+                    'degraded': True
+                }
+
+            if ticket['checked_in']:
+                return {
+                    'success': False,
+                    'message': f"Already checked in at {ticket['checked_in_at']}",
+                    'reason': 'already_checked_in',
+                    'participant_name': ticket['name'],
+                    'checked_in_at': ticket['checked_in_at'],
+                    'degraded': True
+                }
+
+            checked_in_at = datetime.utcnow().isoformat()
+            with self.conn as conn:
+                conn.execute(
+                    'UPDATE roster_tickets SET checked_in = 1, checked_in_at = ? WHERE ticket_id = ?',
+                    (checked_in_at, ticket_id)
+                )
+                self._append(conn, event_id, ticket['email'], ticket_id, ticket['registration_id'], 'qr', checked_in_at)
+
+        # Event mode indexes elsewhere mark it too (queued until the bus reconnects)
+        get_invalidation_bus().publish(TICKETS, ticket_id)
+        return {
+            'success': True,
+            'message': 'Check-in successful!',
+            'participant_name': ticket['name'],
+            'email': ticket['email'],
+            'college': ticket['college'],
+            'event_name': self._event_name(event_id),
+            'degraded': True
+        }
+
+    def check_in_by_email(self, email: str, event_id: int) -> Dict:
+        """Same result dict as CheckInService.check_in_by_email, from the local roster"""
+        if not self.has_roster(event_id):
+            return dict(BACKEND_UNAVAILABLE)
+
+        email = email.strip().lower()
+        self.persist_admitted()
+        with self._lock:
+            participant = self.conn.execute(
+                'SELECT * FROM roster_participants WHERE email = ?', (email,)
+            ).fetchone()
+            if participant is None:
+                has_ticket = self.conn.execute(
+                    'SELECT 1 FROM roster_tickets WHERE event_id = ? AND email = ?', (event_id, email)
+                ).fetchone()
+                if has_ticket:
+                    return {
+                        'success': False,
+                        'message': 'This participant has a ticket. Please use QR code scanner.',
+                        'reason': 'has_ticket',
+                        'degraded': True
+                    }
+                return {
+                    'success': False,
+                    'message': 'Email not found in hackathon participants or event registrations',
+                    'reason': 'not_found',
+                    'degraded': True
+                }
+
+            existing = self.conn.execute(
+                'SELECT checked_in_at FROM roster_checkins WHERE event_id = ? AND email = ?', (event_id, email)
+            ).fetchone()
+            if existing:
+                return {
+                    'success': False,
+                    'message': f"Already checked in at {existing['checked_in_at']}",
+                    'reason': 'already_checked_in',
+                    'checked_in_at': existing['checked_in_at'],
+                    'degraded': True
+                }
+
+            with self.conn as conn:
+                self._append(conn, event_id, email, None, None, 'csv', datetime.utcnow().isoformat())
+
+        return {
+            'success': True,
+            'message': 'Check-in successful! (Hackathon participant - free entry)',
+            'participant_name': participant['name'],
+            'email': participant['email'],
+            'college': participant['college'],
+            'source': 'hackathon_csv',
+            'degraded': True
+        }
+
+    def _append(self, conn: sqlite3.Connection, event_id: int, email: str, ticket_id: Optional[str],
+                registration_id: Optional[int], source: str, checked_in_at: str) -> None:
+        # Caller holds self._lock and an open transaction on conn
+        conn.execute(
+            'INSERT OR IGNORE INTO journal (event_id, email, ticket_id, registration_id, source, checked_in_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (event_id, email, ticket_id, registration_id, source, checked_in_at)
+        )
+        conn.execute('INSERT OR IGNORE INTO roster_checkins VALUES (?, ?, ?)', (event_id, email, checked_in_at))
+
+    def _event_name(self, event_id: int) -> Optional[str]:
+        row = self.conn.execute('SELECT name FROM roster_events WHERE event_id = ?', (event_id,)).fetchone()
+        return row['name'] if row else None
+
+    # -- replay --
+
+    def pending(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM journal WHERE status = 'pending'").fetchone()[0]
+
+    def replay(self) -> Dict:
+        """
+        Flush pending journal entries to the database in batches
+
+        Stops at the first backend failure (entries stay pending). Entries the
+        database already had (admitted online by another worker) are kept as
+        status 'conflict' for review.
+        """
+        replayed = conflicts = 0
+        while self.breaker.allow():
+            with self._lock:
+                batch = [dict(row) for row in self.conn.execute(
+                    "SELECT * FROM journal WHERE status = 'pending' ORDER BY id LIMIT ?", (self.batch_size,)
+                )]
+            if not batch:
+                # allow() may have claimed the half-open probe; release it
+                if self.breaker.state != 'closed':
+                    self._probe()
+                break
+            try:
+                inserted = self._write_batch(batch)
+            except Exception as e:
+                if not is_backend_failure(e):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                print(f"⚠️ Check-in journal replay failed, will retry: {type(e).__name__}: {str(e)}")
+                break
+            self.breaker.record_success()
+
+            with self._lock, self.conn as conn:
+                conn.executemany(
+                    'UPDATE journal SET status = ? WHERE id = ?',
+                    [('replayed' if (item['event_id'], item['email']) in inserted else 'conflict', item['id'])
+                     for item in batch]
+                )
+            replayed += sum(1 for item in batch if (item['event_id'], item['email']) in inserted)
+            conflicts += sum(1 for item in batch if (item['event_id'], item['email']) not in inserted)
+
+        if replayed or conflicts:
+            print(f"🔁 Check-in journal replayed {replayed} admissions ({conflicts} already recorded)")
+        return {'replayed': replayed, 'conflicts': conflicts, 'pending': self.pending()}
+
+    def _write_batch(self, batch: List[Dict]) -> Set:
+        # One conditional update for the whole batch (migrations/007), as in
+        # event mode; rows checked in elsewhere keep their timestamp
+        admissions = [
+            {'registration_id': item['registration_id'], 'checked_in_at': item['checked_in_at']}
+            for item in batch if item['registration_id'] is not None
+        ]
+        if admissions:
+            self.db.rpc('admit_registrations', {'p_admissions': admissions}).execute()
+
+        result = self.db.table('check_ins')\
+            .upsert([
+                {
+                    'event_id': item['event_id'],
+                    'email': item['email'],
+                    'ticket_id': item['ticket_id'],
+                    'source': item['source'],
+                    'checked_in_at': item['checked_in_at']
+                }
+                for item in batch
+            ], on_conflict='event_id,email', ignore_duplicates=True)\
+            .execute()
+
+        for event_id in {item['event_id'] for item in batch}:
+            get_invalidation_bus().publish(CHECKINS, event_id)
+        return {(row['event_id'], row['email']) for row in result.data or []}
+
+    def _probe(self) -> None:
+        try:
+            self.db.table('events').select('id').limit(1).execute()
+        except Exception as e:
+            if is_backend_failure(e):
+                self.breaker.record_failure()
+                return
+        self.breaker.record_success()
+
+    # -- background worker --
+
+    def start(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, name="checkin-journal", daemon=True)
+        self._worker.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.replay_interval):
+            try:
+                self.persist_admitted()
+                if self.pending() or self.breaker.state != 'closed':
+                    self.replay()
+                if self.breaker.state == 'closed':
+                    self._refresh_stale()
+            except Exception as e:
+                print(f"⚠️ Check-in journal worker error: {type(e).__name__}: {str(e)}")
+
+    def _refresh_stale(self) -> None:
+        now = time.time()
+        stale = [eid for eid, at in self._rosters.items() if now - at >= self.roster_refresh_interval]
+        for event_id in list(self._wanted) + stale:
+            try:
+                self.refresh_roster(event_id)
+            except Exception as e:
+                if is_backend_failure(e):
+                    self.breaker.record_failure()
+                    return
+                # Event deleted (or unreadable); stop tracking it
+                print(f"⚠️ Dropping roster for event {event_id}: {type(e).__name__}: {str(e)}")
+                self._wanted.discard(event_id)
+                self._forget_roster(event_id)
+
+    def _forget_roster(self, event_id: int) -> None:
+        with self._lock, self.conn as conn:
+            conn.execute('DELETE FROM roster_events WHERE event_id = ?', (event_id,))
+            conn.execute('DELETE FROM roster_tickets WHERE event_id = ?', (event_id,))
+            conn.execute('DELETE FROM roster_checkins WHERE event_id = ?', (event_id,))
+            self._rosters.pop(event_id, None)
+
+    def status(self) -> Dict:
+        with self._lock:
+            counts = dict(self.conn.execute('SELECT status, COUNT(*) FROM journal GROUP BY status').fetchall())
+        return {
+            'breaker': self.breaker.status(),
+            'pending': counts.get('pending', 0),
+            'replayed': counts.get('replayed', 0),
+            'conflicts': counts.get('conflict', 0),
+            'roster_events': sorted(self._rosters)
+        }
+
+    def shutdown(self) -> None:
+        """Stop the worker, attempting one last replay"""
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join(timeout=5)
+            self._worker = None
+        if self._conn is not None:
+            self.persist_admitted()
+            try:
+                self.replay()
+            except Exception as e:
+                print(f"⚠️ Check-in journal replay on shutdown failed: {type(e).__name__}: {str(e)}")
+            self._conn.close()
+            self._conn = None
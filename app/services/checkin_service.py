@@ -1,13 +1,87 @@
-from app.db import get_supabase
+from app.db import get_supabase, read
 from app.services.csv_service import CSVService
+from app.services.event_mode import EventModeService
+from app.services.archive_service import ArchiveService
+from app.services.checkin_journal import CheckInJournal
+from app.services.circuit_breaker import is_backend_failure
+from app.services.invalidation_bus import get_invalidation_bus, CHECKINS, TICKETS
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Callable, Optional, Dict, List
+
+
+# Max values per `in_` filter, keeps PostgREST query strings short
+IN_CHUNK_SIZE = 200
+
+
+def _chunks(items: List, size: int = IN_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 
 class CheckInService:
-    def __init__(self):
-        self.db = get_supabase()
-        self.csv_service = CSVService()
+    # check_ins upserts rely on idx_checkins_unique_event_email
+    # (migrations/001_check_ins_unique_event_email.sql)
+    CHECK_IN_CONFLICT = 'event_id,email'
+
+    def __init__(
+        self,
+        csv_service: Optional[CSVService] = None,
+        event_mode: Optional[EventModeService] = None,
+        archive: Optional[ArchiveService] = None,
+        journal: Optional[CheckInJournal] = None
+    ):
+        self.csv_service = csv_service or CSVService()
+        self.event_mode = event_mode
+        self.archive = archive
+        self.journal = journal
+
+    def _archived(self, event_id: int) -> Optional[Dict]:
+        return self.archive.get_summary(event_id) if self.archive is not None else None
+
+    @property
+    def db(self):
+        """Supabase client, resolved on use so construction never connects"""
+        return get_supabase()
+    
+    def _record_check_ins(self, rows: List[Dict]) -> List[Dict]:
+        """
+        Insert check-ins with ON CONFLICT (event_id, email) DO NOTHING
+        
+        Returns:
+            Only the rows that were actually inserted; an email missing from
+            the result was already checked in for that event
+        """
+        result = self.db.table('check_ins')\
+            .upsert(rows, on_conflict=self.CHECK_IN_CONFLICT, ignore_duplicates=True)\
+            .execute()
+        return result.data or []
+    
+    def _guarded(self, event_id: int, online: Callable[[], Dict], degraded: Callable[[], Dict]) -> Dict:
+        """
+        Run `online`, or `degraded` (the local journal) while the database
+        circuit is open or when the backend fails mid-request
+        """
+        if self.journal is None:
+            return online()
+        breaker = self.journal.breaker
+        if not breaker.allow():
+            return degraded()
+        try:
+            result = online()
+        except Exception as e:
+            if not is_backend_failure(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            print(f"⚠️ Check-in falling back to local journal: {type(e).__name__}: {str(e)}")
+            return degraded()
+        breaker.record_success()
+        self.journal.track_event(event_id)
+        return result
+    
+    def _mark_admitted(self, event_id: int, email: str, ticket_id: Optional[str]) -> None:
+        if self.journal is not None:
+            self.journal.mark_admitted(event_id, email, ticket_id)
     
     def check_in_by_qr(self, ticket_id: str, event_id: int) -> Dict:
         """
@@ -16,6 +90,19 @@ class CheckInService:
         Returns:
             Dict with check-in result and participant info
         """
+        # 0. Answer from the in-memory index if the ticket's event is live
+        if self.event_mode is not None:
+            result = self.event_mode.check_in(ticket_id, event_id)
+            if result is not None:
+                return result
+        
+        return self._guarded(
+            event_id,
+            lambda: self._check_in_by_qr_online(ticket_id, event_id),
+            lambda: self.journal.check_in_by_qr(ticket_id, event_id)
+        )
+    
+    def _check_in_by_qr_online(self, ticket_id: str, event_id: int) -> Dict:
         # 1. Find registration by ticket ID
         registration = self.db.table('registrations')\
             .select('*, events(*)')\
@@ -50,12 +137,28 @@ class CheckInService:
                 'checked_in_at': reg['checked_in_at']
             }
         
-        # 4. Mark as checked in
-        self.db.table('registrations')\
+        # 4. Mark as checked in (only if still unchecked, so concurrent scans
+        #    of the same ticket admit exactly once)
+        updated = self.db.table('registrations')\
             .update({'checked_in': True, 'checked_in_at': datetime.utcnow().isoformat()})\
             .eq('id', reg['id'])\
+            .eq('checked_in', False)\
             .execute()
         
+        if not updated.data:
+            current = self.db.table('registrations')\
+                .select('checked_in_at')\
+                .eq('id', reg['id'])\
+                .single()\
+                .execute()
+            return {
+                'success': False,
+                'message': f"Already checked in at {current.data['checked_in_at']}",
+                'reason': 'already_checked_in',
+                'participant_name': reg['name'],
+                'checked_in_at': current.data['checked_in_at']
+            }
+        
         # 5. Record in check_ins table
         check_in_data = {
             'event_id': event_id,
@@ -63,7 +166,11 @@ class CheckInService:
             'ticket_id': ticket_id,
             'source': 'qr'
         }
-        self.db.table('check_ins').insert(check_in_data).execute()
+        self._record_check_ins([check_in_data])
+        get_invalidation_bus().publish(CHECKINS, event_id)
+        # Event mode indexes in other workers would otherwise admit it again
+        get_invalidation_bus().publish(TICKETS, ticket_id)
+        self._mark_admitted(event_id, reg['email'], ticket_id)
         
         return {
             'success': True,
@@ -82,7 +189,13 @@ class CheckInService:
             Dict with check-in result
         """
         email = email.strip().lower()
-        
+        return self._guarded(
+            event_id,
+            lambda: self._check_in_by_email_online(email, event_id),
+            lambda: self.journal.check_in_by_email(email, event_id)
+        )
+    
+    def _check_in_by_email_online(self, email: str, event_id: int) -> Dict:
         # 1. Check if email exists in hackathon participants
         is_hackathon = self.csv_service.check_participant_exists(email)
         
@@ -108,33 +221,32 @@ class CheckInService:
                 'reason': 'has_ticket'
             }
         
-        # 2. Check if already checked in for this event
-        existing_checkin = self.db.table('check_ins')\
-            .select('*')\
-            .eq('email', email)\
-            .eq('event_id', event_id)\
-            .execute()
-        
-        if existing_checkin.data:
+        # 2. Record check-in; an empty result means already checked in
+        check_in_data = {
+            'event_id': event_id,
+            'email': email,
+            'ticket_id': None,
+            'source': 'csv'
+        }
+        if not self._record_check_ins([check_in_data]):
+            existing_checkin = self.db.table('check_ins')\
+                .select('checked_in_at')\
+                .eq('email', email)\
+                .eq('event_id', event_id)\
+                .execute()
+            checked_in_at = existing_checkin.data[0]['checked_in_at'] if existing_checkin.data else None
             return {
                 'success': False,
-                'message': f"Already checked in at {existing_checkin.data[0]['checked_in_at']}",
+                'message': f"Already checked in at {checked_in_at}",
                 'reason': 'already_checked_in',
-                'checked_in_at': existing_checkin.data[0]['checked_in_at']
+                'checked_in_at': checked_in_at
             }
+        get_invalidation_bus().publish(CHECKINS, event_id)
+        self._mark_admitted(event_id, email, None)
         
         # 3. Get participant details
         participant = self.csv_service.get_participant_by_email(email)
         
-        # 4. Record check-in
-        check_in_data = {
-            'event_id': event_id,
-            'email': email,
-            'ticket_id': None,
-            'source': 'csv'
-        }
-        self.db.table('check_ins').insert(check_in_data).execute()
-        
         return {
             'success': True,
             'message': 'Check-in successful! (Hackathon participant - free entry)',
@@ -144,37 +256,190 @@ class CheckInService:
             'source': 'hackathon_csv'
         }
     
-    def get_event_checkin_stats(self, event_id: int) -> Dict:
-        """Get check-in statistics for an event"""
+    def check_in_by_email_batch(self, emails: List[str], event_id: int) -> Dict:
+        """
+        Check-in many hackathon participants by email at once
+
+        Same rules and reason codes as check_in_by_email, but resolved with
+        set-based queries and a single bulk insert. An email repeated in the
+        batch is reported as already_checked_in after its first occurrence.
+
+        Returns:
+            Dict with per-email results (in request order) and totals; every
+            result has `input` (the address as sent) and `email` (normalised)
+        """
+        return self._guarded(
+            event_id,
+            lambda: self._check_in_by_email_batch_online(emails, event_id),
+            lambda: self._check_in_by_email_batch_degraded(emails, event_id)
+        )
+    
+    def _check_in_by_email_batch_degraded(self, emails: List[str], event_id: int) -> Dict:
+        results = []
+        for original in emails:
+            result = self.journal.check_in_by_email(original, event_id)
+            result['input'] = original
+            result['email'] = original.strip().lower()
+            results.append(result)
+        return self._batch_totals(event_id, results)
+    
+    def _batch_totals(self, event_id: int, results: List[Dict]) -> Dict:
+        checked_in = sum(1 for result in results if result['success'])
+        return {
+            'event_id': event_id,
+            'total': len(results),
+            'checked_in': checked_in,
+            'failed': len(results) - checked_in,
+            'results': results
+        }
+    
+    def _check_in_by_email_batch_online(self, emails: List[str], event_id: int) -> Dict:
+        normalized = [email.strip().lower() for email in emails]
+        unique = [email for email in dict.fromkeys(normalized) if email]
         
+        # 1. Hackathon participants among the batch
+        participants = {}
+        for chunk in _chunks(unique):
+            rows = self.db.table('hackathon_participants')\
+                .select('*')\
+                .in_('email', chunk)\
+                .execute()
+            participants.update({row['email']: row for row in rows.data})
+        
+        # 2. Non-participants who hold a regular ticket for this event
+        others = [email for email in unique if email not in participants]
+        ticket_holders = set()
+        for chunk in _chunks(others):
+            rows = self.db.table('registrations')\
+                .select('email')\
+                .eq('event_id', event_id)\
+                .in_('email', chunk)\
+                .execute()
+            ticket_holders.update(row['email'] for row in rows.data)
+        
+        # 3. Participants already checked in for this event
+        checked_in_at = {}
+        for chunk in _chunks(list(participants)):
+            rows = self.db.table('check_ins')\
+                .select('email, checked_in_at')\
+                .eq('event_id', event_id)\
+                .in_('email', chunk)\
+                .execute()
+            for row in rows.data:
+                checked_in_at.setdefault(row['email'], row['checked_in_at'])
+        
+        # 4. Record all new check-ins in one insert-or-ignore
+        new_emails = [email for email in participants if email not in checked_in_at]
+        admitted = set()
+        if new_emails:
+            inserted = self._record_check_ins([
+                {'event_id': event_id, 'email': email, 'ticket_id': None, 'source': 'csv'}
+                for email in new_emails
+            ])
+            for row in inserted:
+                admitted.add(row['email'])
+                checked_in_at[row['email']] = row.get('checked_in_at')
+            
+            # Emails checked in concurrently between steps 3 and 4
+            raced = [email for email in new_emails if email not in admitted]
+            for chunk in _chunks(raced):
+                rows = self.db.table('check_ins')\
+                    .select('email, checked_in_at')\
+                    .eq('event_id', event_id)\
+                    .in_('email', chunk)\
+                    .execute()
+                for row in rows.data:
+                    checked_in_at[row['email']] = row['checked_in_at']
+            
+            if admitted:
+                get_invalidation_bus().publish(CHECKINS, event_id)
+            for email in admitted:
+                self._mark_admitted(event_id, email, None)
+        
+        # 5. Per-email outcomes, in request order
+        results = []
+        seen = set()
+        for original, email in zip(emails, normalized):
+            if email in participants:
+                participant = participants[email]
+                if email in admitted and email not in seen:
+                    result = {
+                        'success': True,
+                        'message': 'Check-in successful! (Hackathon participant - free entry)',
+                        'participant_name': participant['name'],
+                        'email': participant['email'],
+                        'college': participant.get('college'),
+                        'source': 'hackathon_csv'
+                    }
+                else:
+                    result = {
+                        'success': False,
+                        'message': f"Already checked in at {checked_in_at.get(email)}",
+                        'reason': 'already_checked_in',
+                        'email': email,
+                        'checked_in_at': checked_in_at.get(email)
+                    }
+            elif email in ticket_holders:
+                result = {
+                    'success': False,
+                    'message': 'This participant has a ticket. Please use QR code scanner.',
+                    'reason': 'has_ticket',
+                    'email': email
+                }
+            else:
+                result = {
+                    'success': False,
+                    'message': 'Email not found in hackathon participants or event registrations',
+                    'reason': 'not_found',
+                    'email': email
+                }
+            result['input'] = original
+            result['email'] = email
+            seen.add(email)
+            results.append(result)
+        
+        return self._batch_totals(event_id, results)
+    
+    def get_event_checkin_stats(self, event_id: int, stale_ok: bool = False) -> Dict:
+        """
+        Get check-in statistics for an event
+        
+        With stale_ok the counts may come from the read replica (see app/db.py).
+        """
+        summary = self._archived(event_id)
+        if summary:
+            return self.archive.checkin_stats(summary)
+        return read(lambda db: self._checkin_stats(db, event_id), stale_ok)
+    
+    def _checkin_stats(self, db, event_id: int) -> Dict:
         # Total registrations (with tickets)
-        registrations = self.db.table('registrations')\
+        registrations = db.table('registrations')\
             .select('id', count='exact')\
             .eq('event_id', event_id)\
             .execute()
         
         # Checked in registrations
-        checked_in_registrations = self.db.table('registrations')\
+        checked_in_registrations = db.table('registrations')\
             .select('id', count='exact')\
             .eq('event_id', event_id)\
             .eq('checked_in', True)\
             .execute()
         
         # Check-ins from CSV (hackathon participants)
-        csv_checkins = self.db.table('check_ins')\
+        csv_checkins = db.table('check_ins')\
             .select('id', count='exact')\
             .eq('event_id', event_id)\
             .eq('source', 'csv')\
             .execute()
         
         # All check-ins
-        total_checkins = self.db.table('check_ins')\
+        total_checkins = db.table('check_ins')\
             .select('id', count='exact')\
             .eq('event_id', event_id)\
             .execute()
         
         # Get event details
-        event = self.db.table('events')\
+        event = db.table('events')\
             .select('*')\
             .eq('id', event_id)\
             .single()\
@@ -190,13 +455,21 @@ class CheckInService:
             'remaining_capacity': event.data['capacity'] - total_checkins.count
         }
     
-    def get_recent_checkins(self, event_id: int, limit: int = 10) -> list:
-        """Get recent check-ins for an event"""
-        checkins = self.db.table('check_ins')\
-            .select('*')\
-            .eq('event_id', event_id)\
-            .order('checked_in_at', desc=True)\
-            .limit(limit)\
-            .execute()
+    def get_recent_checkins(self, event_id: int, limit: int = 10, stale_ok: bool = False) -> list:
+        """Get recent check-ins for an event (from the read replica with stale_ok)"""
+        if self._archived(event_id):
+            rows = self.archive.read('check_ins', event_id)
+            rows.sort(key=lambda r: r['checked_in_at'] or '', reverse=True)
+            return rows[:limit]
+        
+        checkins = read(
+            lambda db: db.table('check_ins')\
+                .select('*')\
+                .eq('event_id', event_id)\
+                .order('checked_in_at', desc=True)\
+                .limit(limit)\
+                .execute(),
+            stale_ok
+        )
         
         return checkins.data
\ No newline at end of file
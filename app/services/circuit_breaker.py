@@ -0,0 +1,102 @@
+"""
+Circuit breaker for calls to the Supabase backend
+
+After `failure_threshold` consecutive backend failures (network errors,
+timeouts, 5xx / connection-level PostgREST errors) the breaker opens and
+callers skip the database entirely. After `reset_timeout` seconds one call
+is let through as a probe: success closes the breaker, failure re-opens it.
+Application-level errors (bad input, constraint violations) never count.
+"""
+import threading
+import time
+from typing import Dict, Optional
+from app.config import settings
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def is_backend_failure(exc: BaseException) -> bool:
+    """True if `exc` means the backend is unreachable or unhealthy"""
+    import httpx
+    from postgrest.exceptions import APIError
+
+    if isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(exc, APIError):
+        code = str(exc.code or '')
+        # PGRST000-003: PostgREST cannot reach the database
+        return code in ('500', '502', '503', '504') or code.startswith('PGRST00')
+    return False
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None, name: str = 'Database'):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.db_breaker_failure_threshold
+        self.reset_timeout = settings.db_breaker_reset_timeout if reset_timeout is None else reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Whether the caller may try the backend now
+
+        While open, a single probe is allowed once reset_timeout has passed.
+        """
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"✅ {self.name} reachable again, circuit closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    print(f"⚠️ {self.name} unreachable after {self._failures} failures, circuit open")
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def status(self) -> Dict:
+        state = self.state
+        with self._lock:
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'open_for': round(time.monotonic() - self._opened_at, 1) if self._state == OPEN else 0.0
+            }
+
+
+_breaker: Optional[CircuitBreaker] = None
+
+
+def get_db_breaker() -> CircuitBreaker:
+    """Get the process-wide circuit breaker for the Supabase client"""
+    global _breaker
+    if _breaker is None:
+        _breaker = CircuitBreaker()
+    return _breaker
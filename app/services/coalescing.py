@@ -0,0 +1,89 @@
+"""
+Request coalescing for hot read and scan paths
+
+- single-flight: concurrent identical calls (same key) share one backend
+  call; the others await its result
+- scan dedupe: a check-in for the same ticket and event within a short
+  window returns the previous outcome without touching the database
+"""
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+from cachetools import TTLCache
+from app.config import settings
+from app.services.profiler import follow
+
+
+class RequestCoalescer:
+    def __init__(self, scan_window: Optional[float] = None, max_entries: int = 10000):
+        """
+        Args:
+            scan_window: Seconds a check-in outcome is reused for repeat scans
+                (0 disables scan dedupe)
+        """
+        self.scan_window = settings.scan_dedupe_window if scan_window is None else scan_window
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._recent: Optional[TTLCache] = (
+            TTLCache(maxsize=max_entries, ttl=self.scan_window) if self.scan_window > 0 else None
+        )
+        self._recent_lock = threading.Lock()
+        self.stats = {'calls': 0, 'coalesced': 0, 'deduplicated': 0}
+
+    async def single_flight(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run the blocking fn() in a worker thread, sharing the result with any
+        concurrent caller using the same key
+        """
+        self.stats['calls'] += 1
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await asyncio.to_thread(follow(fn))
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an error nobody else awaited isn't logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def check_in(self, ticket_id: str, event_id: int, fn: Callable[[], Dict]) -> Dict:
+        """
+        Coalesced QR check-in
+
+        Repeats within the scan window get the first outcome, marked with
+        'deduplicated': True; concurrent repeats share one database call.
+        """
+        key = ('checkin', ticket_id, event_id)
+        if self._recent is not None:
+            with self._recent_lock:
+                cached = self._recent.get(key)
+            if cached is not None:
+                self.stats['deduplicated'] += 1
+                return {**cached, 'deduplicated': True}
+
+        result = await self.single_flight(key, fn)
+
+        if self._recent is not None:
+            with self._recent_lock:
+                self._recent[key] = result
+        return result
+
+    def forget_event(self, event_id: Optional[str]) -> None:
+        """Drop remembered scan outcomes (all, or for one event)"""
+        if self._recent is None:
+            return
+        with self._recent_lock:
+            if event_id is None:
+                self._recent.clear()
+                return
+            for key in [k for k in self._recent.keys() if str(k[2]) == event_id]:
+                self._recent.pop(key, None)
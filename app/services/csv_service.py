@@ -1,14 +1,61 @@
 import csv
+import hashlib
 import io
-from typing import List, Dict
-from app.db import get_supabase
+from typing import List, Dict, Optional, Tuple
+from app.db import get_supabase, read
 from app.models.checkin import HackathonParticipantCreate
-from email_validator import validate_email, EmailNotValidError
+from app.services.email_validation import EmailValidationEngine
+from app.services.invalidation_bus import get_invalidation_bus, PARTICIPANTS, PARTICIPANTS_ADDED
+
+
+# Rows per insert/upsert/delete request during sync
+SYNC_BATCH_SIZE = 500
+
+# Columns compared when deciding whether a participant changed
+CONTENT_FIELDS = ('name', 'college', 'phone')
+
+
+def content_hash(participant: Dict) -> str:
+    """Hash of the participant fields that a re-sync may change"""
+    joined = '\x1f'.join(participant.get(field) or '' for field in CONTENT_FIELDS)
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()
+
+
+def _participant_from_row(row: Dict, email: str) -> Dict:
+    return {
+        'name': (row.get('name') or '').strip() or email.split('@')[0],
+        'email': email,
+        'college': (row.get('college') or '').strip() or None,
+        'phone': (row.get('phone') or '').strip() or None
+    }
 
 
 class CSVService:
-    def __init__(self):
-        self.db = get_supabase()
+    def __init__(self, validation_engine: Optional[EmailValidationEngine] = None):
+        self.validation_engine = validation_engine or EmailValidationEngine()
+    
+    @property
+    def db(self):
+        """Supabase client, resolved on use so construction never connects"""
+        return get_supabase()
+    
+    def _read_csv(self, file_content: bytes) -> Tuple[List[Tuple[int, Dict]], List[str], Dict[str, Optional[str]]]:
+        """
+        Decode a participants CSV and validate every email up front
+        
+        Returns:
+            (rows as (row_num, row), normalized email per row,
+             validation error per unique email or None if valid)
+        """
+        content = file_content.decode('utf-8')
+        reader = csv.DictReader(io.StringIO(content))
+        rows = list(enumerate(reader, start=2))  # Start from 2 (1 is header)
+        
+        # Syntax per row, DNS once per domain
+        emails = [(row.get('email') or '').strip().lower() for _, row in rows]
+        present = list(dict.fromkeys(email for email in emails if email))
+        validation_errors = dict(zip(present, self.validation_engine.validate(present)))
+        return rows, emails, validation_errors
     
     def parse_csv(self, file_content: bytes) -> Dict:
         """
@@ -29,26 +76,18 @@ class CSVService:
         }
         
         try:
-            # Decode bytes to string
-            content = file_content.decode('utf-8')
-            csv_file = io.StringIO(content)
-            reader = csv.DictReader(csv_file)
+            rows, emails, validation_errors = self._read_csv(file_content)
             
-            for row_num, row in enumerate(reader, start=2):  # Start from 2 (1 is header)
+            for (row_num, row), email in zip(rows, emails):
                 results['total_rows'] += 1
                 
                 try:
-                    # Clean and validate email
-                    email = row.get('email', '').strip().lower()
                     if not email:
                         results['errors'] += 1
                         results['error_details'].append(f"Row {row_num}: Missing email")
                         continue
                     
-                    # Validate email format
-                    try:
-                        validate_email(email)
-                    except EmailNotValidError:
+                    if validation_errors.get(email):
                         results['errors'] += 1
                         results['error_details'].append(f"Row {row_num}: Invalid email '{email}'")
                         continue
@@ -64,12 +103,7 @@ class CSVService:
                         continue
                     
                     # Prepare data
-                    participant_data = {
-                        'name': row.get('name', '').strip() or email.split('@')[0],
-                        'email': email,
-                        'college': row.get('college', '').strip() or None,
-                        'phone': row.get('phone', '').strip() or None
-                    }
+                    participant_data = _participant_from_row(row, email)
                     
                     # Insert into database
                     self.db.table('hackathon_participants').insert(participant_data).execute()
@@ -83,14 +117,133 @@ class CSVService:
             results['errors'] += 1
             results['error_details'].append(f"CSV parsing error: {str(e)}")
         
+        if results['imported']:
+            get_invalidation_bus().publish(PARTICIPANTS, PARTICIPANTS_ADDED)
+        
         return results
     
-    def get_all_participants(self) -> List[Dict]:
-        """Get all hackathon participants"""
-        result = self.db.table('hackathon_participants')\
-            .select('*')\
-            .order('imported_at', desc=True)\
-            .execute()
+    def sync_csv(self, file_content: bytes, delete_missing: bool = False, dry_run: bool = False, force: bool = False) -> Dict:
+        """
+        Bring hackathon_participants in line with an updated CSV
+        
+        Rows are matched by email; a participant is updated only when the
+        hash of name/college/phone differs. Inserts and updates are applied
+        before deletes, in batches, and the table is never emptied, so
+        check-in lookups keep working while a sync runs.
+        
+        Run with dry_run first to review the summary. Deletes are opt-in, and
+        even then are skipped (counted in `deletes_skipped`) when any row had
+        an error or no row was valid, since a mistyped email or a renamed
+        header would otherwise delete the affected participants.
+        
+        Args:
+            file_content: CSV bytes (same format as parse_csv)
+            delete_missing: Delete participants whose email is not in the file
+            dry_run: Compute the change summary without writing anything
+            force: Delete even when the file had row errors or no valid rows
+        
+        Returns:
+            Dict with change counts and row errors
+        """
+        results = {
+            'total_rows': 0,
+            'inserted': 0,
+            'updated': 0,
+            'deleted': 0,
+            'deletes_skipped': 0,
+            'unchanged': 0,
+            'errors': 0,
+            'error_details': [],
+            'dry_run': dry_run
+        }
+        
+        try:
+            rows, emails, validation_errors = self._read_csv(file_content)
+        except Exception as e:
+            results['errors'] += 1
+            results['error_details'].append(f"CSV parsing error: {str(e)}")
+            return results
+        
+        # Desired state keyed by email (a later row for the same email wins)
+        desired: Dict[str, Dict] = {}
+        for (row_num, row), email in zip(rows, emails):
+            results['total_rows'] += 1
+            if not email:
+                results['errors'] += 1
+                results['error_details'].append(f"Row {row_num}: Missing email")
+            elif validation_errors.get(email):
+                results['errors'] += 1
+                results['error_details'].append(f"Row {row_num}: Invalid email '{email}'")
+            else:
+                desired[email] = _participant_from_row(row, email)
+        
+        current = {p['email']: p for p in self._iter_participants('id, email, name, college, phone')}
+        
+        inserts = [p for email, p in desired.items() if email not in current]
+        updates = [
+            p for email, p in desired.items()
+            if email in current and content_hash(p) != content_hash(current[email])
+        ]
+        delete_ids = [p['id'] for email, p in current.items() if email not in desired] if delete_missing else []
+        if delete_ids and (results['errors'] or not desired) and not force:
+            results['deletes_skipped'] = len(delete_ids)
+            results['error_details'].append(
+                f"Skipped deleting {len(delete_ids)} participants: the file has "
+                f"{'row errors' if results['errors'] else 'no valid rows'} (fix it or pass force)"
+            )
+            delete_ids = []
+        
+        results['inserted'] = len(inserts)
+        results['updated'] = len(updates)
+        results['deleted'] = len(delete_ids)
+        results['unchanged'] = len(desired) - len(inserts) - len(updates)
+        
+        if dry_run or not (inserts or updates or delete_ids):
+            return results
+        
+        from postgrest.types import ReturnMethod
+        table = 'hackathon_participants'
+        for i in range(0, len(inserts), SYNC_BATCH_SIZE):
+            self.db.table(table)\
+                .insert(inserts[i:i + SYNC_BATCH_SIZE], returning=ReturnMethod.minimal)\
+                .execute()
+        for i in range(0, len(updates), SYNC_BATCH_SIZE):
+            self.db.table(table)\
+                .upsert(updates[i:i + SYNC_BATCH_SIZE], on_conflict='email', returning=ReturnMethod.minimal)\
+                .execute()
+        for i in range(0, len(delete_ids), SYNC_BATCH_SIZE):
+            self.db.table(table)\
+                .delete(returning=ReturnMethod.minimal)\
+                .in_('id', delete_ids[i:i + SYNC_BATCH_SIZE])\
+                .execute()
+        
+        get_invalidation_bus().publish(PARTICIPANTS)
+        return results
+    
+    def _iter_participants(self, columns: str = '*', page_size: int = 1000):
+        """Yield every participant, paging by id so no row limit truncates the result"""
+        last_id = 0
+        while True:
+            page = self.db.table('hackathon_participants')\
+                .select(columns)\
+                .gt('id', last_id)\
+                .order('id')\
+                .limit(page_size)\
+                .execute()
+            yield from page.data
+            if len(page.data) < page_size:
+                return
+            last_id = page.data[-1]['id']
+    
+    def get_all_participants(self, stale_ok: bool = False) -> List[Dict]:
+        """Get all hackathon participants (from the read replica with stale_ok)"""
+        result = read(
+            lambda db: db.table('hackathon_participants')\
+                .select('*')\
+                .order('imported_at', desc=True)\
+                .execute(),
+            stale_ok
+        )
         
         return result.data
     
@@ -115,9 +268,13 @@ class CSVService:
     
     def delete_all_participants(self) -> int:
         """Delete all hackathon participants (for re-import)"""
+        from postgrest.types import CountMethod, ReturnMethod
+        
+        # Count only; don't send every deleted row back over the wire
         result = self.db.table('hackathon_participants')\
-            .delete()\
+            .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)\
             .neq('id', 0)\
             .execute()
         
-        return len(result.data) if result.data else 0
\ No newline at end of file
+        get_invalidation_bus().publish(PARTICIPANTS)
+        return result.count or 0
\ No newline at end of file
@@ -0,0 +1,346 @@
+"""
+SendGrid event webhook ingestion and ticket delivery state
+
+SendGrid posts delivery events (processed, delivered, bounce, ...) in
+batches to /webhooks/sendgrid, signed with ECDSA over timestamp + body.
+After the signature check, events are only normalized and appended to an
+in-memory buffer, so the request returns straight away. A writer thread
+bulk-inserts the buffer into `email_events` whenever it holds
+settings.email_events_flush_size rows, or every
+settings.email_events_flush_interval seconds. Rows carry sg_event_id, so
+webhook retries and re-queued batches are ignored by the unique index.
+
+When the buffer is full (the database is down or slow) ingest() raises
+BufferFull and the webhook answers 503; SendGrid retries for 24 hours.
+Text fields are cut to their column widths, but a chunk the database
+still refuses for its data (an integrity or data error rather than an
+outage) is split until the offending rows are isolated; those are set
+aside (see status()) instead of blocking everything behind them.
+Events still buffered when the process dies are lost unless SendGrid
+retries them, which is acceptable for delivery statistics.
+
+Ticket and campaign emails carry ticket_id / event_id / campaign_id
+custom args (see email_service.py), which SendGrid echoes on every event.
+"""
+import base64
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.config import settings
+from app.db import get_supabase
+
+CHUNK = 200  # ticket ids per registrations lookup
+SET_ASIDE_LIMIT = 1000  # refused rows kept for inspection
+BIGINT_MAX = 2 ** 63 - 1
+
+
+class InvalidSignature(Exception):
+    pass
+
+
+class BufferFull(Exception):
+    pass
+
+
+def _int_or_none(value) -> Optional[int]:
+    try:
+        number = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return number if -BIGINT_MAX <= number <= BIGINT_MAX else None
+
+
+def _text(value, width: int) -> Optional[str]:
+    return str(value)[:width] if value else None
+
+
+def _is_row_error(exc: BaseException) -> bool:
+    """True if the database refused the rows themselves (SQLSTATE class 22 or 23)"""
+    from postgrest.exceptions import APIError
+
+    return isinstance(exc, APIError) and str(exc.code or '')[:2] in ('22', '23')
+
+
+def normalize(event: Dict) -> Optional[Dict]:
+    """
+    Map one SendGrid webhook event to an email_events row
+
+    Returns:
+        Row dict (same keys for every row, as bulk inserts require), or
+        None for events without an email, type or a usable timestamp
+    """
+    email, kind, timestamp = event.get('email'), event.get('event'), event.get('timestamp')
+    if not email or not kind or not isinstance(timestamp, (int, float)):
+        return None
+    try:
+        occurred_at = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    except (OverflowError, ValueError, OSError):
+        return None
+    reason = event.get('reason') or event.get('response')
+    # Cut to the email_events column widths (migrations/006)
+    return {
+        'sg_event_id': _text(event.get('sg_event_id'), 100),
+        'sg_message_id': _text(event.get('sg_message_id'), 200),
+        'email': str(email).lower()[:255],
+        'event': str(kind)[:30],
+        # Bounces/drops carry `reason`; deferrals carry the SMTP `response`
+        'reason': str(reason) if reason else None,
+        'ticket_id': _text(event.get('ticket_id'), 50),
+        'event_id': _int_or_none(event.get('event_id')),
+        'campaign_id': _int_or_none(event.get('campaign_id')),
+        'occurred_at': occurred_at.isoformat()
+    }
+
+
+class EmailEventService:
+    def __init__(
+        self,
+        public_key: Optional[str] = None,
+        flush_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_buffer: Optional[int] = None
+    ):
+        self.public_key = public_key or settings.sendgrid_webhook_public_key
+        self.flush_size = flush_size or settings.email_events_flush_size
+        self.flush_interval = flush_interval or settings.email_events_flush_interval
+        self.max_buffer = max_buffer or settings.email_events_max_buffer
+        self._verifier = None
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        self._received = 0
+        self._written = 0
+        self._rejected = 0
+        self._set_aside: deque = deque(maxlen=SET_ASIDE_LIMIT)
+        self._set_aside_total = 0
+        self._last_error: Optional[str] = None
+        self._failing = False
+
+    @property
+    def db(self):
+        return get_supabase()
+
+    # -- webhook --
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.public_key)
+
+    def verify_signature(self, payload: bytes, signature: str, timestamp: str) -> None:
+        """
+        Check SendGrid's ECDSA signature over timestamp + raw body
+
+        Raises:
+            InvalidSignature: Missing, malformed, stale or wrong signature
+        """
+        from cryptography.exceptions import InvalidSignature as CryptoInvalidSignature
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import ec
+
+        if not signature or not timestamp:
+            raise InvalidSignature("Missing signature headers")
+        try:
+            signed_at = int(timestamp)
+        except ValueError:
+            raise InvalidSignature("Malformed timestamp")
+        if abs(datetime.now(timezone.utc).timestamp() - signed_at) > settings.sendgrid_webhook_max_age:
+            raise InvalidSignature("Signature timestamp outside the allowed window")
+
+        try:
+            self._public_key().verify(
+                base64.b64decode(signature),
+                timestamp.encode() + payload,
+                ec.ECDSA(hashes.SHA256())
+            )
+        except (CryptoInvalidSignature, ValueError) as e:
+            raise InvalidSignature("Signature does not match") from e
+
+    def _public_key(self):
+        # Parsed once; the key is the base64 DER from SendGrid's settings page
+        if self._verifier is None:
+            from cryptography.hazmat.primitives.serialization import load_der_public_key
+            self._verifier = load_der_public_key(base64.b64decode(self.public_key))
+        return self._verifier
+
+    def ingest(self, events: List[Dict]) -> int:
+        """
+        Buffer a webhook batch for the next bulk insert
+
+        Returns:
+            Number of events accepted (malformed ones are skipped)
+
+        Raises:
+            BufferFull: The writer is behind; the sender should retry later
+        """
+        rows = [row for row in map(normalize, events) if row is not None]
+        with self._lock:
+            if len(self._buffer) + len(rows) > self.max_buffer:
+                self._rejected += len(rows)
+                raise BufferFull(f"{len(self._buffer)} email events waiting to be written")
+            self._buffer.extend(rows)
+            self._received += len(rows)
+            pending = len(self._buffer)
+        if pending >= self.flush_size:
+            self._wake.set()
+        return len(rows)
+
+    # -- writer --
+
+    def start(self) -> None:
+        if self._writer is None:
+            self._stop.clear()
+            self._writer = threading.Thread(target=self._write_loop, name='email-events-writer', daemon=True)
+            self._writer.start()
+
+    def _write_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            if self._failing:
+                # Back off instead of retrying on every incoming batch
+                self._stop.wait(self.flush_interval)
+
+    def flush(self) -> int:
+        """
+        Bulk-insert buffered events, flush_size rows per request
+
+        Returns:
+            Number of events written; when the database fails, the failed
+            chunk and everything after it go back to the front of the buffer
+            for the next attempt
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            written = 0
+            for start in range(0, len(batch), self.flush_size):
+                try:
+                    written += self._insert(batch[start:start + self.flush_size])
+                except Exception as e:
+                    self._last_error = f"{type(e).__name__}: {str(e)}"
+                    print(f"⚠️ Email events write failed, will retry {len(batch) - start}: {self._last_error}")
+                    with self._lock:
+                        self._buffer[:0] = batch[start:]
+                    self._failing = True
+                    break
+            else:
+                self._failing = False
+            self._written += written
+            return written
+
+    def _insert(self, rows: List[Dict]) -> int:
+        """Insert rows, halving on data errors until the refused rows are isolated"""
+        from postgrest.types import ReturnMethod
+
+        try:
+            self.db.table('email_events')\
+                .upsert(rows, on_conflict='sg_event_id', ignore_duplicates=True, returning=ReturnMethod.minimal)\
+                .execute()
+            return len(rows)
+        except Exception as e:
+            if not _is_row_error(e):
+                raise
+            if len(rows) > 1:
+                middle = len(rows) // 2
+                return self._insert(rows[:middle]) + self._insert(rows[middle:])
+            self._last_error = f"{type(e).__name__}: {str(e)}"
+            print(f"⚠️ Email event set aside, the database refused it: {self._last_error}")
+            self._set_aside.append({'row': rows[0], 'error': self._last_error})
+            self._set_aside_total += 1
+            return 0
+
+    def shutdown(self) -> None:
+        """Stop the writer thread after flushing everything buffered"""
+        self._stop.set()
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+            self._writer = None
+        self.flush()
+
+    def status(self) -> Dict:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            'configured': self.configured,
+            'buffered': buffered,
+            'received': self._received,
+            'written': self._written,
+            'rejected': self._rejected,
+            'set_aside': self._set_aside_total,
+            'last_error': self._last_error
+        }
+
+    def set_aside(self) -> List[Dict]:
+        """Most recent rows the database refused, with the error for each"""
+        return list(self._set_aside)
+
+    # -- delivery state --
+
+    def delivery_status(self, ticket_id: str, history: int = 20) -> Dict:
+        """Latest delivery state of a ticket email, with its recent events"""
+        latest = self.db.table('ticket_delivery_status')\
+            .select('*')\
+            .eq('ticket_id', ticket_id)\
+            .execute()
+        events = self.db.table('email_events')\
+            .select('event, email, reason, campaign_id, occurred_at')\
+            .eq('ticket_id', ticket_id)\
+            .order('occurred_at', desc=True)\
+            .limit(history)\
+            .execute()
+        state = latest.data[0] if latest.data else {}
+        return {
+            'ticket_id': ticket_id,
+            'status': state.get('status', 'unknown'),
+            'email': state.get('email'),
+            'reason': state.get('reason'),
+            'updated_at': state.get('occurred_at'),
+            'events': events.data
+        }
+
+    def bounced(self, event_id: int) -> List[Dict]:
+        """
+        Registrations whose latest ticket email bounced or was dropped
+
+        Each row has the registration's current email; `email_changed` is
+        True when it was corrected after the failed send.
+        """
+        # Not the view: its event_id filter only applies after DISTINCT ON
+        failed = self.db.rpc('ticket_delivery_failures', {'p_event_id': event_id}).execute().data
+        if not failed:
+            return []
+
+        registrations: Dict[str, Dict] = {}
+        ticket_ids = [row['ticket_id'] for row in failed]
+        for start in range(0, len(ticket_ids), CHUNK):
+            rows = self.db.table('registrations')\
+                .select('id, name, email, ticket_id, checked_in')\
+                .in_('ticket_id', ticket_ids[start:start + CHUNK])\
+                .execute().data
+            registrations.update({row['ticket_id']: row for row in rows})
+
+        result = []
+        for row in failed:
+            registration = registrations.get(row['ticket_id'])
+            if registration is None:
+                continue
+            result.append({
+                'registration_id': registration['id'],
+                'ticket_id': row['ticket_id'],
+                'name': registration['name'],
+                'email': registration['email'],
+                'bounced_email': row['email'],
+                'email_changed': (registration['email'] or '').lower() != row['email'],
+                'checked_in': registration['checked_in'],
+                'status': row['status'],
+                'reason': row['reason'],
+                'occurred_at': row['occurred_at']
+            })
+        result.sort(key=lambda r: r['occurred_at'] or '', reverse=True)
+        return result
@@ -1,7 +1,24 @@
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Attachment, FileContent, FileName, FileType, Disposition
-from app.config import settings
-import base64
+from app.services.email_templates import render_ticket_email
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Ticket emails being sent right now; bulk campaign sends wait for zero
+_transactional_in_flight = 0
+
+
+def transactional_in_flight() -> int:
+    """Number of ticket emails currently being sent in this worker"""
+    return _transactional_in_flight
+
+
+@contextmanager
+def _transactional():
+    global _transactional_in_flight
+    _transactional_in_flight += 1
+    try:
+        yield
+    finally:
+        _transactional_in_flight -= 1
 
 
 async def send_ticket_email(
@@ -10,126 +27,39 @@ async def send_ticket_email(
     event_name: str,
     event_date: str,
     ticket_id: str,
-    qr_code_base64: str
+    qr_code_base64: str,
+    event_id: Optional[int] = None
 ) -> bool:
     """
-    Send ticket email with QR code using SendGrid HTTP API
+    Send ticket email with QR code through the configured mail transport
     """
-    
+    with _transactional():
+        return await _send_ticket_email(
+            recipient_email, recipient_name, event_name, event_date, ticket_id, qr_code_base64, event_id
+        )
+
+
+async def _send_ticket_email(
+    recipient_email: str,
+    recipient_name: str,
+    event_name: str,
+    event_date: str,
+    ticket_id: str,
+    qr_code_base64: str,
+    event_id: Optional[int]
+) -> bool:
+    from app.services.mail_transport import MailMessage, get_mail_transport
+
     try:
-        print(f"📧 Preparing email for {recipient_email} via SendGrid API...")
-        
-        # HTML content
-        html_content = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="utf-8">
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        .header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 30px;
-            text-align: center;
-            border-radius: 10px 10px 0 0;
-        }}
-        .content {{
-            background: #f9f9f9;
-            padding: 30px;
-            border-radius: 0 0 10px 10px;
-        }}
-        .ticket-box {{
-            background: white;
-            padding: 20px;
-            margin: 20px 0;
-            border-radius: 8px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-        .info-row {{
-            padding: 10px;
-            margin: 8px 0;
-            background: #f0f0f0;
-            border-radius: 4px;
-            border-left: 4px solid #667eea;
-        }}
-        .label {{
-            font-weight: bold;
-            color: #667eea;
-        }}
-        .alert {{
-            background: #fff3cd;
-            border: 2px solid #ffc107;
-            border-radius: 8px;
-            padding: 15px;
-            margin: 20px 0;
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>🎉 Your Event Ticket</h1>
-    </div>
-    
-    <div class="content">
-        <h2>Hello {recipient_name}!</h2>
-        <p>Your registration for <strong>{event_name}</strong> is confirmed!</p>
+        print(f"📧 Preparing email for {recipient_email}...")
         
-        <div class="ticket-box">
-            <div class="info-row">
-                <span class="label">Event:</span> {event_name}
-            </div>
-            <div class="info-row">
-                <span class="label">Date:</span> {event_date}
-            </div>
-            <div class="info-row">
-                <span class="label">Ticket ID:</span> {ticket_id}
-            </div>
-        </div>
-        
-        <div class="alert">
-            <strong>📎 QR Code Attached!</strong>
-            <p>Your ticket QR code is attached to this email as <strong>"ticket_qr_code.png"</strong></p>
-            <ul>
-                <li>Download the attachment</li>
-                <li>Save it on your phone</li>
-                <li>Show it at the event entrance</li>
-            </ul>
-        </div>
-        
-        <p><strong>Important:</strong></p>
-        <ul>
-            <li>Keep this email and attachment safe</li>
-            <li>Arrive 15 minutes before the event</li>
-            <li>Bring valid ID for verification</li>
-        </ul>
-        
-        <p style="text-align: center; font-size: 18px; margin-top: 30px;">
-            See you at the event! 🚀
-        </p>
-        
-        <div style="text-align: center; margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; font-size: 12px;">
-            <p>{settings.app_name}</p>
-            <p>Contact event organizers if you have questions</p>
-        </div>
-    </div>
-</body>
-</html>
-        """
-        
-        # Create message
-        message = Mail(
-            from_email=settings.email_from,
-            to_emails=recipient_email,
-            subject=f"🎫 Your Ticket for {event_name}",
-            html_content=html_content
+        # HTML content (compiled template, see app/services/email_templates.py)
+        html_content = render_ticket_email(
+            recipient_name=recipient_name,
+            event_name=event_name,
+            event_date=event_date,
+            ticket_id=ticket_id,
+            event_id=event_id
         )
         
         # Process QR code
@@ -138,24 +68,23 @@ async def send_ticket_email(
         else:
             qr_data = qr_code_base64
         
-        # Create attachment
-        attachment = Attachment(
-            FileContent(qr_data),
-            FileName('ticket_qr_code.png'),
-            FileType('image/png'),
-            Disposition('attachment')
-        )
-        message.attachment = attachment
+        # Echoed back on SendGrid webhook events (see email_events.py)
+        custom_args = {'ticket_id': ticket_id}
+        if event_id is not None:
+            custom_args['event_id'] = str(event_id)
         
-        print("✅ Message and attachment prepared")
+        message = MailMessage(
+            to_email=recipient_email,
+            subject=f"🎫 Your Ticket for {event_name}",
+            html=html_content,
+            attachments=[('ticket_qr_code.png', qr_data, 'image/png')],
+            custom_args=custom_args
+        )
         
-        # Send via SendGrid HTTP API
-        # API key is in EMAIL_PASSWORD environment variable
-        sg = SendGridAPIClient(settings.email_password)
-        response = sg.send(message)
+        # SendGrid HTTP API or pooled SMTP, see app/services/mail_transport.py
+        transport = await get_mail_transport().send(message)
         
-        print(f"✅ Email sent successfully! Status: {response.status_code}")
-        print(f"✅ Response body: {response.body}")
+        print(f"✅ Email sent successfully via {transport}")
         
         return True
         
@@ -163,4 +92,32 @@ async def send_ticket_email(
         print(f"❌ Error sending email: {type(e).__name__}: {str(e)}")
         import traceback
         traceback.print_exc()
-        return False
\ No newline at end of file
+        return False
+
+async def send_bulk_email(
+    subject: str,
+    html_content: str,
+    recipients: List[Dict],
+    custom_args: Optional[Dict[str, str]] = None
+) -> int:
+    """
+    Send one message to many recipients through the configured transport
+
+    Each recipient gets their own copy (nobody sees the other addresses),
+    with -name- and -ticket_id- substituted. SendGrid takes the batch in
+    one request; SMTP sends the copies over the connection pool.
+
+    Args:
+        recipients: Dicts with email, name and ticket_id (at most 1000)
+        custom_args: Message-wide SendGrid custom args (e.g. campaign_id),
+            echoed back on webhook events along with each ticket_id
+
+    Returns:
+        Number of recipients accepted
+
+    Raises:
+        BulkIncomplete: Every transport failed before the batch was done
+    """
+    from app.services.mail_transport import get_mail_transport
+
+    return await get_mail_transport().send_bulk(subject, html_content, recipients, custom_args)
@@ -0,0 +1,104 @@
+"""
+Compiled Jinja2 templates for outgoing emails
+
+Templates live in templates/emails/. They are compiled once (preload() at
+startup, or on first use) and reused for every message. A per-event
+variant named ticket_event_<event_id>.html takes precedence over
+ticket.html when present. announcement.html wraps campaign bodies.
+"""
+import os
+from typing import Dict, Iterable, List, Optional
+from app.config import settings
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'templates', 'emails')
+DEFAULT_TICKET_TEMPLATE = 'ticket.html'
+ANNOUNCEMENT_TEMPLATE = 'announcement.html'
+
+_env = None
+
+
+def get_environment():
+    """Jinja2 environment for email templates (created on first use)"""
+    global _env
+    if _env is None:
+        from jinja2 import Environment, FileSystemLoader, select_autoescape
+        _env = Environment(
+            loader=FileSystemLoader(os.path.normpath(TEMPLATE_DIR)),
+            autoescape=select_autoescape(['html']),
+            auto_reload=settings.debug,
+            cache_size=-1  # never evict compiled templates
+        )
+    return _env
+
+
+def preload() -> int:
+    """
+    Compile every email template up front
+
+    Returns:
+        Number of templates compiled
+    """
+    env = get_environment()
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def _ticket_template(event_id: Optional[int] = None):
+    candidates = [DEFAULT_TICKET_TEMPLATE]
+    if event_id is not None:
+        candidates.insert(0, f"ticket_event_{event_id}.html")
+    return get_environment().select_template(candidates)
+
+
+def render_ticket_email(
+    recipient_name: str,
+    event_name: str,
+    event_date: str,
+    ticket_id: str,
+    event_id: Optional[int] = None
+) -> str:
+    """Render the ticket email HTML for one recipient"""
+    return _ticket_template(event_id).render(
+        recipient_name=recipient_name,
+        event_name=event_name,
+        event_date=event_date,
+        ticket_id=ticket_id,
+        app_name=settings.app_name
+    )
+
+
+def render_ticket_emails(recipients: Iterable[Dict], event_id: Optional[int] = None) -> List[str]:
+    """
+    Render ticket emails for many recipients with one template lookup
+
+    Args:
+        recipients: Dicts with recipient_name, event_name, event_date, ticket_id
+        event_id: Selects a per-event template variant if one exists
+    """
+    template = _ticket_template(event_id)
+    return [
+        template.render(
+            recipient_name=r['recipient_name'],
+            event_name=r['event_name'],
+            event_date=r['event_date'],
+            ticket_id=r['ticket_id'],
+            app_name=settings.app_name
+        )
+        for r in recipients
+    ]
+
+
+def render_announcement_email(event_name: str, body: str) -> str:
+    """
+    Render a campaign email once for all recipients
+
+    `body` is trusted admin HTML; per-recipient values are left as SendGrid
+    substitution tags (-name-, -ticket_id-).
+    """
+    return get_environment().get_template(ANNOUNCEMENT_TEMPLATE).render(
+        event_name=event_name,
+        body=body,
+        app_name=settings.app_name
+    )
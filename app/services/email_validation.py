@@ -0,0 +1,122 @@
+"""
+Two-stage email validation for bulk imports
+
+Stage 1 checks syntax for every address with no network access. Stage 2
+checks deliverability (MX / A record) once per unique domain, in a thread
+pool, with results kept in a TTL cache, so a 10k-row import from a handful
+of colleges makes a handful of DNS queries instead of 10k.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+from cachetools import TTLCache
+from app.config import settings
+
+# Returns None if the domain accepts email, else an error message
+DomainChecker = Callable[[str], Optional[str]]
+
+
+class EmailValidationEngine:
+    def __init__(
+        self,
+        offline: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        cache_ttl: Optional[int] = None,
+        domain_checker: Optional[DomainChecker] = None
+    ):
+        """
+        Args:
+            offline: Skip DNS entirely (air-gapped runs); syntax only
+            timeout: Seconds allowed per domain lookup, and for the whole DNS stage
+            max_workers: Thread pool size for domain lookups
+            cache_ttl: Seconds a domain's deliverability result is reused
+            domain_checker: Override the DNS check (used by benchmarks)
+        """
+        self.offline = settings.email_validation_offline if offline is None else offline
+        self.timeout = settings.email_dns_timeout if timeout is None else timeout
+        self.max_workers = max_workers or settings.email_dns_workers
+        ttl = settings.email_domain_cache_ttl if cache_ttl is None else cache_ttl
+        self._cache: TTLCache = TTLCache(maxsize=10000, ttl=ttl)
+        self._lock = threading.Lock()
+        self._check_domain = domain_checker or self._dns_check
+
+    def validate(self, emails: List[str]) -> List[Optional[str]]:
+        """
+        Validate a list of (already lower-cased) email addresses
+
+        Returns:
+            One entry per input: None if valid, else an error message
+        """
+        from email_validator import validate_email, EmailNotValidError
+
+        errors: List[Optional[str]] = [None] * len(emails)
+        by_domain: Dict[str, List[int]] = {}
+
+        # Stage 1: syntax only, no network
+        for i, email in enumerate(emails):
+            try:
+                validated = validate_email(email, check_deliverability=False)
+            except EmailNotValidError as e:
+                errors[i] = str(e)
+                continue
+            by_domain.setdefault(validated.ascii_domain, []).append(i)
+
+        if self.offline or not by_domain:
+            return errors
+
+        # Stage 2: deliverability once per unique domain
+        for domain, error in self.check_domains(list(by_domain)).items():
+            if error:
+                for i in by_domain[domain]:
+                    errors[i] = error
+        return errors
+
+    def check_domains(self, domains: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Resolve deliverability for each domain, using the TTL cache
+
+        Domains whose lookup does not finish within the timeout are treated
+        as deliverable (and not cached), matching email_validator's handling
+        of DNS timeouts.
+        """
+        results: Dict[str, Optional[str]] = {}
+        pending = []
+        with self._lock:
+            for domain in domains:
+                if domain in self._cache:
+                    results[domain] = self._cache[domain]
+                else:
+                    pending.append(domain)
+
+        if not pending:
+            return results
+
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(pending)))
+        try:
+            futures = {pool.submit(self._check_domain, domain): domain for domain in pending}
+            done, _ = wait(futures, timeout=self.timeout)
+            for future, domain in futures.items():
+                if future not in done or future.exception() is not None:
+                    results[domain] = None
+                    continue
+                results[domain] = future.result()
+                with self._lock:
+                    self._cache[domain] = results[domain]
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def _dns_check(self, domain: str) -> Optional[str]:
+        import dns.resolver
+        from email_validator import EmailUndeliverableError
+        from email_validator.deliverability import validate_email_deliverability
+
+        # Own resolver so the timeout doesn't change dnspython's global default
+        resolver = dns.resolver.Resolver()
+        resolver.lifetime = self.timeout
+        try:
+            validate_email_deliverability(domain, domain, dns_resolver=resolver)
+        except EmailUndeliverableError as e:
+            return str(e)
+        return None
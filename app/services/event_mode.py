@@ -0,0 +1,321 @@
+"""
+Event mode: in-memory ticket index for live check-in
+
+When an event is activated its registrations (without the QR blob) are
+loaded into a compact index keyed by ticket_id. QR check-ins and ticket
+verification for indexed tickets are answered locally; admissions are
+written through to `registrations` and `check_ins` by a background thread.
+Tickets not in any active index fall back to the normal database path.
+
+Every worker keeps its own index, kept in step over the invalidation bus:
+new registrations (REGISTRATIONS) are loaded into it, and tickets admitted
+anywhere else (TICKETS, published by event mode, the database check-in
+path and the degraded journal) are marked checked in.
+"""
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from app.db import get_supabase
+from app.services.invalidation_bus import get_invalidation_bus, CHECKINS, EVENT_MODE, REGISTRATIONS, TICKETS
+
+# Columns loaded per registration (qr_code_url deliberately left out)
+INDEX_COLUMNS = 'id, event_id, name, email, college, ticket_id, checked_in, checked_in_at'
+
+
+class TicketRecord:
+    __slots__ = ('registration_id', 'event_id', 'name', 'email', 'college', 'checked_in', 'checked_in_at')
+
+    def __init__(self, row: Dict):
+        self.registration_id = row['id']
+        self.event_id = row['event_id']
+        self.name = row['name']
+        self.email = row['email']
+        self.college = row.get('college')
+        self.checked_in = bool(row.get('checked_in'))
+        self.checked_in_at = row.get('checked_in_at')
+
+
+class EventModeService:
+    def __init__(self, flush_interval: float = 0.5, batch_size: int = 200):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._tickets: Dict[str, TicketRecord] = {}
+        self._events: Dict[int, str] = {}  # active event id -> event name
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue[Dict]" = queue.Queue()
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        
+        bus = get_invalidation_bus()
+        bus.subscribe(TICKETS, self._on_ticket_admitted)
+        bus.subscribe(REGISTRATIONS, self._on_registration_created)
+        bus.subscribe(EVENT_MODE, self._on_event_mode_changed)
+    
+    @property
+    def db(self):
+        return get_supabase()
+    
+    # -- activation --
+    
+    def activate(self, event_id: int, broadcast: bool = True) -> Dict:
+        """Load an event's tickets into memory and start answering scans locally"""
+        event = self.db.table('events')\
+            .select('id, name')\
+            .eq('id', event_id)\
+            .single()\
+            .execute()
+        
+        if not event.data:
+            raise ValueError("Event not found")
+        
+        records = {}
+        last_id = 0
+        while True:
+            page = self.db.table('registrations')\
+                .select(INDEX_COLUMNS)\
+                .eq('event_id', event_id)\
+                .gt('id', last_id)\
+                .order('id')\
+                .limit(1000)\
+                .execute()
+            for row in page.data:
+                if row.get('ticket_id'):
+                    records[row['ticket_id']] = TicketRecord(row)
+            if len(page.data) < 1000:
+                break
+            last_id = page.data[-1]['id']
+        
+        with self._lock:
+            self._drop_event(event_id)
+            self._tickets.update(records)
+            self._events[event_id] = event.data['name']
+        self._start_writer()
+        
+        if broadcast:
+            get_invalidation_bus().publish(EVENT_MODE, f"{event_id}:on")
+        print(f"🎟️ Event mode on for event {event_id}: {len(records)} tickets indexed")
+        return self.status(event_id)
+    
+    def deactivate(self, event_id: int, broadcast: bool = True) -> None:
+        """Flush pending admissions and drop the event's index"""
+        self.flush()
+        with self._lock:
+            self._drop_event(event_id)
+        if broadcast:
+            get_invalidation_bus().publish(EVENT_MODE, f"{event_id}:off")
+    
+    def is_active(self, event_id: int) -> bool:
+        return event_id in self._events
+    
+    def status(self, event_id: Optional[int] = None) -> Dict:
+        with self._lock:
+            events = [event_id] if event_id is not None else list(self._events)
+            return {
+                'active_events': [
+                    {
+                        'event_id': eid,
+                        'event_name': self._events.get(eid),
+                        'tickets': sum(1 for r in self._tickets.values() if r.event_id == eid),
+                        'checked_in': sum(1 for r in self._tickets.values() if r.event_id == eid and r.checked_in)
+                    }
+                    for eid in events if eid in self._events
+                ],
+                'pending_writes': self._pending.qsize()
+            }
+    
+    def _drop_event(self, event_id: int) -> None:
+        # Caller holds self._lock
+        self._events.pop(event_id, None)
+        self._tickets = {t: r for t, r in self._tickets.items() if r.event_id != event_id}
+    
+    # -- lookups --
+    
+    def verify(self, ticket_id: str) -> Optional[Dict]:
+        """
+        Same response as /registrations/verify for an indexed ticket
+        
+        Returns:
+            None if the ticket is not in any active index
+        """
+        record = self._tickets.get(ticket_id)
+        if record is None:
+            return None
+        if record.checked_in:
+            return {
+                "valid": True,
+                "already_checked_in": True,
+                "message": "Ticket already used",
+                "checked_in_at": record.checked_in_at
+            }
+        return {
+            "valid": True,
+            "already_checked_in": False,
+            "participant_name": record.name,
+            "event_name": self._events.get(record.event_id)
+        }
+    
+    def check_in(self, ticket_id: str, event_id: int) -> Optional[Dict]:
+        """
+        QR check-in answered from memory
+        
+        Returns:
+            Same result dict as CheckInService.check_in_by_qr, or None if the
+            ticket is not indexed (caller falls back to the database)
+        """
+        with self._lock:
+            record = self._tickets.get(ticket_id)
+            if record is None:
+                return None
+            
+            if record.event_id != event_id:
+                return {
+                    'success': False,
+                    'message': f"This ticket is for {self._events.get(record.event_id)}, not the current event",
+                    'reason': 'wrong_event'
+                }
+            
+            if record.checked_in:
+                return {
+                    'success': False,
+                    'message': f"Already checked in at {record.checked_in_at}",
+                    'reason': 'already_checked_in',
+                    'participant_name': record.name,
+                    'checked_in_at': record.checked_in_at
+                }
+            
+            record.checked_in = True
+            record.checked_in_at = datetime.utcnow().isoformat()
+        
+        self._pending.put({
+            'registration_id': record.registration_id,
+            'event_id': event_id,
+            'email': record.email,
+            'ticket_id': ticket_id,
+            'checked_in_at': record.checked_in_at
+        })
+        get_invalidation_bus().publish(TICKETS, ticket_id)
+        
+        return {
+            'success': True,
+            'message': 'Check-in successful!',
+            'participant_name': record.name,
+            'email': record.email,
+            'college': record.college,
+            'event_name': self._events.get(event_id)
+        }
+    
+    def add_registration(self, row: Dict) -> None:
+        """Index a registration created while its event is active"""
+        if row.get('ticket_id') and row['event_id'] in self._events:
+            with self._lock:
+                self._tickets[row['ticket_id']] = TicketRecord(row)
+    
+    # -- cross-worker updates --
+    
+    def _on_ticket_admitted(self, ticket_id: Optional[str]) -> None:
+        with self._lock:
+            record = self._tickets.get(ticket_id)
+            if record is not None and not record.checked_in:
+                record.checked_in = True
+                record.checked_in_at = datetime.utcnow().isoformat()
+    
+    def _on_registration_created(self, key: Optional[str]) -> None:
+        # key: "<event_id>:<registration_id>:<ticket_id>"; other keys are not new rows
+        parts = (key or '').split(':')
+        if len(parts) != 3 or not parts[0].isdigit() or not parts[1].isdigit():
+            return
+        event_id, registration_id, ticket_id = int(parts[0]), int(parts[1]), parts[2]
+        if event_id not in self._events or ticket_id in self._tickets:
+            return
+        row = self.db.table('registrations')\
+            .select(INDEX_COLUMNS)\
+            .eq('id', registration_id)\
+            .execute()
+        if row.data:
+            self.add_registration(row.data[0])
+    
+    def _on_event_mode_changed(self, key: Optional[str]) -> None:
+        event_id, _, state = (key or '').partition(':')
+        if not event_id.isdigit():
+            return
+        if state == 'on':
+            if self.is_active(int(event_id)):
+                return
+            self.activate(int(event_id), broadcast=False)
+        elif self.is_active(int(event_id)):
+            self.deactivate(int(event_id), broadcast=False)
+    
+    # -- write-through --
+    
+    def _start_writer(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            return
+        self._stop.clear()
+        self._writer = threading.Thread(target=self._write_loop, name="event-mode-writer", daemon=True)
+        self._writer.start()
+    
+    def _write_loop(self) -> None:
+        while not self._stop.is_set():
+            self._stop.wait(self.flush_interval)
+            self.flush()
+    
+    def flush(self) -> int:
+        """
+        Write pending admissions to the database
+        
+        Returns:
+            Number of admissions written; failed batches are re-queued
+        """
+        written = 0
+        while True:
+            batch: List[Dict] = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return written
+            try:
+                self._write_batch(batch)
+                written += len(batch)
+            except Exception as e:
+                print(f"⚠️ Event mode write-through failed, will retry: {type(e).__name__}: {str(e)}")
+                for item in batch:
+                    self._pending.put(item)
+                return written
+    
+    def _write_batch(self, batch: List[Dict]) -> None:
+        # One statement for the whole batch (migrations/007); rows checked in
+        # elsewhere keep their timestamp
+        self.db.rpc('admit_registrations', {
+            'p_admissions': [
+                {'registration_id': item['registration_id'], 'checked_in_at': item['checked_in_at']}
+                for item in batch
+            ]
+        }).execute()
+        
+        self.db.table('check_ins')\
+            .upsert([
+                {
+                    'event_id': item['event_id'],
+                    'email': item['email'],
+                    'ticket_id': item['ticket_id'],
+                    'source': 'qr',
+                    'checked_in_at': item['checked_in_at']
+                }
+                for item in batch
+            ], on_conflict='event_id,email', ignore_duplicates=True)\
+            .execute()
+        
+        for event_id in {item['event_id'] for item in batch}:
+            get_invalidation_bus().publish(CHECKINS, event_id)
+    
+    def shutdown(self) -> None:
+        """Stop the writer thread after flushing everything pending"""
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+            self._writer = None
+        self.flush()
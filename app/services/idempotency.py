@@ -0,0 +1,155 @@
+"""
+Idempotency keys for retried POSTs
+
+A client sends `Idempotency-Key: <uuid>`; the first request's outcome is
+stored and any retry with the same key gets that outcome back in one
+lookup instead of re-running the handler. Concurrent retries of the same
+key wait for the first to finish. Successful responses and 4xx business
+outcomes are stored; 5xx errors and 429/503 back-pressure responses are
+not, so those can be retried for real.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from fastapi import HTTPException
+from app.config import settings
+from app.db import get_supabase
+from app.services.profiler import follow
+
+# Responses that mean "try again later" rather than a final outcome
+NOT_STORED_STATUSES = {429, 503}
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable hash of the request parameters a key must be reused with"""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class MemoryIdempotencyStore:
+    def __init__(self, ttl: int, max_entries: int = 100000):
+        self._cache: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self._cache.get(key)
+
+    def put(self, key: str, record: Dict) -> None:
+        with self._lock:
+            self._cache[key] = record
+
+
+class DatabaseIdempotencyStore:
+    """Stores records in the idempotency_keys table (migrations/002) so they survive restarts and span workers"""
+
+    table = 'idempotency_keys'
+
+    def __init__(self, ttl: int, purge_every: int = 500):
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._puts = 0
+
+    @property
+    def db(self):
+        return get_supabase()
+
+    def get(self, key: str) -> Optional[Dict]:
+        result = self.db.table(self.table)\
+            .select('fingerprint, status_code, response')\
+            .eq('key', key)\
+            .gt('expires_at', datetime.now(timezone.utc).isoformat())\
+            .execute()
+        return result.data[0] if result.data else None
+
+    def put(self, key: str, record: Dict) -> None:
+        now = datetime.now(timezone.utc)
+        self.db.table(self.table)\
+            .upsert({
+                'key': key,
+                **record,
+                'expires_at': (now + timedelta(seconds=self.ttl)).isoformat()
+            }, on_conflict='key')\
+            .execute()
+
+        self._puts += 1
+        if self._puts % self.purge_every == 0:
+            self.db.table(self.table)\
+                .delete()\
+                .lt('expires_at', now.isoformat())\
+                .execute()
+
+
+class IdempotencyService:
+    def __init__(self, store=None):
+        if store is None:
+            if settings.idempotency_backend == 'database':
+                store = DatabaseIdempotencyStore(settings.idempotency_ttl)
+            else:
+                store = MemoryIdempotencyStore(settings.idempotency_ttl)
+        self.store = store
+        # key -> [lock, requests holding or waiting for it]; dropped when the count reaches zero
+        self._locks: Dict[str, List] = {}
+
+    async def execute(
+        self,
+        scope: str,
+        key: Optional[str],
+        request_fingerprint: str,
+        handler: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """
+        Run handler once per (scope, key)
+
+        Returns:
+            (response body, True if replayed from a stored outcome)
+
+        Raises:
+            HTTPException: the handler's own error, a replayed stored error,
+                or 422 if the key was used with different parameters
+        """
+        if not key:
+            return await handler(), False
+
+        full_key = f"{scope}:{key}"
+        entry = self._locks.get(full_key)
+        if entry is None:
+            entry = self._locks[full_key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                stored = await asyncio.to_thread(follow(self.store.get), full_key)
+                if stored is not None:
+                    if stored['fingerprint'] != request_fingerprint:
+                        raise HTTPException(
+                            status_code=422,
+                            detail="Idempotency-Key was already used with different request parameters"
+                        )
+                    if stored['status_code'] >= 400:
+                        raise HTTPException(status_code=stored['status_code'], detail=stored['response'])
+                    return stored['response'], True
+
+                try:
+                    body = await handler()
+                except HTTPException as e:
+                    if e.status_code < 500 and e.status_code not in NOT_STORED_STATUSES:
+                        await self._save(full_key, request_fingerprint, e.status_code, e.detail)
+                    raise
+                await self._save(full_key, request_fingerprint, 200, body)
+                return body, False
+        finally:
+            # Only once no waiter is left: a woken waiter has not re-acquired the lock yet
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[full_key]
+
+    async def _save(self, key: str, request_fingerprint: str, status_code: int, body: Any) -> None:
+        record = {'fingerprint': request_fingerprint, 'status_code': status_code, 'response': body}
+        try:
+            await asyncio.to_thread(follow(self.store.put), key, record)
+        except Exception as e:
+            # The request itself succeeded; a lost record only costs a real retry
+            print(f"⚠️ Failed to store idempotency record: {type(e).__name__}: {str(e)}")
@@ -0,0 +1,265 @@
+"""
+Cross-worker cache invalidation
+
+Each worker process keeps its own in-process caches. Code that changes
+shared data calls publish(topic, key); every worker (including the caller)
+then runs the callbacks subscribed to that topic so caches can drop stale
+entries.
+
+Backends (settings.invalidation_backend):
+    local     single process only, callbacks run in-process
+    unix      Unix datagram sockets in a shared directory (one host)
+    postgres  Postgres LISTEN/NOTIFY over settings.database_url
+"""
+import glob
+import json
+import os
+import select
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, Optional
+from app.config import settings
+
+# Topics published by the app
+PARTICIPANTS = "participants"  # key: PARTICIPANTS_ADDED when rows were only inserted
+PARTICIPANTS_ADDED = "added"
+EVENTS = "events"
+CHECKINS = "checkins"
+REGISTRATIONS = "registrations"  # key: "<event_id>:<registration_id>:<ticket_id>" for a new registration,
+REGISTRATIONS_UPDATED = "updated"  # REGISTRATIONS_UPDATED when existing rows changed, or
+# REGISTRATIONS_ARCHIVED when an event's rows were archived
+REGISTRATIONS_ARCHIVED = "archived"
+TICKETS = "tickets"  # key: ticket_id admitted through event mode
+EVENT_MODE = "event_mode"  # key: "<event_id>:on" or "<event_id>:off"
+PROFILING = "profiling"  # key: JSON of the profiling toggle
+
+Callback = Callable[[Optional[str]], None]
+
+
+class InvalidationBus:
+    """In-process bus; subclasses add delivery to other workers"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callback]] = defaultdict(list)
+        self._origin = f"{socket.gethostname()}:{os.getpid()}"
+
+    def subscribe(self, topic: str, callback: Callback) -> None:
+        """Register callback(key) to run whenever topic is invalidated"""
+        self._subscribers[topic].append(callback)
+
+    def publish(self, topic: str, key: Optional[object] = None) -> None:
+        """Invalidate topic (optionally a single key) in every worker"""
+        key = None if key is None else str(key)
+        self._dispatch(topic, key)
+        try:
+            self._broadcast(json.dumps({"topic": topic, "key": key, "origin": self._origin}))
+        except Exception as e:
+            print(f"⚠️ Invalidation broadcast failed: {type(e).__name__}: {str(e)}")
+
+    def start(self) -> None:
+        """Start receiving invalidations from other workers"""
+
+    def stop(self) -> None:
+        """Stop receiving invalidations"""
+
+    def _broadcast(self, message: str) -> None:
+        pass
+
+    def _receive(self, message: str) -> None:
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            return
+        if payload.get("origin") == self._origin:
+            return
+        self._dispatch(payload.get("topic"), payload.get("key"))
+
+    def _dispatch(self, topic: str, key: Optional[str]) -> None:
+        for callback in list(self._subscribers.get(topic, ())):
+            try:
+                callback(key)
+            except Exception as e:
+                print(f"⚠️ Invalidation callback failed for '{topic}': {type(e).__name__}: {str(e)}")
+
+
+class _ListenerBus(InvalidationBus, ABC):
+    """Base for backends that receive on a background thread"""
+
+    def __init__(self):
+        super().__init__()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen, name="invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    @abstractmethod
+    def _listen(self) -> None:
+        """Receive messages until self._stop is set (runs on the listener thread)"""
+
+
+class UnixSocketBus(_ListenerBus):
+    """
+    Local stand-in for LISTEN/NOTIFY
+
+    Every worker binds a datagram socket named after its pid inside
+    socket_dir; publishing sends the message to every socket in the
+    directory and removes sockets whose worker has exited.
+    """
+
+    def __init__(self, socket_dir: str):
+        super().__init__()
+        self.socket_dir = socket_dir
+        self.path = os.path.join(socket_dir, f"{os.getpid()}.sock")
+        self._sock: Optional[socket.socket] = None
+
+    def start(self) -> None:
+        os.makedirs(self.socket_dir, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.settimeout(1.0)
+        super().start()
+
+    def stop(self) -> None:
+        super().stop()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _broadcast(self, message: str) -> None:
+        data = message.encode()
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sender:
+            for path in glob.glob(os.path.join(self.socket_dir, "*.sock")):
+                if path == self.path:
+                    continue
+                try:
+                    sender.sendto(data, path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker is gone; clean up its socket file
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            try:
+                data = self._sock.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self._receive(data.decode())
+
+
+class PostgresBus(_ListenerBus):
+    """
+    Postgres LISTEN/NOTIFY on a single channel
+
+    publish() only queues the NOTIFY and wakes the listener thread, which
+    sends it on its own connection, so request handlers never wait on a
+    database round trip. Notifications queued while the database is
+    unreachable are sent after reconnecting (the oldest are dropped beyond
+    OUTBOX_LIMIT).
+    """
+
+    channel = "ticketing_invalidation"
+    OUTBOX_LIMIT = 10000
+
+    def __init__(self, dsn: str):
+        super().__init__()
+        self.dsn = dsn
+        self._outbox: deque = deque(maxlen=self.OUTBOX_LIMIT)
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+
+    def _connect(self):
+        import psycopg2
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    def _broadcast(self, message: str) -> None:
+        self._outbox.append(message)
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            # Already woken (buffer full) or shutting down
+            pass
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake()
+        super().stop()
+
+    def _send_outbox(self, conn) -> None:
+        # A message leaves the outbox only once NOTIFY succeeded
+        with conn.cursor() as cur:
+            while self._outbox:
+                cur.execute("SELECT pg_notify(%s, %s)", (self.channel, self._outbox[0]))
+                self._outbox.popleft()
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            try:
+                conn = self._connect()
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {self.channel}")
+                while not self._stop.is_set():
+                    self._send_outbox(conn)
+                    readable, _, _ = select.select([conn, self._wake_r], [], [], 1.0)
+                    if self._wake_r in readable:
+                        try:
+                            while self._wake_r.recv(4096):
+                                pass
+                        except BlockingIOError:
+                            pass
+                    if conn in readable:
+                        conn.poll()
+                        while conn.notifies:
+                            self._receive(conn.notifies.pop(0).payload)
+                # Invalidations published during shutdown
+                self._send_outbox(conn)
+                conn.close()
+            except Exception as e:
+                print(f"⚠️ Invalidation listener error: {type(e).__name__}: {str(e)}")
+                self._stop.wait(5.0)
+
+
+_bus: Optional[InvalidationBus] = None
+
+
+def get_invalidation_bus() -> InvalidationBus:
+    """Get the process-wide invalidation bus for the configured backend"""
+    global _bus
+    if _bus is None:
+        backend = settings.invalidation_backend
+        if backend == "postgres":
+            if not settings.database_url:
+                raise ValueError("DATABASE_URL is required for the postgres invalidation backend")
+            _bus = PostgresBus(settings.database_url)
+        elif backend == "unix":
+            _bus = UnixSocketBus(settings.invalidation_socket_dir)
+        else:
+            _bus = InvalidationBus()
+    return _bus
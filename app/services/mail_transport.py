@@ -0,0 +1,646 @@
+"""
+Mail transports: SendGrid HTTP API and pooled SMTP, with failover
+
+email_service.py builds MailMessage objects and hands them to the
+process-wide transport from get_mail_transport():
+
+- SendGridTransport posts to the SendGrid v3 API from a worker thread,
+  reusing one API client. Bulk sends are a single request with a
+  personalization per recipient.
+- SMTPTransport keeps up to settings.smtp_pool_size persistent,
+  authenticated aiosmtplib connections and sends many messages over each
+  one (EHLO, STARTTLS and AUTH happen once per connection, not once per
+  message). A connection is replaced after
+  settings.smtp_max_messages_per_connection messages or when it has been
+  idle longer than settings.smtp_idle_timeout. Bulk sends leave one
+  connection free, so ticket emails are never stuck behind a campaign.
+- FailoverTransport tries the primary (settings.email_transport) and
+  falls back to settings.email_fallback_transport when the primary fails.
+  Each transport has a CircuitBreaker, so after
+  settings.email_failover_threshold consecutive failures mail goes
+  straight to the fallback until the primary's probe succeeds again.
+
+A message the provider refuses (a bad address, a message too large)
+raises MessageRejected and is never retried on the other transport:
+it would be refused there too. In a bulk send only the refused
+recipients are skipped: SendGrid refuses a whole request for one bad
+address, so when the error points at personalizations the batch is
+resent without the ones it names (or split in halves when it names no
+index). An error about the request itself (sender, content, size) fails
+the batch once as BulkIncomplete, leaving it to the fallback transport.
+
+Through SendGrid's SMTP relay (smtp.sendgrid.net, username 'apikey') the
+custom args go in the X-SMTPAPI header, so webhook events still carry
+ticket_id / event_id / campaign_id (see email_events.py).
+"""
+import asyncio
+import json
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from email.utils import formataddr, make_msgid, parseaddr
+from typing import Dict, List, Optional, Set, Tuple
+from markupsafe import escape
+from app.config import settings
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.profiler import follow
+
+TRANSPORTS = ('sendgrid', 'smtp')
+# SendGrid 400 errors name the offending field, e.g. personalizations.12.to.0.email
+REJECTED_PERSONALIZATION = re.compile(r'personalizations\.(\d+)\.')
+RECIPIENT_FIELD = 'personalizations'
+
+
+class MessageRejected(Exception):
+    """The provider refused this message; other transports would too"""
+
+
+class BulkIncomplete(Exception):
+    """
+    A bulk send stopped part way because the transport failed
+
+    Attributes:
+        sent: Recipients accepted before the failure
+        remaining: Recipients not attempted or not accepted, in order
+    """
+
+    def __init__(self, sent: int, remaining: List[Dict], error: str):
+        super().__init__(error)
+        self.sent = sent
+        self.remaining = remaining
+
+
+class MailMessage:
+    """
+    One email to one recipient
+
+    Args:
+        attachments: (filename, base64 content, MIME type) tuples
+        custom_args: Echoed back on SendGrid webhook events
+    """
+
+    def __init__(
+        self,
+        to_email: str,
+        subject: str,
+        html: str,
+        to_name: Optional[str] = None,
+        attachments: Optional[List[Tuple[str, str, str]]] = None,
+        custom_args: Optional[Dict[str, str]] = None
+    ):
+        self.to_email = to_email
+        self.to_name = to_name
+        self.subject = subject
+        self.html = html
+        self.attachments = attachments or []
+        self.custom_args = custom_args or {}
+
+
+def substitutions(recipient: Dict) -> Dict[str, str]:
+    """Per-recipient -name- / -ticket_id- values, HTML-escaped (names are user input)"""
+    return {
+        '-name-': str(escape(recipient.get('name') or '')),
+        '-ticket_id-': str(escape(recipient.get('ticket_id') or ''))
+    }
+
+
+def personalize(html: str, recipient: Dict) -> str:
+    """Apply the -name- / -ticket_id- substitutions SendGrid does for bulk sends"""
+    for placeholder, value in substitutions(recipient).items():
+        html = html.replace(placeholder, value)
+    return html
+
+
+def _bulk_args(recipient: Dict, custom_args: Optional[Dict]) -> Dict[str, str]:
+    args = {key: str(value) for key, value in (custom_args or {}).items()}
+    if recipient.get('ticket_id'):
+        args['ticket_id'] = recipient['ticket_id']
+    return args
+
+
+class MailTransport(ABC):
+    name = ''
+
+    @abstractmethod
+    async def send(self, message: MailMessage) -> str:
+        """
+        Send one message
+
+        Returns:
+            Name of the transport that sent it
+
+        Raises:
+            MessageRejected: The provider refused the message
+            Exception: Anything else means the transport failed
+        """
+
+    @abstractmethod
+    async def send_bulk(
+        self,
+        subject: str,
+        html: str,
+        recipients: List[Dict],
+        custom_args: Optional[Dict] = None
+    ) -> int:
+        """
+        Send one message to many recipients, each seeing only their address
+
+        Args:
+            recipients: Dicts with email, name and ticket_id; -name- and
+                -ticket_id- in the HTML are replaced per recipient
+
+        Returns:
+            Number of recipients accepted (refused addresses are skipped)
+
+        Raises:
+            BulkIncomplete: The transport failed part way
+        """
+
+    async def close(self) -> None:
+        pass
+
+    def status(self) -> Dict:
+        return {'transport': self.name}
+
+
+class SendGridTransport(MailTransport):
+    name = 'sendgrid'
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or settings.email_password
+        self._client = None
+        self._lock = threading.Lock()
+        self.stats = {'sent': 0, 'requests': 0, 'failed': 0, 'rejected': 0}
+
+    def _sendgrid(self):
+        # Imported here so sendgrid loads on first send, not at app startup
+        with self._lock:
+            if self._client is None:
+                from sendgrid import SendGridAPIClient
+                self._client = SendGridAPIClient(self.api_key)
+            return self._client
+
+    def _post(self, mail) -> int:
+        from python_http_client.exceptions import HTTPError
+
+        self.stats['requests'] += 1
+        try:
+            response = self._sendgrid().send(mail)
+        except HTTPError as e:
+            self.stats['failed'] += 1
+            # 400/413: the payload itself is bad (address, size)
+            if e.status_code in (400, 413):
+                raise MessageRejected(f"SendGrid refused the message: HTTP {e.status_code} {e.body}") from e
+            raise
+        except Exception:
+            self.stats['failed'] += 1
+            raise
+        return response.status_code
+
+    async def send(self, message: MailMessage) -> str:
+        from sendgrid.helpers.mail import Mail, To, Attachment, FileContent, FileName, FileType, Disposition, CustomArg
+
+        mail = Mail(
+            from_email=settings.email_from,
+            to_emails=To(message.to_email, message.to_name),
+            subject=message.subject,
+            html_content=message.html
+        )
+        for filename, content, mime_type in message.attachments:
+            mail.add_attachment(Attachment(
+                FileContent(content), FileName(filename), FileType(mime_type), Disposition('attachment')
+            ))
+        if message.custom_args:
+            mail.custom_arg = [CustomArg(key, str(value)) for key, value in message.custom_args.items()]
+
+        # The SendGrid client is blocking
+        await asyncio.to_thread(follow(self._post), mail)
+        self.stats['sent'] += 1
+        return self.name
+
+    @staticmethod
+    def _bulk_mail(subject: str, html: str, recipients: List[Dict], custom_args: Optional[Dict]):
+        from sendgrid.helpers.mail import Mail, Personalization, To, Substitution, CustomArg
+
+        mail = Mail(from_email=settings.email_from, subject=subject, html_content=html)
+        for index, recipient in enumerate(recipients):
+            personalization = Personalization()
+            personalization.add_to(To(recipient['email'], recipient.get('name')))
+            for placeholder, value in substitutions(recipient).items():
+                personalization.add_substitution(Substitution(placeholder, value))
+            if recipient.get('ticket_id'):
+                personalization.add_custom_arg(CustomArg('ticket_id', recipient['ticket_id']))
+            # Appended in order (the default index=0 prepends), so error fields map back to recipients
+            mail.add_personalization(personalization, index=index)
+        if custom_args:
+            mail.custom_arg = [CustomArg(key, str(value)) for key, value in custom_args.items()]
+        return mail
+
+    @staticmethod
+    def _rejected_fields(error: MessageRejected) -> List[str]:
+        """Fields a 400 response blames (empty if the body doesn't say)"""
+        try:
+            body = json.loads(error.__cause__.body)
+            return [str(item.get('field') or '') for item in body.get('errors', [])]
+        except Exception:
+            return []
+
+    @staticmethod
+    def _rejected_personalizations(fields: List[str]) -> Set[int]:
+        blamed = set()
+        for field in fields:
+            match = REJECTED_PERSONALIZATION.match(field)
+            if match:
+                blamed.add(int(match.group(1)))
+        return blamed
+
+    async def send_bulk(
+        self,
+        subject: str,
+        html: str,
+        recipients: List[Dict],
+        custom_args: Optional[Dict] = None
+    ) -> int:
+        # One request per batch; SendGrid accepts or refuses it as a unit, so a
+        # refused batch is resent without the recipients it was refused for
+        sent = 0
+        pending = [recipients]
+        while pending:
+            batch = pending.pop()
+            try:
+                await asyncio.to_thread(follow(self._post), self._bulk_mail(subject, html, batch, custom_args))
+            except MessageRejected as e:
+                fields = self._rejected_fields(e)
+                if not any(field.startswith(RECIPIENT_FIELD) for field in fields):
+                    # The request itself was refused; every split would be too
+                    remaining = batch + [recipient for rest in reversed(pending) for recipient in rest]
+                    raise BulkIncomplete(sent, remaining, str(e)) from e
+                if len(batch) == 1:
+                    self.stats['rejected'] += 1
+                    print(f"⚠️ Skipping {batch[0]['email']}: {str(e)}")
+                    continue
+                blamed = {i for i in self._rejected_personalizations(fields) if i < len(batch)}
+                if blamed:
+                    self.stats['rejected'] += len(blamed)
+                    print(f"⚠️ Skipping {', '.join(batch[i]['email'] for i in sorted(blamed))}: {str(e)}")
+                    rest = [recipient for i, recipient in enumerate(batch) if i not in blamed]
+                    if rest:
+                        pending.append(rest)
+                else:
+                    # Not told which one: halve until the refused recipients are alone
+                    middle = len(batch) // 2
+                    pending.extend((batch[middle:], batch[:middle]))
+                continue
+            except Exception as e:
+                remaining = batch + [recipient for rest in reversed(pending) for recipient in rest]
+                raise BulkIncomplete(sent, remaining, f"{type(e).__name__}: {str(e)}") from e
+            sent += len(batch)
+            self.stats['sent'] += len(batch)
+        return sent
+
+    def status(self) -> Dict:
+        return {'transport': self.name, **self.stats}
+
+
+class _Connection:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPTransport(MailTransport):
+    name = 'smtp'
+
+    def __init__(
+        self,
+        hostname: Optional[str] = None,
+        port: Optional[int] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: Optional[bool] = None,
+        pool_size: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        timeout: Optional[float] = None
+    ):
+        self.hostname = hostname or settings.email_host
+        self.port = port or settings.email_port
+        self.username = username or settings.email_username
+        self.password = password or settings.smtp_password or settings.email_password
+        self.use_tls = settings.smtp_use_tls if use_tls is None else use_tls
+        self.pool_size = pool_size or settings.smtp_pool_size
+        self.max_messages = max_messages or settings.smtp_max_messages_per_connection
+        self.idle_timeout = settings.smtp_idle_timeout if idle_timeout is None else idle_timeout
+        self.timeout = timeout or settings.smtp_timeout
+        self._sender = parseaddr(settings.email_from)[1]
+        self._idle: List[_Connection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._bulk_slots: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self.stats = {'sent': 0, 'rejected': 0, 'failed': 0, 'connections_opened': 0, 'reconnects': 0}
+
+    # -- pool --
+
+    def _bind(self) -> None:
+        # Connections and semaphores belong to one event loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            for connection in self._idle:
+                connection.smtp.close()
+            self._idle = []
+            self._slots = asyncio.Semaphore(self.pool_size)
+            self._bulk_slots = asyncio.Semaphore(max(1, self.pool_size - 1))
+            self._loop = loop
+
+    async def _connect(self) -> _Connection:
+        import aiosmtplib
+
+        # STARTTLS is negotiated whenever the server offers it; AUTH only with a username
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password if self.username else None,
+            use_tls=self.use_tls,
+            timeout=self.timeout
+        )
+        await smtp.connect()
+        self.stats['connections_opened'] += 1
+        return _Connection(smtp)
+
+    def _reusable(self, connection: _Connection) -> bool:
+        return connection.smtp.is_connected\
+            and connection.sent < self.max_messages\
+            and time.monotonic() - connection.last_used < self.idle_timeout
+
+    async def _checkout(self) -> Tuple[_Connection, bool]:
+        """An open connection (and whether it was pooled); the caller holds a slot"""
+        while self._idle:
+            connection = self._idle.pop()
+            if self._reusable(connection):
+                return connection, True
+            await self._discard(connection)
+        return await self._connect(), False
+
+    def _checkin(self, connection: _Connection) -> None:
+        connection.last_used = time.monotonic()
+        if self._reusable(connection):
+            # Most recently used last: pop() reuses the warmest connection
+            self._idle.append(connection)
+        else:
+            self._loop.create_task(self._discard(connection))
+
+    @staticmethod
+    async def _discard(connection: _Connection) -> None:
+        try:
+            if connection.smtp.is_connected:
+                await connection.smtp.quit()
+        except Exception:
+            connection.smtp.close()
+
+    # -- sending --
+
+    def _mime(self, message: MailMessage) -> bytes:
+        """
+        The message as RFC 5322 bytes
+
+        Built with the compat32 email.mime classes and flattened once here:
+        the default policy's header parsing and a second flatten in
+        aiosmtplib cost several times more than the SMTP exchange itself.
+        """
+        from email.mime.base import MIMEBase
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        html = MIMEText(message.html, 'html', 'utf-8')
+        if message.attachments:
+            mime = MIMEMultipart()
+            mime.attach(html)
+        else:
+            mime = html
+        mime['From'] = settings.email_from
+        mime['To'] = formataddr((message.to_name or '', message.to_email))
+        mime['Subject'] = message.subject
+        # An explicit domain: make_msgid() otherwise resolves our FQDN every call
+        mime['Message-ID'] = make_msgid(domain=self._sender.rpartition('@')[2] or None)
+        if message.custom_args:
+            # SendGrid's SMTP relay echoes these on webhook events; other servers ignore it
+            mime['X-SMTPAPI'] = json.dumps({'unique_args': message.custom_args})
+        for filename, content, mime_type in message.attachments:
+            # Already base64; only wrapped to the 76-character line limit
+            part = MIMEBase(*mime_type.split('/', 1))
+            part.set_payload('\n'.join(content[i:i + 76] for i in range(0, len(content), 76)))
+            part['Content-Transfer-Encoding'] = 'base64'
+            part.add_header('Content-Disposition', 'attachment', filename=filename)
+            mime.attach(part)
+        return mime.as_bytes()
+
+    async def _deliver(self, recipient: str, raw: bytes) -> None:
+        import aiosmtplib
+
+        while True:
+            try:
+                connection, pooled = await self._checkout()
+            except Exception:
+                self.stats['failed'] += 1
+                raise
+            try:
+                await connection.smtp.sendmail(self._sender, [recipient], raw)
+            except aiosmtplib.SMTPRecipientsRefused as e:
+                self._checkin(connection)
+                self.stats['rejected'] += 1
+                raise MessageRejected(f"SMTP server refused the recipient: {e.recipients[0]}") from e
+            except (aiosmtplib.SMTPRecipientRefused, aiosmtplib.SMTPDataError) as e:
+                self._checkin(connection)
+                if e.code >= 500:
+                    self.stats['rejected'] += 1
+                    raise MessageRejected(f"SMTP server refused the message: {e.code} {e.message}") from e
+                self.stats['failed'] += 1
+                raise
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+                await self._discard(connection)
+                if pooled:
+                    # The server dropped a pooled connection; retry on another one
+                    self.stats['reconnects'] += 1
+                    continue
+                self.stats['failed'] += 1
+                raise
+            except Exception:
+                await self._discard(connection)
+                self.stats['failed'] += 1
+                raise
+            connection.sent += 1
+            self._checkin(connection)
+            self.stats['sent'] += 1
+            return
+
+    async def send(self, message: MailMessage) -> str:
+        self._bind()
+        raw = self._mime(message)
+        async with self._slots:
+            await self._deliver(message.to_email, raw)
+        return self.name
+
+    async def send_bulk(
+        self,
+        subject: str,
+        html: str,
+        recipients: List[Dict],
+        custom_args: Optional[Dict] = None
+    ) -> int:
+        self._bind()
+        messages = [
+            (recipient['email'], self._mime(MailMessage(
+                recipient['email'], subject, personalize(html, recipient),
+                to_name=recipient.get('name'), custom_args=_bulk_args(recipient, custom_args)
+            )))
+            for recipient in recipients
+        ]
+        failure: List[Exception] = []
+
+        async def send_one(recipient: str, raw: bytes) -> None:
+            async with self._bulk_slots:
+                # After a transport failure the rest are left for the fallback
+                if failure:
+                    raise failure[0]
+                async with self._slots:
+                    try:
+                        await self._deliver(recipient, raw)
+                    except MessageRejected:
+                        raise
+                    except Exception as e:
+                        failure.append(e)
+                        raise
+
+        results = await asyncio.gather(*(send_one(*message) for message in messages), return_exceptions=True)
+
+        sent, remaining, error = 0, [], None
+        for recipient, result in zip(recipients, results):
+            if result is None:
+                sent += 1
+            elif not isinstance(result, MessageRejected):
+                remaining.append(recipient)
+                error = error or f"{type(result).__name__}: {str(result)}"
+        if remaining:
+            raise BulkIncomplete(sent, remaining, error)
+        return sent
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection)
+
+    def status(self) -> Dict:
+        return {
+            'transport': self.name,
+            'server': f"{self.hostname}:{self.port}",
+            'pool_size': self.pool_size,
+            'idle_connections': len(self._idle),
+            **self.stats
+        }
+
+
+class FailoverTransport(MailTransport):
+    """Sends through the first transport whose circuit is closed"""
+
+    def __init__(self, transports: List[MailTransport], failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.transports = transports
+        self.name = '+'.join(transport.name for transport in transports)
+        self._breakers = {
+            transport.name: CircuitBreaker(
+                failure_threshold=failure_threshold or settings.email_failover_threshold,
+                reset_timeout=settings.email_failover_reset if reset_timeout is None else reset_timeout,
+                name=f"Mail transport '{transport.name}'"
+            )
+            for transport in transports
+        }
+        self.failovers = 0
+
+    def _order(self) -> List[MailTransport]:
+        # Transports with an open circuit go last, so mail still goes out when all are failing
+        allowed = [t for t in self.transports if self._breakers[t.name].allow()]
+        return allowed + [t for t in self.transports if t not in allowed]
+
+    async def send(self, message: MailMessage) -> str:
+        error = None
+        for transport in self._order():
+            breaker = self._breakers[transport.name]
+            if error is not None:
+                self.failovers += 1
+                print(f"🔁 Sending via {transport.name} after: {error}")
+            try:
+                await transport.send(message)
+            except MessageRejected:
+                breaker.record_success()
+                raise
+            except Exception as e:
+                breaker.record_failure()
+                error = e
+                continue
+            breaker.record_success()
+            return transport.name
+        raise error
+
+    async def send_bulk(
+        self,
+        subject: str,
+        html: str,
+        recipients: List[Dict],
+        custom_args: Optional[Dict] = None
+    ) -> int:
+        sent, error = 0, None
+        for transport in self._order():
+            breaker = self._breakers[transport.name]
+            if error is not None:
+                self.failovers += 1
+                print(f"🔁 Sending {len(recipients)} remaining via {transport.name} after: {error}")
+            try:
+                sent += await transport.send_bulk(subject, html, recipients, custom_args)
+            except BulkIncomplete as e:
+                breaker.record_failure()
+                sent += e.sent
+                recipients, error = e.remaining, e
+                continue
+            breaker.record_success()
+            return sent
+        raise BulkIncomplete(sent, recipients, str(error))
+
+    async def close(self) -> None:
+        for transport in self.transports:
+            await transport.close()
+
+    def status(self) -> Dict:
+        return {
+            'transport': self.name,
+            'failovers': self.failovers,
+            'transports': [
+                {**transport.status(), 'circuit': self._breakers[transport.name].status()}
+                for transport in self.transports
+            ]
+        }
+
+
+def build_transport(name: str) -> MailTransport:
+    if name == 'sendgrid':
+        return SendGridTransport()
+    if name == 'smtp':
+        return SMTPTransport()
+    raise ValueError(f"Unknown mail transport {name!r}; expected one of {', '.join(TRANSPORTS)}")
+
+
+_transport: Optional[MailTransport] = None
+
+
+def get_mail_transport() -> MailTransport:
+    """Get the process-wide transport for the configured backend(s)"""
+    global _transport
+    if _transport is None:
+        primary = build_transport(settings.email_transport)
+        fallback = settings.email_fallback_transport
+        if fallback and fallback != settings.email_transport:
+            _transport = FailoverTransport([primary, build_transport(fallback)])
+        else:
+            _transport = primary
+    return _transport
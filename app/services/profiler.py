@@ -0,0 +1,403 @@
+"""
+On-demand request profiling for live diagnosis
+
+Off unless settings.profiling_token is set. A request is profiled when it
+carries `X-Profile: cprofile` (or `sample`) together with
+`X-Profile-Token: <token>`, or when the admin toggle (PUT /debug/profiling,
+broadcast to every worker over the invalidation bus) picks it at its
+sample rate. Profiled responses carry an X-Profile-Id header.
+
+Modes:
+    cprofile  deterministic; downloadable as a pstats file (load with
+              `python -m pstats` or snakeviz) or as collapsed stacks
+              synthesized from the call graph
+    sample    a thread snapshots stacks every profiling_sample_interval
+              seconds; downloadable as exact collapsed stacks
+
+Both follow the request from the event loop into worker threads started
+with follow() (the coalescer, idempotency store and waiting room use it).
+Work of other requests interleaved on the event loop during the profiled
+request is included, so profile one request at a time: only one profile
+is captured at once and other requests pass through untouched.
+
+Time is split into named sections by the module being executed: `db`
+(postgrest/httpx), `qr` (qrcode/Pillow), `email` (sendgrid) and `app`
+for the rest; the outermost matching frame wins.
+
+Profiles are kept per worker in a ring buffer of profiling_buffer_size.
+"""
+import contextvars
+import cProfile
+import hmac
+import itertools
+import json
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.invalidation_bus import get_invalidation_bus, PROFILING
+
+MODES = ('cprofile', 'sample')
+SECTIONS = (
+    ('db', ('postgrest', 'supabase', 'httpx', 'httpcore')),
+    ('qr', ('qrcode', 'PIL')),
+    ('email', ('sendgrid', 'python_http_client')),
+)
+MAX_STACK_DEPTH = 128
+MIN_COLLAPSED_US = 1  # Call-graph branches cheaper than this are dropped
+
+_current: contextvars.ContextVar[Optional['RequestProfile']] = contextvars.ContextVar('profile', default=None)
+_ids = itertools.count(1)
+_sections_by_file: Dict[str, Optional[str]] = {}
+_labels_by_code: Dict[object, str] = {}
+# Code of the frames that entered profiling (middleware, follow()); samples
+# stop there so stacks start at the request instead of the server plumbing
+_boundary_codes: set = set()
+
+
+def _section_of(filename: str) -> Optional[str]:
+    section = _sections_by_file.get(filename, False)
+    if section is False:
+        section = None
+        for name, packages in SECTIONS:
+            if any(f"{os.sep}{package}{os.sep}" in filename for package in packages):
+                section = name
+                break
+        _sections_by_file[filename] = section
+    return section
+
+
+def _short_path(filename: str) -> str:
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    cwd = os.getcwd() + os.sep
+    return filename[len(cwd):] if filename.startswith(cwd) else os.path.basename(filename)
+
+
+def _label(filename: str, line: int, name: str) -> str:
+    # ';' separates frames in collapsed stacks
+    return f"{name} ({_short_path(filename)}:{line})".replace(';', ',')
+
+
+class RequestProfile:
+    def __init__(self, mode: str, method: str, path: str):
+        self.id = f"{os.getpid()}-{next(_ids)}"
+        self.mode = mode
+        self.method = method
+        self.path = path
+        self.created_at = datetime.utcnow().isoformat()
+        self.status: Optional[int] = None
+        self.duration = 0.0
+        self.sections: Dict[str, float] = {}
+        self.pstats_data: Optional[bytes] = None
+        self.samples: Counter = Counter()
+        self._started = time.perf_counter()
+        self._threads: Counter = Counter()  # thread id -> active entries
+        self._parts: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._loop_entry: Optional[cProfile.Profile] = None
+
+    def summary(self) -> Dict:
+        return {
+            'id': self.id,
+            'mode': self.mode,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+            'created_at': self.created_at,
+            'duration_ms': round(self.duration * 1000, 2),
+            'sections_ms': {name: round(value * 1000, 2) for name, value in self.sections.items()},
+            'samples': sum(self.samples.values()) if self.mode == 'sample' else None
+        }
+
+    # -- capture --
+
+    def _enter_thread(self) -> Optional[cProfile.Profile]:
+        with self._lock:
+            self._threads[threading.get_ident()] += 1
+        if self.mode != 'cprofile':
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per interpreter
+            return None
+        with self._lock:
+            self._parts.append(profile)
+        return profile
+
+    def _exit_thread(self, profile: Optional[cProfile.Profile]) -> None:
+        if profile is not None:
+            profile.disable()
+        with self._lock:
+            ident = threading.get_ident()
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        with self._lock:
+            threads = list(self._threads)
+        for ident in threads:
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                if code in _boundary_codes:
+                    break
+                label = _labels_by_code.get(code)
+                if label is None:
+                    label = _labels_by_code[code] = _label(code.co_filename, code.co_firstlineno, code.co_name)
+                stack.append((label, code.co_filename))
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    # -- results --
+
+    def _finish(self) -> None:
+        self.duration = time.perf_counter() - self._started
+        if self.mode == 'cprofile':
+            parts = [p for p in self._parts if p.getstats()]
+            if parts:
+                stats = pstats.Stats(parts[0])
+                if len(parts) > 1:
+                    stats.add(*parts[1:])
+                self.pstats_data = marshal.dumps(stats.stats)
+                self.sections = self._cprofile_sections(stats.stats)
+            self._parts = []
+        else:
+            self.sections = self._sample_sections()
+
+    def _with_app(self, sections: Dict[str, float]) -> Dict[str, float]:
+        result = {name: 0.0 for name, _ in SECTIONS}
+        result.update(sections)
+        result['app'] = max(0.0, self.duration - sum(result.values()))
+        return result
+
+    def _cprofile_sections(self, stats: Dict) -> Dict[str, float]:
+        # Time entering each section from code outside every section
+        totals: Counter = Counter()
+        for func, (_, _, _, cumulative, callers) in stats.items():
+            section = _section_of(func[0])
+            if section is None:
+                continue
+            if not callers:
+                totals[section] += cumulative
+            for caller, edge in callers.items():
+                if _section_of(caller[0]) is None:
+                    totals[section] += edge[3]
+        return self._with_app(dict(totals))
+
+    def _sample_sections(self) -> Dict[str, float]:
+        total = sum(self.samples.values())
+        if not total:
+            return self._with_app({})
+        counts: Counter = Counter()
+        for stack, count in self.samples.items():
+            section = next((s for s in (_section_of(f) for _, f in stack) if s), 'app')
+            counts[section] += count
+        counts.pop('app', None)
+        return self._with_app({name: self.duration * count / total for name, count in counts.items()})
+
+    def collapsed(self) -> str:
+        """Collapsed stacks ("frame;frame;frame value") for flamegraph.pl or speedscope"""
+        lines: Counter = Counter()
+        if self.mode == 'sample':
+            for stack, count in self.samples.items():
+                section = next((s for s in (_section_of(f) for _, f in stack) if s), 'app')
+                lines[';'.join([f"[{section}]"] + [label for label, _ in stack])] += count
+        elif self.pstats_data is not None:
+            self._collapse_call_graph(marshal.loads(self.pstats_data), lines)
+        return ''.join(f"{stack} {value}\n" for stack, value in sorted(lines.items()))
+
+    @staticmethod
+    def _collapse_call_graph(stats: Dict, lines: Counter) -> None:
+        """
+        Approximate stacks from cProfile's caller/callee graph (values in µs)
+
+        A function's time under a given caller is split across its callees
+        in proportion to the caller-edge times, as flameprof does.
+        """
+        callees: Dict[Tuple, List[Tuple[Tuple, float]]] = {}
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller, edge in callers.items():
+                callees.setdefault(caller, []).append((func, edge[3]))
+
+        def walk(func: Tuple, stack: List[str], on_stack: set, budget: float) -> None:
+            _, _, own, cumulative, _ = stats[func]
+            if budget * 1e6 < MIN_COLLAPSED_US or len(stack) >= MAX_STACK_DEPTH:
+                return
+            scale = budget / cumulative if cumulative else 0.0
+            stack = stack + [_label(*func)]
+            value = int(own * scale * 1e6)
+            if value:
+                lines[';'.join(stack)] += value
+            for child, edge_time in callees.get(func, ()):
+                if child not in on_stack:
+                    walk(child, stack, on_stack | {child}, edge_time * scale)
+
+        for func, (_, _, _, cumulative, callers) in stats.items():
+            if not callers:
+                walk(func, [], {func}, cumulative)
+
+
+class Profiler:
+    def __init__(self, buffer_size: Optional[int] = None, interval: Optional[float] = None):
+        self.token = settings.profiling_token
+        self.interval = interval or settings.profiling_sample_interval
+        self.profiles: deque = deque(maxlen=buffer_size or settings.profiling_buffer_size)
+        self.toggle = {'enabled': False, 'mode': 'sample', 'sample_rate': 0.0, 'path_prefix': ''}
+        self._active: Optional[RequestProfile] = None
+        self._lock = threading.Lock()
+        get_invalidation_bus().subscribe(PROFILING, self._apply_toggle)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    def check_token(self, value: Optional[str]) -> bool:
+        return self.enabled and bool(value) and hmac.compare_digest(value.encode(), self.token.encode())
+
+    # -- admin toggle --
+
+    def set_toggle(self, enabled: bool, mode: str = 'sample', sample_rate: float = 0.0, path_prefix: str = '') -> Dict:
+        """Profile a fraction of requests (optionally under one path) in every worker"""
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        get_invalidation_bus().publish(PROFILING, json.dumps({
+            'enabled': enabled, 'mode': mode, 'sample_rate': sample_rate, 'path_prefix': path_prefix
+        }))
+        return dict(self.toggle)
+
+    def _apply_toggle(self, key: Optional[str]) -> None:
+        if key:
+            self.toggle = json.loads(key)
+
+    def choose(self, method: str, path: str, headers) -> Optional[str]:
+        """Profiling mode for this request, or None"""
+        requested = headers.get('x-profile')
+        if requested:
+            if requested in MODES and self.check_token(headers.get('x-profile-token')):
+                return requested
+            return None
+        toggle = self.toggle
+        if toggle['enabled'] and path.startswith(toggle['path_prefix']) and not path.startswith('/debug'):
+            if random.random() < toggle['sample_rate']:
+                return toggle['mode']
+        return None
+
+    # -- capture --
+
+    def begin(self, mode: str, method: str, path: str) -> Optional[Tuple[RequestProfile, object]]:
+        """
+        Start profiling the current request (the caller's thread)
+
+        Returns:
+            (profile, context token) for end(), or None if another profile
+            is being captured
+        """
+        with self._lock:
+            if self._active is not None:
+                return None
+            profile = self._active = RequestProfile(mode, method, path)
+        _boundary_codes.add(sys._getframe(1).f_code)
+        token = _current.set(profile)
+        if mode == 'sample':
+            profile._sampler = threading.Thread(target=self._sample_loop, args=(profile,), name='profiler-sampler', daemon=True)
+            profile._sampler.start()
+        profile._loop_entry = profile._enter_thread()
+        return profile, token
+
+    def _sample_loop(self, profile: RequestProfile) -> None:
+        while not profile._stop.wait(self.interval):
+            profile._sample()
+
+    def end(self, profile: RequestProfile, token, status: Optional[int]) -> None:
+        profile._exit_thread(profile._loop_entry)
+        _current.reset(token)
+        if profile.mode == 'sample':
+            profile._stop.set()
+            profile._sampler.join(timeout=1)
+        profile.status = status
+        try:
+            profile._finish()
+        finally:
+            with self._lock:
+                self._active = None
+            self.profiles.append(profile)
+        print(f"🔬 Profiled {profile.method} {profile.path} ({profile.mode}): {profile.duration * 1000:.1f} ms, id {profile.id}")
+
+    def follow(self, fn: Callable) -> Callable:
+        """
+        Wrap fn so a call in a worker thread joins the current request's profile
+
+        Pass the wrapper to asyncio.to_thread (which copies the request's
+        context); with no profile active it just calls fn.
+        """
+        def run(*args, **kwargs):
+            profile = _current.get()
+            if profile is None or profile is not self._active:
+                return fn(*args, **kwargs)
+            _boundary_codes.add(sys._getframe(0).f_code)
+            entry = profile._enter_thread()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile._exit_thread(entry)
+        return run
+
+    # -- ring buffer --
+
+    def list_profiles(self) -> List[Dict]:
+        return [profile.summary() for profile in reversed(self.profiles)]
+
+    def get(self, profile_id: str) -> RequestProfile:
+        for profile in self.profiles:
+            if profile.id == profile_id:
+                return profile
+        raise ValueError("Profile not found (profiles are kept per worker)")
+
+    def clear(self) -> int:
+        count = len(self.profiles)
+        self.profiles.clear()
+        return count
+
+    def status(self) -> Dict:
+        return {
+            'toggle': dict(self.toggle),
+            'buffered': len(self.profiles),
+            'buffer_size': self.profiles.maxlen,
+            'capturing': self._active.id if self._active is not None else None,
+            'sample_interval': self.interval
+        }
+
+
+_profiler: Optional[Profiler] = None
+
+
+def get_profiler() -> Profiler:
+    """Get the process-wide request profiler"""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+
+def follow(fn: Callable) -> Callable:
+    """Shortcut for get_profiler().follow(fn)"""
+    return get_profiler().follow(fn)
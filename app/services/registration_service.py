@@ -1,22 +1,68 @@
-from app.db import get_supabase
+import asyncio
+from app.db import get_supabase, read
 from app.models.registration import RegistrationCreate, RegistrationResponse
-from app.utils.qr_generator import generate_qr_code, generate_ticket_id
-from app.services.email_service import send_ticket_email
+from app.services.event_mode import EventModeService
+from app.services.archive_service import ArchiveService
+from app.services.invalidation_bus import get_invalidation_bus, REGISTRATIONS, REGISTRATIONS_UPDATED
+from app.services.profiler import follow
 from datetime import datetime
 from typing import Optional
 
 
 class RegistrationService:
-    def __init__(self):
-        self.db = get_supabase()
+    def __init__(
+        self,
+        event_mode: Optional[EventModeService] = None,
+        archive: Optional[ArchiveService] = None
+    ):
+        self.event_mode = event_mode
+        self.archive = archive
+    
+    @property
+    def db(self):
+        """Supabase client, resolved on use so construction never connects"""
+        return get_supabase()
     
     async def create_registration(self, registration: RegistrationCreate) -> dict:
         """
         Create a new registration and send ticket email
         
+        The database writes and QR generation are blocking, so they run in a
+        worker thread; only the email send runs on the event loop.
+        
         Returns:
             Dict with registration details and ticket info
         """
+        from app.services.email_service import send_ticket_email
+        
+        event, created_reg, ticket_id, qr_code = await asyncio.to_thread(follow(self._insert_registration), registration)
+        
+        # 7. Send ticket email
+        event_date_str = datetime.fromisoformat(event.data['event_date']).strftime('%B %d, %Y at %I:%M %p')
+        try:
+            email_sent = await send_ticket_email(
+            recipient_email=registration.email,
+            recipient_name=registration.name,
+            event_name=event.data['name'],
+            event_date=event_date_str,
+            ticket_id=ticket_id,
+            qr_code_base64=qr_code,
+            event_id=registration.event_id
+    )
+        except Exception as email_error:
+            print(f"⚠️ Email failed but registration succeeded: {email_error}")
+            email_sent = False
+        return {
+            'registration_id': created_reg['id'],
+            'ticket_id': ticket_id,
+            'qr_code_url': qr_code,
+            'email_sent': email_sent,
+            'event_name': event.data['name']
+        }
+    
+    def _insert_registration(self, registration: RegistrationCreate) -> tuple:
+        """Steps 1-6 of create_registration (blocking; run in a worker thread)"""
+        from app.utils.qr_generator import generate_qr_code, generate_ticket_id
         
         # 1. Check if event exists and is open for registration
         event = self.db.table('events').select('*').eq('id', registration.event_id).single().execute()
@@ -56,7 +102,14 @@ class RegistrationService:
             'checked_in': False
         }
         
-        result = self.db.table('registrations').insert(reg_data).execute()
+        # idx_unique_event_email rejects a concurrent duplicate (e.g. a client
+        # retry racing the original) before any ticket email is sent
+        try:
+            result = self.db.table('registrations').insert(reg_data).execute()
+        except Exception as e:
+            if getattr(e, 'code', None) == '23505':
+                raise ValueError("You have already registered for this event")
+            raise
         
         if not result.data:
             raise ValueError("Failed to create registration")
@@ -72,29 +125,80 @@ class RegistrationService:
             .update({'ticket_id': ticket_id, 'qr_code_url': qr_code})\
             .eq('id', created_reg['id'])\
             .execute()
+        if self.event_mode is not None:
+            self.event_mode.add_registration({**created_reg, 'ticket_id': ticket_id})
+        # Other workers index the new ticket if its event is in event mode
+        get_invalidation_bus().publish(REGISTRATIONS, f"{registration.event_id}:{created_reg['id']}:{ticket_id}")
+        return event, created_reg, ticket_id, qr_code
+    
+    async def resend_ticket(self, ticket_id: str, email: Optional[str] = None) -> dict:
+        """
+        Send a ticket email again, e.g. after a bounce
         
-        # 7. Send ticket email
-        event_date_str = datetime.fromisoformat(event.data['event_date']).strftime('%B %d, %Y at %I:%M %p')
-        try:
-            email_sent = await send_ticket_email(
-            recipient_email=registration.email,
-            recipient_name=registration.name,
-            event_name=event.data['name'],
+        Args:
+            email: Corrected address; the registration is updated first
+        
+        Returns:
+            Dict with ticket_id, email and email_sent
+        """
+        from app.utils.qr_generator import generate_qr_code
+        from app.services.email_service import send_ticket_email
+        
+        result = self.db.table('registrations')\
+            .select('*, events(*)')\
+            .eq('ticket_id', ticket_id)\
+            .execute()
+        if not result.data:
+            raise ValueError("Ticket not found")
+        registration = result.data[0]
+        event = registration['events']
+        
+        if email and email.lower() != (registration['email'] or '').lower():
+            try:
+                self.db.table('registrations')\
+                    .update({'email': email})\
+                    .eq('id', registration['id'])\
+                    .execute()
+            except Exception as e:
+                if getattr(e, 'code', None) == '23505':
+                    raise ValueError("Another registration for this event already uses that email")
+                raise
+            registration['email'] = email
+            get_invalidation_bus().publish(REGISTRATIONS, REGISTRATIONS_UPDATED)
+        
+        event_date_str = datetime.fromisoformat(event['event_date']).strftime('%B %d, %Y at %I:%M %p')
+        email_sent = await send_ticket_email(
+            recipient_email=registration['email'],
+            recipient_name=registration['name'],
+            event_name=event['name'],
             event_date=event_date_str,
             ticket_id=ticket_id,
-            qr_code_base64=qr_code
-    )
-        except Exception as email_error:
-            print(f"⚠️ Email failed but registration succeeded: {email_error}")
-            email_sent = False
+            qr_code_base64=registration.get('qr_code_url') or generate_qr_code(ticket_id),
+            event_id=registration['event_id']
+        )
         return {
-            'registration_id': created_reg['id'],
             'ticket_id': ticket_id,
-            'qr_code_url': qr_code,
-            'email_sent': email_sent,
-            'event_name': event.data['name']
+            'email': registration['email'],
+            'email_sent': email_sent
         }
     
+    def get_remaining_capacity(self, event_id: int) -> int:
+        """Capacity minus current registrations (0 if the event is missing or closed)"""
+        event = self.db.table('events')\
+            .select('capacity, registration_open')\
+            .eq('id', event_id)\
+            .execute()
+        
+        if not event.data or not event.data[0]['registration_open']:
+            return 0
+        
+        current_count = self.db.table('registrations')\
+            .select('id', count='exact')\
+            .eq('event_id', event_id)\
+            .execute()
+        
+        return event.data[0]['capacity'] - current_count.count
+    
     def get_registration_by_ticket(self, ticket_id: str) -> Optional[dict]:
         """Get registration details by ticket ID"""
         result = self.db.table('registrations')\
@@ -105,12 +209,20 @@ class RegistrationService:
         
         return result.data if result.data else None
     
-    def get_registrations_by_event(self, event_id: int) -> list:
-        """Get all registrations for an event"""
-        result = self.db.table('registrations')\
-            .select('*')\
-            .eq('event_id', event_id)\
-            .order('created_at', desc=True)\
-            .execute()
+    def get_registrations_by_event(self, event_id: int, stale_ok: bool = False) -> list:
+        """Get all registrations for an event (from the read replica with stale_ok)"""
+        if self.archive is not None and self.archive.get_summary(event_id):
+            rows = self.archive.read('registrations', event_id)
+            rows.sort(key=lambda r: r['created_at'] or '', reverse=True)
+            return rows
+        
+        result = read(
+            lambda db: db.table('registrations')\
+                .select('*')\
+                .eq('event_id', event_id)\
+                .order('created_at', desc=True)\
+                .execute(),
+            stale_ok
+        )
         
         return result.data
\ No newline at end of file
@@ -0,0 +1,331 @@
+"""
+In-memory people search for the help desk
+
+Hackathon participants and registrations are indexed by the terms of
+their name, email, college and ticket id. A query term matches an indexed
+term exactly, as a prefix (sorted term list + bisect), or approximately
+through shared trigrams, so "jhon" and "gmial" still find their owners.
+Trigrams are kept per distinct word, not per person, which keeps fuzzy
+lookups fast at tens of thousands of people; query words shared by a
+large share of everyone ("gmail", "com") are ignored when the query has
+more selective words.
+
+The index loads lazily on the first search. Afterwards it follows the
+invalidation bus: new registrations and CSV imports are fetched by id
+(id > last seen), while syncs, deletes and archiving trigger a reload of
+the affected table.
+"""
+import bisect
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from app.db import get_supabase
+from app.services.invalidation_bus import (
+    get_invalidation_bus, PARTICIPANTS, PARTICIPANTS_ADDED, REGISTRATIONS, REGISTRATIONS_UPDATED, REGISTRATIONS_ARCHIVED
+)
+
+PARTICIPANT = 'participant'
+REGISTRATION = 'registration'
+
+PARTICIPANT_COLUMNS = 'id, name, email, college'
+REGISTRATION_COLUMNS = 'id, event_id, name, email, college, ticket_id'
+
+# Relative weight of a match in each field
+FIELD_WEIGHTS = {'email': 1.0, 'ticket_id': 1.0, 'name': 0.9, 'college': 0.5}
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.7
+MIN_SIMILARITY = 0.45  # Dice coefficient over trigrams
+MAX_EXPANSIONS = 200  # Indexed terms considered per query term
+MAX_FUZZY_CHECKS = 500  # Candidates (most shared trigrams first) checked for typos
+FUZZY_BELOW = 3  # Typo matching only when a query term has fewer exact/prefix matches
+COMMON_FRACTION = 0.2  # Query terms matching more of the index than this are dropped
+
+DocKey = Tuple[str, int]
+
+
+def _terms(value: Optional[str]) -> List[str]:
+    """Alphanumeric words, plus the whole value when it has punctuation (emails, ticket ids)"""
+    if not value:
+        return []
+    value = value.strip().lower()
+    words = re.findall(r'[a-z0-9]+', value)
+    if len(words) > 1 or (words and words[0] != value):
+        words.append(value)
+    return words
+
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (transpositions count once); limit + 1 once exceeded"""
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    def __init__(self):
+        self._docs: Dict[DocKey, Dict] = {}
+        self._doc_terms: Dict[DocKey, Dict[str, float]] = {}
+        self._postings: Dict[str, Dict[DocKey, float]] = {}  # term -> doc -> field weight
+        self._sorted_terms: List[str] = []
+        self._grams: Dict[str, Set[str]] = defaultdict(set)  # trigram -> terms
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._loaded = False
+        # Catch-up watermarks (highest id fully indexed) and pending work
+        self._last_ids = {PARTICIPANT: 0, REGISTRATION: 0}
+        self._stale: Set[str] = set()
+        self._reload: Set[str] = set()
+
+        bus = get_invalidation_bus()
+        bus.subscribe(PARTICIPANTS, self._on_participants)
+        bus.subscribe(REGISTRATIONS, self._on_registrations)
+
+    @property
+    def db(self):
+        return get_supabase()
+
+    # -- document maintenance --
+
+    def _add(self, kind: str, row: Dict, bulk: bool = False) -> None:
+        # Caller holds self._lock; with bulk=True the caller sorts _sorted_terms afterwards
+        key = (kind, row['id'])
+        self._remove(key)
+        terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in _terms(row.get(field)):
+                terms[term] = max(terms.get(term, 0.0), weight)
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if bulk:
+                    self._sorted_terms.append(term)
+                else:
+                    bisect.insort(self._sorted_terms, term)
+                # Whole emails / ticket ids match exactly or by prefix only
+                if term.isalnum():
+                    for gram in _trigrams(term):
+                        self._grams[gram].add(term)
+            postings[key] = weight
+        self._docs[key] = {'kind': kind, **{k: row.get(k) for k in ('id', 'event_id', 'name', 'email', 'college', 'ticket_id')}}
+        self._doc_terms[key] = terms
+
+    def _remove(self, key: DocKey) -> None:
+        # Caller holds self._lock
+        for term in self._doc_terms.pop(key, {}):
+            postings = self._postings[term]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[term]
+                del self._sorted_terms[bisect.bisect_left(self._sorted_terms, term)]
+                if term.isalnum():
+                    for gram in _trigrams(term):
+                        self._grams[gram].discard(term)
+                        if not self._grams[gram]:
+                            del self._grams[gram]
+        self._docs.pop(key, None)
+
+    def _fetch_after(self, kind: str, last_id: int) -> List[Dict]:
+        table = 'hackathon_participants' if kind == PARTICIPANT else 'registrations'
+        columns = PARTICIPANT_COLUMNS if kind == PARTICIPANT else REGISTRATION_COLUMNS
+        rows = []
+        while True:
+            page = self.db.table(table)\
+                .select(columns)\
+                .gt('id', last_id)\
+                .order('id')\
+                .limit(1000)\
+                .execute()
+            rows.extend(page.data)
+            if len(page.data) < 1000:
+                return rows
+            last_id = page.data[-1]['id']
+
+    def _catch_up(self, kind: str, reload: bool = False) -> int:
+        """Index rows newer than the watermark (or everything, dropping old docs)"""
+        rows = self._fetch_after(kind, 0 if reload else self._last_ids[kind])
+        with self._lock:
+            if reload:
+                # Rebuilding from scratch beats removing docs one by one
+                other = REGISTRATION if kind == PARTICIPANT else PARTICIPANT
+                kept = [doc for doc in self._docs.values() if doc['kind'] == other]
+                self._docs, self._doc_terms, self._postings = {}, {}, {}
+                self._sorted_terms, self._grams = [], defaultdict(set)
+                for doc in kept:
+                    self._add(other, doc, bulk=True)
+                self._last_ids[kind] = 0
+            watermark = None
+            for row in rows:
+                self._add(kind, row, bulk=reload)
+                # A registration gets its ticket_id just after insert; re-read
+                # from the first one still without it on the next catch-up
+                if kind == REGISTRATION and not row.get('ticket_id') and watermark is None:
+                    watermark = row['id'] - 1
+            if reload:
+                self._sorted_terms.sort()
+            if rows:
+                self._last_ids[kind] = rows[-1]['id'] if watermark is None else max(watermark, self._last_ids[kind])
+        return len(rows)
+
+    def _on_participants(self, key: Optional[str]) -> None:
+        if key == PARTICIPANTS_ADDED:
+            self._stale.add(PARTICIPANT)
+        else:
+            self._reload.add(PARTICIPANT)
+
+    def _on_registrations(self, key: Optional[str]) -> None:
+        # Edited rows (e.g. a corrected email) are below the watermark and
+        # archived rows are gone; both need a full reload
+        if key in (REGISTRATIONS_UPDATED, REGISTRATIONS_ARCHIVED):
+            self._reload.add(REGISTRATION)
+        else:
+            self._stale.add(REGISTRATION)
+
+    def refresh(self) -> None:
+        """Apply pending invalidations; loads everything on first use"""
+        with self._refresh_lock:
+            if not self._loaded:
+                self._build()
+                return
+            for kind in (PARTICIPANT, REGISTRATION):
+                if kind in self._reload:
+                    self._reload.discard(kind)
+                    self._stale.discard(kind)
+                    self._catch_up(kind, reload=True)
+                elif kind in self._stale:
+                    self._stale.discard(kind)
+                    self._catch_up(kind)
+
+    def rebuild(self) -> Dict:
+        """Reload both tables from the database"""
+        with self._refresh_lock:
+            self._build()
+        return self.stats()
+
+    def _build(self) -> None:
+        # Caller holds self._refresh_lock
+        self._stale.clear()
+        self._reload.clear()
+        participants = self._catch_up(PARTICIPANT, reload=True)
+        registrations = self._catch_up(REGISTRATION, reload=True)
+        self._loaded = True
+        print(f"🔎 Search index built: {participants} participants, {registrations} registrations, {len(self._postings)} terms")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'loaded': self._loaded,
+                'participants': sum(1 for k in self._docs if k[0] == PARTICIPANT),
+                'registrations': sum(1 for k in self._docs if k[0] == REGISTRATION),
+                'terms': len(self._postings),
+                'trigrams': len(self._grams)
+            }
+
+    # -- querying --
+
+    def _matches(self, token: str) -> Dict[str, float]:
+        """Indexed terms matching one query term, with their match score"""
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = EXACT
+
+        start = bisect.bisect_left(self._sorted_terms, token)
+        for term in self._sorted_terms[start:start + MAX_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            if term != token:
+                # Prefer completions that add fewer characters
+                matches[term] = PREFIX + 0.1 * len(token) / len(term)
+
+        # Only look for typos when the word as typed is not a known word and
+        # completes to almost nothing
+        if token not in matches and len(matches) < FUZZY_BELOW and len(token) >= 3 and token.isalnum():
+            max_edits = 1 if len(token) <= 5 else 2
+            query_grams = _trigrams(token)
+            shared: Dict[str, int] = defaultdict(int)
+            for gram in query_grams:
+                for term in self._grams.get(gram, ()):
+                    if abs(len(term) - len(token)) <= max_edits:
+                        shared[term] += 1
+            ranked = sorted(shared.items(), key=lambda item: item[1], reverse=True)[:MAX_FUZZY_CHECKS]
+            for term, count in ranked:
+                if term in matches:
+                    continue
+                similarity = 2 * count / (len(query_grams) + len(term) + 1)  # len(term) + 1 ~ len(_trigrams(term))
+                # Transpositions and short words share few trigrams
+                distance = _edit_distance(token, term, max_edits)
+                if distance <= max_edits:
+                    similarity = max(similarity, 1 - distance / max(len(token), len(term)))
+                if similarity >= MIN_SIMILARITY:
+                    matches[term] = FUZZY * similarity
+        return matches
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        kind: Optional[str] = None,
+        event_id: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Ranked people matching every term of `query` (as typed, by prefix or
+        approximately); people matching only some terms rank below
+
+        Args:
+            kind: 'participant' or 'registration' to search only one table
+            event_id: Only registrations for this event (participants are kept)
+        """
+        self.refresh()
+        tokens = _terms(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            matches = [self._matches(token) for token in tokens]
+            sizes = [sum(len(self._postings[term]) for term in terms) for terms in matches]
+            common = COMMON_FRACTION * len(self._docs)
+            if any(size <= common for size in sizes):
+                matches = [terms for terms, size in zip(matches, sizes) if size <= common]
+
+            scores: Dict[DocKey, float] = defaultdict(float)
+            hits: Dict[DocKey, int] = defaultdict(int)
+            for terms in matches:
+                best: Dict[DocKey, float] = {}
+                for term, match_score in terms.items():
+                    for key, weight in self._postings[term].items():
+                        score = match_score * weight
+                        if score > best.get(key, 0.0):
+                            best[key] = score
+                for key, score in best.items():
+                    scores[key] += score
+                    hits[key] += 1
+
+            results = []
+            for key, score in scores.items():
+                doc = self._docs[key]
+                if kind and doc['kind'] != kind:
+                    continue
+                if event_id is not None and doc['kind'] == REGISTRATION and doc['event_id'] != event_id:
+                    continue
+                results.append((hits[key], score, key))
+
+            results.sort(key=lambda item: (item[0], item[1]), reverse=True)
+            return [
+                {**self._docs[key], 'score': round(score / len(matches), 3)}
+                for _, score, key in results[:limit]
+            ]
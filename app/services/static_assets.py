@@ -0,0 +1,178 @@
+"""
+In-memory static asset pipeline
+
+At startup every file under static/ is read once, given a content-hash
+fingerprinted URL (/static/js/dashboard.<hash>.js) and precompressed
+(gzip, and brotli when the `brotli` package is installed). HTML pages
+(templates/*.html and static/*.html) are kept in memory with their
+/static/ references rewritten to the fingerprinted URLs, so browsers can
+cache assets forever and still pick up changes on the next deploy.
+
+With watch=True (settings.static_watch, for development), files are
+re-checked (mtime) at most once a second and changed assets are reloaded
+automatically. It is off by default: the check walks the static tree on
+the request path.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+PROJECT_ROOT = os.path.normpath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# Fingerprinted files only change name when their content changes
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.html', '.svg', '.json', '.txt', '.map')
+
+_ASSET_REF = re.compile(r'''((?:href|src)=["'])(/static/[^"'?#]+)''')
+
+
+class StaticAsset:
+    __slots__ = ('path', 'content_type', 'etag', 'variants', 'mtime', 'fingerprinted')
+
+    def __init__(self, path: str, content: bytes, mtime: float, content_type: str):
+        self.path = path
+        self.mtime = mtime
+        self.content_type = content_type
+        digest = hashlib.sha256(content).hexdigest()
+        self.etag = f'"{digest[:16]}"'
+        self.fingerprinted = _fingerprint(path, digest[:10])
+        self.variants: Dict[str, bytes] = {'identity': content}
+        if path.endswith(COMPRESSIBLE_EXTENSIONS) and len(content) > 256:
+            self.variants['gzip'] = gzip.compress(content, compresslevel=9)
+            try:
+                import brotli
+                self.variants['br'] = brotli.compress(content, quality=11)
+            except ImportError:
+                pass
+
+
+def _fingerprint(path: str, digest: str) -> str:
+    """css/dashboard.css -> css/dashboard.<digest>.css"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.{digest}{ext}"
+
+
+class AssetPipeline:
+    def __init__(
+        self,
+        static_dir: str = os.path.join(PROJECT_ROOT, 'static'),
+        templates_dir: str = os.path.join(PROJECT_ROOT, 'templates'),
+        url_prefix: str = '/static',
+        watch: bool = False
+    ):
+        self.static_dir = static_dir
+        self.templates_dir = templates_dir
+        self.url_prefix = url_prefix
+        self.watch = watch
+        self._assets: Dict[str, StaticAsset] = {}  # logical path -> asset
+        self._by_fingerprint: Dict[str, str] = {}  # fingerprinted path -> logical path
+        self._pages: Dict[str, StaticAsset] = {}  # template name -> rendered page
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+
+    def load(self) -> None:
+        """(Re)read all assets and pages"""
+        assets = {}
+        for root, _, files in os.walk(self.static_dir):
+            for name in files:
+                if name.endswith(('.gz', '.br')):
+                    continue
+                full = os.path.join(root, name)
+                logical = os.path.relpath(full, self.static_dir).replace(os.sep, '/')
+                assets[logical] = self._read_asset(full, logical)
+        with self._lock:
+            self._assets = assets
+            self._by_fingerprint = {a.fingerprinted: p for p, a in assets.items() if not p.endswith('.html')}
+            # Rewrite references inside static HTML pages too
+            for logical in [p for p in assets if p.endswith('.html')]:
+                assets[logical] = self._render_page(os.path.join(self.static_dir, logical), logical)
+            self._pages = {}
+        self._last_check = time.monotonic()
+
+    def _read_asset(self, full: str, logical: str) -> StaticAsset:
+        with open(full, 'rb') as f:
+            content = f.read()
+        content_type = mimetypes.guess_type(logical)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'image/svg+xml'):
+            content_type += '; charset=utf-8'
+        return StaticAsset(logical, content, os.path.getmtime(full), content_type)
+
+    def _render_page(self, full_path: str, logical: str) -> StaticAsset:
+        # Caller holds self._lock (reads self._assets)
+        with open(full_path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        html = _ASSET_REF.sub(lambda m: m.group(1) + self._url_for_locked(m.group(2)), html)
+        return StaticAsset(logical, html.encode('utf-8'), os.path.getmtime(full_path), 'text/html; charset=utf-8')
+
+    def _url_for_locked(self, url: str) -> str:
+        logical = url[len(self.url_prefix) + 1:]
+        asset = self._assets.get(logical)
+        if asset is None or logical.endswith('.html'):
+            return url
+        return f"{self.url_prefix}/{asset.fingerprinted}"
+
+    def url_for(self, logical: str) -> str:
+        """Fingerprinted URL for a static path like 'js/dashboard.js'"""
+        self._maybe_reload()
+        with self._lock:
+            return self._url_for_locked(f"{self.url_prefix}/{logical}")
+
+    def page(self, name: str) -> StaticAsset:
+        """A templates/ HTML page with fingerprinted asset URLs, cached in memory"""
+        self._maybe_reload()
+        with self._lock:
+            page = self._pages.get(name)
+            if page is None:
+                page = self._render_page(os.path.join(self.templates_dir, name), name)
+                self._pages[name] = page
+            return page
+
+    def lookup(self, path: str) -> Tuple[Optional[StaticAsset], bool]:
+        """
+        Resolve a request path under /static/
+
+        Returns:
+            (asset or None, True if requested by fingerprinted name)
+        """
+        self._maybe_reload()
+        with self._lock:
+            logical = self._by_fingerprint.get(path)
+            if logical is not None:
+                return self._assets.get(logical), True
+            return self._assets.get(path), False
+
+    def _maybe_reload(self) -> None:
+        """In watch mode, reload everything if any file changed (checked at most once a second)"""
+        if not self.watch or time.monotonic() - self._last_check < 1.0:
+            return
+        self._last_check = time.monotonic()
+        if self._changed():
+            print("🔄 Static files changed, reloading assets")
+            self.load()
+
+    def _changed(self) -> bool:
+        seen = set()
+        for root, _, files in os.walk(self.static_dir):
+            for name in files:
+                if name.endswith(('.gz', '.br')):
+                    continue
+                full = os.path.join(root, name)
+                logical = os.path.relpath(full, self.static_dir).replace(os.sep, '/')
+                seen.add(logical)
+                asset = self._assets.get(logical)
+                if asset is None or os.path.getmtime(full) != asset.mtime:
+                    return True
+        if seen != set(self._assets):
+            return True
+        for name, page in list(self._pages.items()):
+            full = os.path.join(self.templates_dir, name)
+            if not os.path.exists(full) or os.path.getmtime(full) != page.mtime:
+                return True
+        return False
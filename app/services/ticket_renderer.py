@@ -0,0 +1,204 @@
+"""
+Printed tickets for walk-in attendees
+
+Renders badges (app/utils/ticket_badge.py) in a process pool so drawing
+and PDF encoding never block the event loop or hold the GIL, and caches
+every badge on disk:
+
+    <ticket_cache_dir>/v<TEMPLATE_VERSION>-<dpi>dpi/<ticket_id>.png|.pdf
+    <ticket_cache_dir>/v<TEMPLATE_VERSION>-<dpi>dpi/events/<event_id>-<digest>.pdf
+
+Reprints are served straight from the cache. Changing the layout means
+bumping TEMPLATE_VERSION, which starts a fresh cache directory. A whole
+event PDF is keyed by a digest of its ticket ids, so it is reused until
+the event gains (or loses) a registration. The cache is plain files, so
+all workers share it and it survives restarts.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.db import get_supabase
+from app.utils.ticket_badge import TEMPLATE_VERSION, assemble_pdf, render_badges
+
+TICKET_ID_PATTERN = re.compile(r'^[A-Za-z0-9-]{1,50}$')
+FORMATS = ('pdf', 'png')
+RENDER_CHUNK = 25  # Badges per pool task in batch renders
+
+
+def _display_date(value: Optional[str]) -> str:
+    if not value:
+        return ''
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime('%B %d, %Y at %I:%M %p')
+
+
+class TicketRenderService:
+    def __init__(self, cache_dir: Optional[str] = None, workers: Optional[int] = None, dpi: Optional[int] = None):
+        self.dpi = dpi or settings.ticket_dpi
+        self.cache_dir = os.path.join(cache_dir or settings.ticket_cache_dir, f"v{TEMPLATE_VERSION}-{self.dpi}dpi")
+        self.workers = workers or settings.ticket_render_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'rendered': 0, 'event_pdfs': 0, 'event_pdf_hits': 0}
+
+    @property
+    def db(self):
+        return get_supabase()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Created on first render; 'spawn' because the server process has threads
+        with self._lock:
+            if self._executor is None:
+                import multiprocessing
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+
+    def _path(self, ticket_id: str, fmt: str) -> str:
+        return os.path.join(self.cache_dir, f"{ticket_id}.{fmt}")
+
+    # -- data --
+
+    def _ticket(self, ticket_id: str) -> Dict:
+        result = self.db.table('registrations')\
+            .select('ticket_id, name, college, events(name, event_date)')\
+            .eq('ticket_id', ticket_id)\
+            .execute()
+        if not result.data:
+            raise ValueError("Ticket not found")
+        return self._badge_fields(result.data[0], result.data[0]['events'])
+
+    @staticmethod
+    def _badge_fields(registration: Dict, event: Dict) -> Dict:
+        return {
+            'ticket_id': registration['ticket_id'],
+            'name': registration['name'],
+            'college': registration.get('college'),
+            'event_name': event['name'],
+            'event_date': _display_date(event.get('event_date'))
+        }
+
+    def _event_tickets(self, event_id: int) -> List[Dict]:
+        event = self.db.table('events')\
+            .select('name, event_date')\
+            .eq('id', event_id)\
+            .execute()
+        if not event.data:
+            raise ValueError("Event not found")
+
+        tickets, last_id = [], 0
+        while True:
+            page = self.db.table('registrations')\
+                .select('id, ticket_id, name, college')\
+                .eq('event_id', event_id)\
+                .gt('id', last_id)\
+                .order('id')\
+                .limit(1000)\
+                .execute()
+            tickets.extend(self._badge_fields(row, event.data[0]) for row in page.data if row.get('ticket_id'))
+            if len(page.data) < 1000:
+                break
+            last_id = page.data[-1]['id']
+        # Printed stacks are easier to hand out in name order
+        tickets.sort(key=lambda t: ((t['name'] or '').lower(), t['ticket_id']))
+        return tickets
+
+    # -- rendering --
+
+    async def ticket_file(self, ticket_id: str, fmt: str = 'pdf', refresh: bool = False) -> str:
+        """
+        Path of the rendered badge for one ticket, rendering it if needed
+
+        Args:
+            fmt: 'pdf' (one page) or 'png'
+            refresh: Re-render even if cached (e.g. after a name fix)
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if not TICKET_ID_PATTERN.match(ticket_id):
+            raise ValueError("Ticket not found")
+
+        path = self._path(ticket_id, fmt)
+        if not refresh and os.path.exists(path):
+            self.stats['hits'] += 1
+            return path
+
+        png = self._path(ticket_id, 'png')
+        if refresh or not os.path.exists(png):
+            ticket = await asyncio.to_thread(self._ticket, ticket_id)
+            await self._run(render_badges, [ticket], [png], self.dpi)
+            self.stats['rendered'] += 1
+        if fmt == 'pdf':
+            await self._run(assemble_pdf, [png], path, self.dpi)
+        return path
+
+    async def event_file(self, event_id: int) -> Tuple[str, int]:
+        """
+        One PDF with a badge per ticketed registration of the event
+
+        Returns:
+            (path, number of pages)
+        """
+        tickets = await asyncio.to_thread(self._event_tickets, event_id)
+        if not tickets:
+            raise ValueError("Event has no tickets to print")
+
+        digest = hashlib.sha1('\n'.join(t['ticket_id'] for t in tickets).encode()).hexdigest()[:16]
+        path = os.path.join(self.cache_dir, 'events', f"{event_id}-{digest}.pdf")
+        if os.path.exists(path):
+            self.stats['event_pdf_hits'] += 1
+            return path, len(tickets)
+
+        missing = [t for t in tickets if not os.path.exists(self._path(t['ticket_id'], 'png'))]
+        if missing:
+            print(f"🖨️ Rendering {len(missing)} badges for event {event_id} on {self.workers} processes")
+            await asyncio.gather(*(
+                self._run(
+                    render_badges,
+                    missing[i:i + RENDER_CHUNK],
+                    [self._path(t['ticket_id'], 'png') for t in missing[i:i + RENDER_CHUNK]],
+                    self.dpi
+                )
+                for i in range(0, len(missing), RENDER_CHUNK)
+            ))
+            self.stats['rendered'] += len(missing)
+
+        await self._run(assemble_pdf, [self._path(t['ticket_id'], 'png') for t in tickets], path, self.dpi)
+        self.stats['event_pdfs'] += 1
+        self._drop_old_event_pdfs(event_id, path)
+        return path, len(tickets)
+
+    def _drop_old_event_pdfs(self, event_id: int, keep: str) -> None:
+        directory = os.path.dirname(keep)
+        for name in os.listdir(directory):
+            if name.startswith(f"{event_id}-") and name.endswith('.pdf') and os.path.join(directory, name) != keep:
+                try:
+                    os.unlink(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def status(self) -> Dict:
+        return {
+            'template_version': TEMPLATE_VERSION,
+            'dpi': self.dpi,
+            'cache_dir': self.cache_dir,
+            'workers': self.workers,
+            'pool_started': self._executor is not None,
+            **self.stats
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
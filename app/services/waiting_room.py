@@ -0,0 +1,208 @@
+"""
+Virtual waiting room for registration spikes
+
+Registrations run with bounded concurrency behind a FIFO queue. Requests
+are turned away early (before queueing) when they exceed the per-IP or
+per-email rate limit, when the queue is full, or when the event's remaining
+capacity is already claimed by registrations in flight.
+
+Clients that want to poll their position first get a token from
+issue_token() and send it with the registration. Only tokens issued here
+(and not already waiting) are used as queue keys; anything else a client
+sends is replaced by an internal token, so one client cannot take over or
+evict another's queue entry.
+"""
+import asyncio
+import itertools
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, Optional, Tuple
+from app.config import settings
+from app.services.profiler import follow
+
+ISSUED_TOKEN_TTL = 600.0  # Seconds an issued queue token stays usable
+ISSUED_TOKEN_LIMIT = 100000
+
+
+class WaitingRoomRejected(Exception):
+    """Request refused before reaching the registration backend"""
+
+    def __init__(self, status_code: int, message: str, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Sliding-window limit of `limit` hits per `window` seconds per key"""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._hits: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> Optional[int]:
+        """
+        Record a hit
+
+        Returns:
+            None if allowed, else seconds until the next hit is allowed
+        """
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.setdefault(key, deque())
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return max(1, int(hits[0] + self.window - now) + 1)
+            hits.append(now)
+            if len(self._hits) > 100000:
+                self._prune(now)
+            return None
+
+    def _prune(self, now: float) -> None:
+        for key in [k for k, h in self._hits.items() if not h or h[-1] <= now - self.window]:
+            del self._hits[key]
+
+
+class WaitingRoom:
+    def __init__(
+        self,
+        capacity_loader: Callable[[int], int],
+        concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        capacity_ttl: float = 5.0
+    ):
+        """
+        Args:
+            capacity_loader: Blocking function returning an event's remaining capacity
+            concurrency: Registrations processed at once
+            max_queue: Waiting requests allowed before new ones get 503
+            queue_timeout: Seconds a request may wait for a slot
+            capacity_ttl: Seconds a loaded remaining-capacity value is trusted
+        """
+        self.capacity_loader = capacity_loader
+        self.concurrency = concurrency or settings.registration_concurrency
+        self.max_queue = settings.registration_queue_limit if max_queue is None else max_queue
+        self.queue_timeout = settings.registration_queue_timeout if queue_timeout is None else queue_timeout
+        self.capacity_ttl = capacity_ttl
+
+        self.ip_limiter = RateLimiter(settings.registration_rate_limit_ip, 60)
+        self.email_limiter = RateLimiter(settings.registration_rate_limit_email, 60)
+
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._waiting: "OrderedDict[str, float]" = OrderedDict()  # token -> enqueue time
+        self._tokens = itertools.count(1)
+        self._issued: "OrderedDict[str, float]" = OrderedDict()  # token -> issued at
+        self._capacity: Dict[int, Tuple[int, float]] = {}  # event_id -> (remaining, loaded at)
+        self._reserved: Dict[int, int] = {}  # event_id -> registrations in flight
+        self._avg_service = 1.0  # EWMA of seconds per registration
+
+    def new_token(self) -> str:
+        """Internal queue key for a request without an issued token"""
+        return f"i{next(self._tokens)}"
+
+    def issue_token(self) -> str:
+        """Unguessable token a client sends with its registration to poll its position"""
+        now = time.monotonic()
+        while self._issued and (
+            len(self._issued) >= ISSUED_TOKEN_LIMIT or next(iter(self._issued.values())) <= now - ISSUED_TOKEN_TTL
+        ):
+            self._issued.popitem(last=False)
+        token = f"q-{secrets.token_urlsafe(16)}"
+        self._issued[token] = now
+        return token
+
+    def _claim(self, token: Optional[str]) -> str:
+        # Issued tokens are single-use; unknown or reused values get an internal key
+        issued_at = self._issued.pop(token, None) if token else None
+        if issued_at is None or time.monotonic() - issued_at > ISSUED_TOKEN_TTL or token in self._waiting:
+            return self.new_token()
+        return token
+
+    def check_rate(self, client_ip: str, email: str) -> None:
+        for limiter, key, what in ((self.ip_limiter, client_ip, "address"), (self.email_limiter, email, "email")):
+            retry_after = limiter.hit(key)
+            if retry_after is not None:
+                raise WaitingRoomRejected(429, f"Too many registration attempts from this {what}", retry_after)
+
+    async def _remaining(self, event_id: int) -> int:
+        cached = self._capacity.get(event_id)
+        if cached is None or time.monotonic() - cached[1] > self.capacity_ttl:
+            remaining = await asyncio.to_thread(follow(self.capacity_loader), event_id)
+            cached = (remaining, time.monotonic())
+            self._capacity[event_id] = cached
+        return cached[0] - self._reserved.get(event_id, 0)
+
+    def invalidate_capacity(self, event_id: Optional[str] = None) -> None:
+        """Forget cached capacity (all events, or one)"""
+        if event_id is None:
+            self._capacity.clear()
+        elif event_id.isdigit():
+            self._capacity.pop(int(event_id), None)
+
+    @asynccontextmanager
+    async def admit(self, event_id: int, token: Optional[str] = None):
+        """
+        Wait for a processing slot, holding one unit of the event's capacity
+
+        Args:
+            token: A token from issue_token(); other values are ignored
+
+        Raises:
+            WaitingRoomRejected: queue full, event full, or waited too long
+        """
+        if await self._remaining(event_id) <= 0:
+            raise WaitingRoomRejected(400, "Event is full")
+        if len(self._waiting) >= self.max_queue:
+            raise WaitingRoomRejected(503, "Registration queue is full, please retry shortly", self._eta(len(self._waiting)))
+
+        token = self._claim(token)
+        self._reserved[event_id] = self._reserved.get(event_id, 0) + 1
+        self._waiting[token] = time.monotonic()
+        acquired = False
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+                acquired = True
+            except asyncio.TimeoutError:
+                raise WaitingRoomRejected(503, "Registration is busy, please retry shortly", self._eta(len(self._waiting)))
+            finally:
+                self._waiting.pop(token, None)
+
+            started = time.monotonic()
+            yield token
+            self._avg_service = 0.8 * self._avg_service + 0.2 * (time.monotonic() - started)
+            # Capacity used; the cached count is now one lower
+            remaining, loaded_at = self._capacity.get(event_id, (0, 0.0))
+            self._capacity[event_id] = (remaining - 1, loaded_at)
+        finally:
+            self._reserved[event_id] -= 1
+            if acquired:
+                self._slots.release()
+
+    def _eta(self, position: int) -> int:
+        """Estimated seconds until a request at this queue position is served"""
+        return int(position * self._avg_service / self.concurrency) + 1
+
+    def status(self, token: Optional[str] = None) -> Dict:
+        """Queue length and ETA, plus position for a token still waiting"""
+        result = {
+            'queue_length': len(self._waiting),
+            'concurrency': self.concurrency,
+            'avg_seconds_per_registration': round(self._avg_service, 3),
+            'eta_seconds_for_new_request': self._eta(len(self._waiting) + 1)
+        }
+        if token is not None:
+            if token in self._waiting:
+                position = list(self._waiting).index(token) + 1
+                result.update({'token': token, 'position': position, 'eta_seconds': self._eta(position)})
+            else:
+                result.update({'token': token, 'position': None})
+        return result
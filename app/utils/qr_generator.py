@@ -1,4 +1,3 @@
-import qrcode
 import io
 import base64
 from typing import Optional
@@ -14,17 +13,7 @@ def generate_qr_code(data: str) -> str:
     Returns:
         Base64 encoded PNG image string
     """
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    
-    qr.add_data(data)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
+    img = make_qr_image(data)
     
     # Convert to base64
     buffer = io.BytesIO()
@@ -34,6 +23,30 @@ def generate_qr_code(data: str) -> str:
     return f"data:image/png;base64,{img_str}"
 
 
+def make_qr_image(data: str, box_size: int = 10, border: int = 4, error_correction: Optional[int] = None):
+    """
+    Build the QR code as a 1-bit PIL image
+    
+    Args:
+        box_size: Pixels per module
+        error_correction: qrcode.constants.ERROR_CORRECT_*; default L
+    """
+    # Imported here so qrcode/Pillow load on first use, not at app startup
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L if error_correction is None else error_correction,
+        box_size=box_size,
+        border=border,
+    )
+    
+    qr.add_data(data)
+    qr.make(fit=True)
+    
+    return qr.make_image(fill_color="black", back_color="white")
+
+
 def generate_ticket_id(event_id: int, registration_id: int) -> str:
     """
     Generate unique ticket ID
@@ -0,0 +1,44 @@
+import subprocess
+import sys
+from typing import List, Tuple
+
+
+def profile_imports(module: str = "main") -> List[Tuple[str, int, int, int]]:
+    """
+    Import a module in a fresh interpreter under `python -X importtime`
+
+    Returns:
+        List of (module name, nesting depth, self µs, cumulative µs), in import order
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            name = name.rstrip()
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue  # header line
+    return entries
+
+
+def print_import_summary(module: str = "main", top: int = 25) -> None:
+    """Print total import time and the slowest top-level packages"""
+    entries = profile_imports(module)
+    packages = [(name, cum) for name, depth, _, cum in entries if depth == 0]
+    total_us = sum(cum for _, cum in packages)
+
+    print(f"⏱️  Importing '{module}' took {total_us / 1000:.1f} ms ({len(entries)} modules)")
+    print(f"{'cumulative ms':>14}  package")
+    for name, cum in sorted(packages, key=lambda p: p[1], reverse=True)[:top]:
+        print(f"{cum / 1000:>14.1f}  {name}")
@@ -0,0 +1,132 @@
+"""
+Printable ticket badges (Pillow only)
+
+A badge is a 4x6 inch portrait page: event name and date on a black
+band, the participant's name and college, the ticket QR code and the
+ticket ID. Pages are 1-bit, so PNGs stay small and PDFs embed them
+losslessly (CCITT G4) and the QR code prints sharp.
+
+These functions run in the ticket renderer's worker processes
+(app/services/ticket_renderer.py), so they only take plain data and file
+paths and import nothing from app.config.
+"""
+import os
+import tempfile
+from typing import Dict, List
+
+# Bump whenever the layout changes; cached badges are keyed by it
+TEMPLATE_VERSION = 1
+
+WIDTH_IN, HEIGHT_IN = 4, 6
+PDF_CHUNK_PAGES = 100  # Pages decoded at once while assembling a PDF
+
+
+def _font(size: int):
+    from PIL import ImageFont
+    return ImageFont.load_default(size=size)
+
+
+def _fit(draw, text: str, max_width: int, size: int, min_size: int):
+    """Largest font (down to min_size) that fits; text is truncated below that"""
+    text = ' '.join((text or '').split())
+    while size > min_size and draw.textlength(text, font=_font(size)) > max_width:
+        size -= max(1, size // 12)
+    font = _font(max(size, min_size))
+    if draw.textlength(text, font=font) > max_width:
+        while text and draw.textlength(text + '…', font=font) > max_width:
+            text = text[:-1]
+        text = text.rstrip() + '…'
+    return text, font
+
+
+def _centered(draw, y: int, text: str, width: int, size: int, min_size: int, fill: int) -> None:
+    margin = width // 16
+    text, font = _fit(draw, text, width - 2 * margin, size, min_size)
+    draw.text((width // 2, y), text, font=font, fill=fill, anchor='mt')
+
+
+def render_badge(ticket: Dict, dpi: int = 300):
+    """
+    Draw one badge
+
+    Args:
+        ticket: ticket_id, name, college, event_name, event_date (display string)
+
+    Returns:
+        1-bit PIL image of WIDTH_IN x HEIGHT_IN inches at `dpi`
+    """
+    from PIL import Image, ImageDraw
+    import qrcode
+    from app.utils.qr_generator import make_qr_image
+
+    width, height = WIDTH_IN * dpi, HEIGHT_IN * dpi
+    inch = lambda value: int(value * dpi)
+    page = Image.new('L', (width, height), 255)
+    draw = ImageDraw.Draw(page)
+
+    draw.rectangle((0, 0, width, inch(1.15)), fill=0)
+    _centered(draw, inch(0.25), ticket.get('event_name') or '', width, inch(0.34), inch(0.16), 255)
+    _centered(draw, inch(0.72), ticket.get('event_date') or '', width, inch(0.17), inch(0.12), 255)
+
+    _centered(draw, inch(1.45), ticket.get('name') or '', width, inch(0.42), inch(0.18), 0)
+    if ticket.get('college'):
+        _centered(draw, inch(2.0), ticket['college'], width, inch(0.2), inch(0.12), 0)
+
+    # Medium error correction: printed codes get creased and smudged
+    qr = make_qr_image(ticket['ticket_id'], box_size=1, border=2, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr = qr.get_image().convert('L')
+    # Whole pixels per module keep the modules even
+    qr_size = qr.width * max(1, inch(2.6) // qr.width)
+    qr = qr.resize((qr_size, qr_size), Image.NEAREST)
+    page.paste(qr, ((width - qr_size) // 2, inch(2.4) + (inch(2.6) - qr_size) // 2))
+
+    _centered(draw, inch(5.1), ticket['ticket_id'], width, inch(0.16), inch(0.1), 0)
+    _centered(draw, inch(5.5), 'Present this badge at check-in', width, inch(0.12), inch(0.1), 0)
+
+    return page.convert('1', dither=Image.Dither.NONE)
+
+
+def _write_atomic(path: str, save) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        save(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def render_badges(tickets: List[Dict], paths: List[str], dpi: int = 300) -> int:
+    """Render tickets[i] to the PNG file paths[i]; returns the number written"""
+    for ticket, path in zip(tickets, paths):
+        badge = render_badge(ticket, dpi)
+        _write_atomic(path, lambda tmp: badge.save(tmp, format='PNG', dpi=(dpi, dpi)))
+    return len(tickets)
+
+
+def assemble_pdf(png_paths: List[str], out_path: str, dpi: int = 300) -> str:
+    """
+    Combine badge PNGs into one PDF, one badge per page
+
+    Pages are appended PDF_CHUNK_PAGES at a time, so memory stays bounded
+    for whole-event batches.
+    """
+    from PIL import Image
+
+    def save(tmp: str) -> None:
+        for start in range(0, len(png_paths), PDF_CHUNK_PAGES):
+            pages = [Image.open(path) for path in png_paths[start:start + PDF_CHUNK_PAGES]]
+            try:
+                pages[0].save(
+                    tmp, format='PDF', resolution=dpi, save_all=True,
+                    append_images=pages[1:], append=start > 0
+                )
+            finally:
+                for page in pages:
+                    page.close()
+
+    _write_atomic(out_path, save)
+    return out_path
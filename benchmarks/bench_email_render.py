@@ -0,0 +1,170 @@
+"""
+Ticket email rendering: legacy f-string vs. compiled Jinja2 template
+
+Checks that the template produces the same markup as the f-string that
+send_ticket_email used to build, then reports renders/sec for single
+renders and for the batch API.
+
+Usage:
+    python -m benchmarks.bench_email_render [count]
+"""
+import sys
+import time
+
+from benchmarks.fakes import bench_env
+
+bench_env()
+
+from app.config import settings  # noqa: E402
+from app.services.email_templates import preload, render_ticket_email, render_ticket_emails  # noqa: E402
+
+
+def legacy_ticket_html(recipient_name, event_name, event_date, ticket_id):
+    """The HTML build previously inlined in send_ticket_email"""
+    return f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <style>
+        body {{
+            font-family: Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+            max-width: 600px;
+            margin: 0 auto;
+            padding: 20px;
+        }}
+        .header {{
+            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+            color: white;
+            padding: 30px;
+            text-align: center;
+            border-radius: 10px 10px 0 0;
+        }}
+        .content {{
+            background: #f9f9f9;
+            padding: 30px;
+            border-radius: 0 0 10px 10px;
+        }}
+        .ticket-box {{
+            background: white;
+            padding: 20px;
+            margin: 20px 0;
+            border-radius: 8px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }}
+        .info-row {{
+            padding: 10px;
+            margin: 8px 0;
+            background: #f0f0f0;
+            border-radius: 4px;
+            border-left: 4px solid #667eea;
+        }}
+        .label {{
+            font-weight: bold;
+            color: #667eea;
+        }}
+        .alert {{
+            background: #fff3cd;
+            border: 2px solid #ffc107;
+            border-radius: 8px;
+            padding: 15px;
+            margin: 20px 0;
+        }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>🎉 Your Event Ticket</h1>
+    </div>
+    
+    <div class="content">
+        <h2>Hello {recipient_name}!</h2>
+        <p>Your registration for <strong>{event_name}</strong> is confirmed!</p>
+        
+        <div class="ticket-box">
+            <div class="info-row">
+                <span class="label">Event:</span> {event_name}
+            </div>
+            <div class="info-row">
+                <span class="label">Date:</span> {event_date}
+            </div>
+            <div class="info-row">
+                <span class="label">Ticket ID:</span> {ticket_id}
+            </div>
+        </div>
+        
+        <div class="alert">
+            <strong>📎 QR Code Attached!</strong>
+            <p>Your ticket QR code is attached to this email as <strong>"ticket_qr_code.png"</strong></p>
+            <ul>
+                <li>Download the attachment</li>
+                <li>Save it on your phone</li>
+                <li>Show it at the event entrance</li>
+            </ul>
+        </div>
+        
+        <p><strong>Important:</strong></p>
+        <ul>
+            <li>Keep this email and attachment safe</li>
+            <li>Arrive 15 minutes before the event</li>
+            <li>Bring valid ID for verification</li>
+        </ul>
+        
+        <p style="text-align: center; font-size: 18px; margin-top: 30px;">
+            See you at the event! 🚀
+        </p>
+        
+        <div style="text-align: center; margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; font-size: 12px;">
+            <p>{settings.app_name}</p>
+            <p>Contact event organizers if you have questions</p>
+        </div>
+    </div>
+</body>
+</html>
+        """
+
+
+SAMPLE = {
+    'recipient_name': 'Jane Smith',
+    'event_name': 'AI Workshop',
+    'event_date': 'March 14, 2026 at 10:00 AM',
+    'ticket_id': 'EVT0001-REG000042-AB12CD',
+}
+
+
+def check_markup() -> None:
+    legacy = legacy_ticket_html(**SAMPLE).strip()
+    rendered = render_ticket_email(**SAMPLE).strip()
+    assert legacy == rendered, "template output differs from the legacy markup"
+    print("✅ Template output matches legacy markup")
+
+
+def rate(label: str, count: int, seconds: float) -> None:
+    print(f"{label:<32} {count / seconds:>12,.0f} renders/sec")
+
+
+def main(count: int = 20000) -> None:
+    preload()
+    check_markup()
+
+    recipients = [{**SAMPLE, 'recipient_name': f'Participant {i}'} for i in range(count)]
+
+    start = time.perf_counter()
+    for r in recipients:
+        legacy_ticket_html(**r)
+    rate("legacy f-string", count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for r in recipients:
+        render_ticket_email(**r)
+    rate("jinja2, one at a time", count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    render_ticket_emails(recipients)
+    rate("jinja2, batch", count, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
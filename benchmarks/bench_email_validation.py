@@ -0,0 +1,91 @@
+"""
+CSV email validation: per-row DNS vs. per-domain cached DNS
+
+Builds a synthetic 100k-row participant file spread over a few college
+domains and times:
+  - the old path (validate_email with a DNS lookup per row), extrapolated
+    from a sample because it is linear in rows
+  - EmailValidationEngine with DNS once per domain
+  - EmailValidationEngine in offline (syntax-only) mode
+
+DNS is simulated with a fixed latency so results do not depend on the
+network.
+
+Usage:
+    python -m benchmarks.bench_email_validation [rows] [dns_latency_ms]
+"""
+import csv
+import io
+import sys
+import time
+
+from benchmarks.fakes import bench_env
+
+bench_env()
+
+from email_validator import validate_email  # noqa: E402
+from app.services.email_validation import EmailValidationEngine  # noqa: E402
+
+DOMAINS = [f"college{i}.edu" for i in range(20)] + ["gmail.com", "outlook.com", "yahoo.com"]
+
+
+def synthetic_csv(rows: int) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["name", "email", "college", "phone"])
+    for i in range(rows):
+        domain = DOMAINS[i % len(DOMAINS)]
+        writer.writerow([f"Participant {i}", f"participant{i}@{domain}", domain, "+919876543210"])
+    return buffer.getvalue().encode()
+
+
+def read_emails(content: bytes) -> list:
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8")))
+    return [row["email"].strip().lower() for row in reader]
+
+
+def main(rows: int = 100_000, dns_latency_ms: float = 20.0) -> None:
+    latency = dns_latency_ms / 1000
+    lookups = {"count": 0}
+
+    def simulated_dns(domain):
+        lookups["count"] += 1
+        time.sleep(latency)
+        return None
+
+    emails = read_emails(synthetic_csv(rows))
+    print(f"{rows} rows, {len(DOMAINS)} domains, simulated DNS latency {dns_latency_ms} ms")
+
+    sample = emails[:500]
+    start = time.perf_counter()
+    for email in sample:
+        validate_email(email, check_deliverability=False)
+        simulated_dns(email.split("@")[1])
+    per_row = (time.perf_counter() - start) / len(sample)
+    print(f"{'per-row DNS (extrapolated)':<32} {per_row * rows:>10.2f} s  ({rows} lookups)")
+
+    lookups["count"] = 0
+    engine = EmailValidationEngine(offline=False, timeout=5.0, domain_checker=simulated_dns)
+    start = time.perf_counter()
+    errors = engine.validate(emails)
+    elapsed = time.perf_counter() - start
+    print(f"{'per-domain DNS, cold cache':<32} {elapsed:>10.2f} s  ({lookups['count']} lookups)")
+
+    lookups["count"] = 0
+    start = time.perf_counter()
+    engine.validate(emails)
+    elapsed = time.perf_counter() - start
+    print(f"{'per-domain DNS, warm cache':<32} {elapsed:>10.2f} s  ({lookups['count']} lookups)")
+
+    offline = EmailValidationEngine(offline=True)
+    start = time.perf_counter()
+    offline.validate(emails)
+    elapsed = time.perf_counter() - start
+    print(f"{'offline (syntax only)':<32} {elapsed:>10.2f} s")
+
+    assert not any(errors), "synthetic addresses should all validate"
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 100_000, float(args[1]) if len(args) > 1 else 20.0)
@@ -0,0 +1,127 @@
+"""
+Ticket email throughput: SendGrid HTTP vs. SMTP, per-message vs. pooled
+
+Sends `count` real ticket emails (rendered template + QR attachment) with
+`concurrency` senders through:
+  - smtp, connect per message: a new aiosmtplib connection (EHLO, AUTH,
+    QUIT) for every message
+  - smtp, pooled: SMTPTransport with one connection and with one per
+    sender
+  - sendgrid: SendGridTransport with FakeSendGrid sleeping 3 round trips
+    per request (TCP + TLS handshake + POST; the client does not keep
+    connections alive)
+
+The SMTP server is the local SMTPSink, answering every command after
+`rtt` milliseconds to model a remote server. It offers no STARTTLS, so
+the per-message case does not even pay the TLS handshake a real server
+would add to every connection.
+
+Usage:
+    python -m benchmarks.bench_mail_transport [count] [concurrency] [rtt_ms]
+"""
+import asyncio
+import sys
+import time
+
+from benchmarks.fakes import FakeSendGrid, SMTPSink, bench_env, install_fake_sendgrid
+
+bench_env()
+install_fake_sendgrid()
+
+from app.services.email_templates import preload, render_ticket_email  # noqa: E402
+from app.services.mail_transport import MailMessage, SendGridTransport, SMTPTransport  # noqa: E402
+from app.utils.qr_generator import generate_qr_code  # noqa: E402
+
+CREDENTIALS = ('bench', 'secret')
+
+
+def ticket_messages(count: int) -> list:
+    preload()
+    qr = generate_qr_code('EVT0001-REG000001-BENCH0').split('base64,')[1]
+    return [
+        MailMessage(
+            to_email=f'participant{i}@example.com',
+            to_name=f'Participant {i}',
+            subject='🎫 Your Ticket for Bench Event',
+            html=render_ticket_email(
+                recipient_name=f'Participant {i}',
+                event_name='Bench Event',
+                event_date='2026-01-01 10:00',
+                ticket_id=f'EVT0001-REG{i:06d}-BENCH0',
+                event_id=1
+            ),
+            attachments=[('ticket_qr_code.png', qr, 'image/png')],
+            custom_args={'ticket_id': f'EVT0001-REG{i:06d}-BENCH0', 'event_id': '1'}
+        )
+        for i in range(count)
+    ]
+
+
+class SlowSendGrid(FakeSendGrid):
+    rtt = 0.0
+
+    def send(self, message):
+        time.sleep(3 * self.rtt)
+        return super().send(message)
+
+
+async def run_senders(send, messages: list, concurrency: int) -> float:
+    queue = iter(messages)
+
+    async def sender():
+        for message in queue:
+            await send(message)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(sender() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def main(count: int, concurrency: int, rtt: float) -> None:
+    import aiosmtplib
+
+    messages = ticket_messages(count)
+    sink = await SMTPSink(latency=rtt, credentials=CREDENTIALS).start()
+    SlowSendGrid.rtt = rtt
+    import sendgrid
+    sendgrid.SendGridAPIClient = SlowSendGrid
+
+    def smtp(pool_size: int) -> SMTPTransport:
+        return SMTPTransport(
+            hostname=sink.host, port=sink.port, username=CREDENTIALS[0], password=CREDENTIALS[1],
+            use_tls=False, pool_size=pool_size, max_messages=1000, idle_timeout=60
+        )
+
+    async def connect_per_message(message: MailMessage) -> None:
+        await aiosmtplib.send(
+            smtp(1)._mime(message), sender='bench@example.com', recipients=[message.to_email],
+            hostname=sink.host, port=sink.port, username=CREDENTIALS[0], password=CREDENTIALS[1]
+        )
+
+    pooled_1, pooled_n = smtp(1), smtp(concurrency)
+    cases = (
+        ('smtp, connect per message', connect_per_message),
+        ('smtp, pooled x1', pooled_1.send),
+        (f'smtp, pooled x{concurrency}', pooled_n.send),
+        ('sendgrid http', SendGridTransport('bench').send),
+    )
+
+    print(f"{count} ticket emails, {concurrency} concurrent senders, {rtt * 1000:.1f} ms round trip")
+    print(f"{'transport':<28}{'msgs/s':>10}{'seconds':>10}{'connections':>13}")
+    for label, send in cases:
+        connections = sink.connections
+        elapsed = await run_senders(send, messages, concurrency)
+        opened = sink.connections - connections if label.startswith('smtp') else '-'
+        print(f"{label:<28}{count / elapsed:>10.0f}{elapsed:>10.2f}{opened:>13}")
+
+    await pooled_1.close()
+    await pooled_n.close()
+    await sink.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+        float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.005
+    ))
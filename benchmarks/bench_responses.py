@@ -0,0 +1,85 @@
+"""
+JSON serialisation and compression for large list responses
+
+Builds realistic /registrations/event/{id} rows (with base64 QR data URLs)
+and /csv/participants rows at 1k and 10k rows, then compares:
+  - stdlib json (Starlette JSONResponse) vs orjson (ORJSONResponse) render time
+  - bytes on the wire uncompressed, gzip and zstd, with compression time
+
+Usage:
+    python -m benchmarks.bench_responses
+"""
+import gzip
+import time
+
+from benchmarks.fakes import bench_env
+
+bench_env()
+
+import zstandard  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from app.utils.qr_generator import generate_qr_code  # noqa: E402
+
+
+def registration_rows(n: int) -> list:
+    qr = generate_qr_code("EVT0001-REG000001-ABCDEF")
+    return [
+        {
+            'id': i,
+            'event_id': 1,
+            'name': f'Participant {i}',
+            'email': f'participant{i}@college{i % 20}.edu',
+            'phone': '+919876543210',
+            'college': f'College {i % 20}',
+            'ticket_id': f'EVT0001-REG{i:06d}-ABCDEF',
+            'qr_code_url': qr,
+            'checked_in': i % 3 == 0,
+            'checked_in_at': '2026-03-14T10:15:00+00:00' if i % 3 == 0 else None,
+            'created_at': '2026-03-01T09:00:00+00:00',
+            'updated_at': '2026-03-01T09:00:00+00:00',
+        }
+        for i in range(n)
+    ]
+
+
+def participant_rows(n: int) -> list:
+    return [
+        {
+            'id': i,
+            'name': f'Hacker {i}',
+            'email': f'hacker{i}@college{i % 20}.edu',
+            'college': f'College {i % 20}',
+            'phone': '+919876543210',
+            'imported_at': '2026-03-01T09:00:00+00:00',
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn, repeat: int = 5):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def main() -> None:
+    zstd = zstandard.ZstdCompressor(level=3)
+    print(f"{'payload':<26}{'json ms':>9}{'orjson ms':>11}{'raw KB':>10}"
+          f"{'gzip KB':>10}{'gzip ms':>9}{'zstd KB':>10}{'zstd ms':>9}")
+    for label, builder in (('registrations', registration_rows), ('participants', participant_rows)):
+        for n in (1000, 10000):
+            rows = builder(n)
+            _, json_ms = timed(lambda: JSONResponse(rows).body)
+            body, orjson_ms = timed(lambda: ORJSONResponse(rows).body)
+            gz, gzip_ms = timed(lambda: gzip.compress(body, compresslevel=6), repeat=3)
+            zs, zstd_ms = timed(lambda: zstd.compress(body), repeat=3)
+            print(f"{f'{label} x{n}':<26}{json_ms:>9.1f}{orjson_ms:>11.1f}{len(body) / 1024:>10.0f}"
+                  f"{len(gz) / 1024:>10.0f}{gzip_ms:>9.1f}{len(zs) / 1024:>10.0f}{zstd_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
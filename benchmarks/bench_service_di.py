@@ -0,0 +1,66 @@
+"""
+Per-request overhead of building services vs. shared singletons
+
+Compares constructing CheckInService() (which also builds a CSVService) on
+every call against resolving the app-lifetime instance through the FastAPI
+dependency, both directly and through a full TestClient round-trip.
+
+Usage:
+    python -m benchmarks.bench_service_di
+"""
+import timeit
+
+from benchmarks.fakes import FakeSupabase, bench_env, seed_event
+
+bench_env()
+
+import app.db  # noqa: E402
+
+fake_db = FakeSupabase()
+app.db._client = fake_db
+event_id = seed_event(fake_db, registrations=10, participants=10)
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from app.dependencies import get_checkin_service, init_services  # noqa: E402
+from app.services.checkin_service import CheckInService  # noqa: E402
+
+
+def build_app() -> FastAPI:
+    bench_app = FastAPI()
+    init_services(bench_app)
+
+    @bench_app.get("/per-request")
+    async def per_request():
+        service = CheckInService()
+        return {"ok": service is not None}
+
+    @bench_app.get("/shared")
+    async def shared(service: CheckInService = Depends(get_checkin_service)):
+        return {"ok": service is not None}
+
+    return bench_app
+
+
+def report(label: str, seconds: float, n: int) -> None:
+    print(f"{label:<40} {seconds / n * 1e6:>10.2f} µs/op")
+
+
+def main(n: int = 20000, http_n: int = 2000) -> None:
+    bench_app = build_app()
+    shared = bench_app.state.checkin_service
+
+    report("construct CheckInService()", timeit.timeit(CheckInService, number=n), n)
+    report("reuse shared CheckInService", timeit.timeit(lambda: shared, number=n), n)
+
+    with TestClient(bench_app) as client:
+        client.get("/per-request")
+        client.get("/shared")
+        report("HTTP round-trip, per-request services",
+               timeit.timeit(lambda: client.get("/per-request"), number=http_n), http_n)
+        report("HTTP round-trip, shared via Depends",
+               timeit.timeit(lambda: client.get("/shared"), number=http_n), http_n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+In-memory stand-ins for external clients, used by the benchmark scripts
+
+FakeSupabase implements the subset of the postgrest query builder used by
+the services (select/insert/update/delete with eq/neq/in_/order/limit/single).
+FakeSendGrid replaces sendgrid.SendGridAPIClient (see install_fake_sendgrid).
+SMTPSink is a local SMTP server that accepts and counts messages.
+"""
+import asyncio
+import base64
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def bench_env() -> None:
+    """Provide dummy settings so app.config can be imported without a .env"""
+    os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+    os.environ.setdefault('SUPABASE_KEY', 'bench.bench.bench')
+    os.environ.setdefault('EMAIL_PASSWORD', 'bench')
+    os.environ.setdefault('EMAIL_FROM', 'bench@example.com')
+    os.environ.setdefault('SECRET_KEY', 'bench')
+
+
+class FakeResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, db: 'FakeSupabase', table: str):
+        self._db = db
+        self._table = table
+        self._op = 'select'
+        self._columns = '*'
+        self._count = None
+        self._payload = None
+        self._filters = []
+        self._order = None
+        self._limit = None
+        self._offset = 0
+        self._single = False
+
+    # -- operations --
+    def select(self, columns: str = '*', count: Optional[str] = None):
+        self._columns = columns
+        self._count = count
+        return self
+
+    def insert(self, data, **kwargs):
+        self._op = 'insert'
+        self._payload = data
+        return self
+
+    def upsert(self, data, on_conflict: str = '', ignore_duplicates: bool = False, **kwargs):
+        self._op = 'upsert'
+        self._payload = data
+        self._conflict = [c.strip() for c in on_conflict.split(',') if c.strip()]
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data: Dict):
+        self._op = 'update'
+        self._payload = data
+        return self
+
+    def delete(self, count: Optional[str] = None, **kwargs):
+        self._op = 'delete'
+        self._count = count
+        return self
+
+    # -- filters --
+    def eq(self, column: str, value):
+        self._filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def neq(self, column: str, value):
+        self._filters.append(lambda r: r.get(column) != value)
+        return self
+
+    def in_(self, column: str, values):
+        values = set(values)
+        self._filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def gt(self, column: str, value):
+        self._filters.append(lambda r: r.get(column) is not None and r.get(column) > value)
+        return self
+
+    def gte(self, column: str, value):
+        self._filters.append(lambda r: r.get(column) is not None and r.get(column) >= value)
+        return self
+
+    def lt(self, column: str, value):
+        self._filters.append(lambda r: r.get(column) is not None and r.get(column) < value)
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    # -- execution --
+    def _matches(self) -> List[Dict]:
+        rows = self._db.tables.setdefault(self._table, [])
+        return [r for r in rows if all(f(r) for f in self._filters)]
+
+    def _project(self, row: Dict) -> Dict:
+        out = dict(row)
+        if 'events(*)' in self._columns and 'event_id' in row:
+            events = self._db.tables.get('events', [])
+            out['events'] = next((e for e in events if e['id'] == row['event_id']), None)
+        return out
+
+    def execute(self) -> FakeResponse:
+        self._db.calls += 1
+        if self._op == 'insert':
+            rows = self._payload if isinstance(self._payload, list) else [self._payload]
+            created = [self._db.add(self._table, r) for r in rows]
+            return FakeResponse(created)
+
+        if self._op == 'upsert':
+            rows = self._payload if isinstance(self._payload, list) else [self._payload]
+            table = self._db.tables.setdefault(self._table, [])
+            written = []
+            for row in rows:
+                key = tuple(row.get(c) for c in self._conflict)
+                existing = next((r for r in table if tuple(r.get(c) for c in self._conflict) == key), None)
+                if existing is None:
+                    written.append(self._db.add(self._table, row))
+                elif not self._ignore_duplicates:
+                    existing.update(row)
+                    written.append(dict(existing))
+            return FakeResponse(written)
+
+        matches = self._matches()
+        if self._op == 'update':
+            for row in matches:
+                row.update(self._payload)
+            return FakeResponse([dict(r) for r in matches])
+        if self._op == 'delete':
+            table = self._db.tables[self._table]
+            self._db.tables[self._table] = [r for r in table if r not in matches]
+            return FakeResponse(matches, len(matches) if self._count else None)
+
+        if self._order:
+            column, desc = self._order
+            matches = sorted(matches, key=lambda r: r.get(column) or '', reverse=desc)
+        count = len(matches) if self._count else None
+        if self._offset:
+            matches = matches[self._offset:]
+        if self._limit is not None:
+            matches = matches[:self._limit]
+        data = [self._project(r) for r in matches]
+        if self._single:
+            return FakeResponse(data[0] if data else None, count)
+        return FakeResponse(data, count)
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.tables: Dict[str, List[Dict]] = {}
+        self.calls = 0
+        self._ids: Dict[str, int] = {}
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def add(self, table: str, row: Dict) -> Dict:
+        """Insert a row directly, filling id and timestamp columns"""
+        self._ids[table] = self._ids.get(table, 0) + 1
+        stored = {'id': self._ids[table], **row}
+        now = datetime.utcnow().isoformat()
+        if table == 'check_ins':
+            stored.setdefault('checked_in_at', now)
+        elif table == 'hackathon_participants':
+            stored.setdefault('imported_at', now)
+        else:
+            stored.setdefault('created_at', now)
+        self.tables.setdefault(table, []).append(stored)
+        return dict(stored)
+
+
+def seed_event(db: FakeSupabase, registrations: int = 100, participants: int = 100) -> int:
+    """Create one event with registrations and hackathon participants; returns event id"""
+    event = db.add('events', {
+        'name': 'Bench Event',
+        'description': None,
+        'event_type': 'hackathon_day',
+        'event_date': datetime(2026, 1, 1, 10, 0).isoformat(),
+        'capacity': registrations + participants + 10,
+        'registration_open': True,
+    })
+    for i in range(registrations):
+        db.add('registrations', {
+            'event_id': event['id'],
+            'name': f'Registrant {i}',
+            'email': f'reg{i}@example.com',
+            'phone': '+919876543210',
+            'college': 'Bench College',
+            'ticket_id': f"EVT{event['id']:04d}-REG{i + 1:06d}-BENCH0",
+            'qr_code_url': None,
+            'checked_in': False,
+            'checked_in_at': None,
+        })
+    for i in range(participants):
+        db.add('hackathon_participants', {
+            'name': f'Hacker {i}',
+            'email': f'hacker{i}@example.com',
+            'college': 'Bench College',
+            'phone': None,
+        })
+    return event['id']
+
+
+class FakeSendGridResponse:
+    status_code = 202
+    body = b''
+    headers: Dict[str, str] = {}
+
+
+class FakeSendGrid:
+    """
+    Stand-in for sendgrid.SendGridAPIClient that serialises the message
+    (as the real client does before posting) and records it instead of
+    sending
+    """
+    sent = 0
+    last: Optional[Dict] = None
+
+    def __init__(self, api_key: Optional[str] = None, **kwargs):
+        self.api_key = api_key
+
+    def send(self, message) -> FakeSendGridResponse:
+        FakeSendGrid.last = message.get()
+        FakeSendGrid.sent += 1
+        return FakeSendGridResponse()
+
+
+def install_fake_sendgrid() -> None:
+    """Make `from sendgrid import SendGridAPIClient` return FakeSendGrid"""
+    import sendgrid
+    sendgrid.SendGridAPIClient = FakeSendGrid
+
+
+class SMTPSink:
+    """
+    Local SMTP server that accepts and counts messages without delivering
+    them, like aiosmtpd with its Sink handler
+
+    Speaks enough ESMTP for aiosmtplib: EHLO/HELO, AUTH PLAIN/LOGIN (when
+    credentials are set), MAIL, RCPT, DATA, RSET, NOOP and QUIT.
+
+    Args:
+        latency: Seconds to wait before every reply, to model a remote
+            server's round trip
+        refuse: Recipient addresses answered with 550
+        drop_after: Close each connection after this many messages, like
+            servers that limit messages per connection
+    """
+
+    def __init__(
+        self,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        latency: float = 0.0,
+        credentials: Optional[Tuple[str, str]] = None,
+        refuse: Tuple[str, ...] = (),
+        drop_after: Optional[int] = None
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.credentials = credentials
+        self.refuse = {address.lower() for address in refuse}
+        self.drop_after = drop_after
+        self.connections = 0
+        self.messages = 0
+        self.recipients: List[str] = []
+        self.last: Optional[bytes] = None
+        self._server = None
+
+    async def start(self) -> 'SMTPSink':
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _reply(self, writer, *lines: str) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(''.join(f"{line}\r\n" for line in lines).encode())
+        await writer.drain()
+
+    async def _handle(self, reader, writer) -> None:
+        self.connections += 1
+        sent_here = 0
+        authenticated = self.credentials is None
+        try:
+            await self._reply(writer, '220 sink ESMTP ready')
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors='replace').strip()
+                verb, _, arg = command.partition(' ')
+                verb = verb.upper()
+
+                if verb == 'EHLO':
+                    extensions = ['250-sink', '250-8BITMIME', '250-SIZE 52428800']
+                    if self.credentials:
+                        extensions.append('250-AUTH PLAIN LOGIN')
+                    await self._reply(writer, *extensions, '250 SMTPUTF8')
+                elif verb == 'HELO':
+                    await self._reply(writer, '250 sink')
+                elif verb == 'AUTH':
+                    authenticated = await self._auth(reader, writer, arg)
+                elif verb == 'MAIL':
+                    if authenticated:
+                        await self._reply(writer, '250 OK')
+                    else:
+                        await self._reply(writer, '530 Authentication required')
+                elif verb == 'RCPT':
+                    address = arg.partition(':')[2].strip().strip('<>').lower()
+                    if address in self.refuse:
+                        await self._reply(writer, '550 No such user')
+                    else:
+                        self.recipients.append(address)
+                        await self._reply(writer, '250 OK')
+                elif verb == 'DATA':
+                    await self._reply(writer, '354 End data with <CR><LF>.<CR><LF>')
+                    chunks = []
+                    while True:
+                        chunk = await reader.readline()
+                        if not chunk or chunk == b'.\r\n':
+                            break
+                        chunks.append(chunk)
+                    self.last = b''.join(chunks)
+                    self.messages += 1
+                    sent_here += 1
+                    await self._reply(writer, '250 OK queued')
+                    if self.drop_after and sent_here >= self.drop_after:
+                        break
+                elif verb in ('RSET', 'NOOP'):
+                    await self._reply(writer, '250 OK')
+                elif verb == 'QUIT':
+                    await self._reply(writer, '221 Bye')
+                    break
+                else:
+                    await self._reply(writer, '502 Command not implemented')
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _auth(self, reader, writer, arg: str) -> bool:
+        mechanism, _, initial = arg.partition(' ')
+        mechanism = mechanism.upper()
+        if mechanism == 'PLAIN':
+            if not initial:
+                await self._reply(writer, '334 ')
+                initial = (await reader.readline()).decode().strip()
+            _, username, password = base64.b64decode(initial).decode().split('\0')
+        elif mechanism == 'LOGIN':
+            await self._reply(writer, '334 VXNlcm5hbWU6')
+            username = base64.b64decode((await reader.readline()).strip()).decode()
+            await self._reply(writer, '334 UGFzc3dvcmQ6')
+            password = base64.b64decode((await reader.readline()).strip()).decode()
+        else:
+            await self._reply(writer, '504 Unrecognized authentication type')
+            return False
+        if (username, password) == self.credentials:
+            await self._reply(writer, '235 Authentication successful')
+            return True
+        await self._reply(writer, '535 Authentication failed')
+        return False
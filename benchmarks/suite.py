@@ -0,0 +1,378 @@
+"""
+Micro-benchmark suite for the hot paths, with stored baselines
+
+Covers QR/ticket-id generation, CSV import, the ticket email build (with
+SendGrid replaced by FakeSendGrid), printed badge rendering and the
+CheckInService decision paths (against FakeSupabase), so the numbers
+reflect this project's code plus the fakes' constant overhead, not the
+network.
+
+Each benchmark runs `repeat` rounds of `number` calls, with `number`
+calibrated so a round takes at least --min-time seconds. The fastest
+round's per-call time is compared, as it is the least disturbed by other
+load on the machine.
+
+Usage:
+    python -m benchmarks.suite list
+    python -m benchmarks.suite run [-k FILTER] [--save PATH]
+    python -m benchmarks.suite compare [-k FILTER] [--baseline PATH] [--threshold 0.25]
+    python -m benchmarks.suite compare --current results.json
+
+compare exits with status 1 if any benchmark is slower than the baseline
+by more than the threshold (0.25 = 25%). Baselines are machine-specific:
+refresh benchmarks/baselines/baseline.json with `run --save` on the machine
+that runs compare.
+"""
+import argparse
+import asyncio
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.fakes import FakeSupabase, bench_env, install_fake_sendgrid, seed_event
+
+bench_env()
+install_fake_sendgrid()
+
+import app.db  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'baseline.json')
+TICKET_ID = 'EVT0001-REG000001-ABC123'
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    """Register a setup function; it returns the zero-argument callable to time"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _use_db(db: FakeSupabase) -> FakeSupabase:
+    app.db._client = db
+    return db
+
+
+# -- ticket generation --
+
+@benchmark('qr.generate_qr_code')
+def _generate_qr_code():
+    from app.utils.qr_generator import generate_qr_code
+    return lambda: generate_qr_code(TICKET_ID)
+
+
+@benchmark('qr.generate_ticket_id')
+def _generate_ticket_id():
+    from app.utils.qr_generator import generate_ticket_id
+    return lambda: generate_ticket_id(1, 1)
+
+
+# -- CSV import --
+
+def _participants_csv(rows: int) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['name', 'email', 'college', 'phone'])
+    for i in range(rows):
+        writer.writerow([f'Participant {i}', f'participant{i}@college{i % 20}.edu', f'College {i % 20}', '+919876543210'])
+    return buffer.getvalue().encode()
+
+
+@benchmark('csv.parse_csv_200')
+def _parse_csv():
+    from app.services.csv_service import CSVService
+    from app.services.email_validation import EmailValidationEngine
+
+    content = _participants_csv(200)
+    service = CSVService(validation_engine=EmailValidationEngine(offline=True))
+
+    def run():
+        # Fresh table each call so every row is a new import
+        _use_db(FakeSupabase())
+        return service.parse_csv(content)
+    return run
+
+
+# -- ticket email --
+
+@benchmark('email.render_ticket_email')
+def _render_ticket_email():
+    from app.services.email_templates import preload, render_ticket_email
+    preload()
+    return lambda: render_ticket_email(
+        recipient_name='Bench Person',
+        event_name='Bench Event',
+        event_date='2026-01-01 10:00',
+        ticket_id=TICKET_ID,
+        event_id=1
+    )
+
+
+@benchmark('email.send_ticket_email')
+def _send_ticket_email():
+    from app.services.email_service import send_ticket_email
+    from app.services.email_templates import preload
+    from app.utils.qr_generator import generate_qr_code
+
+    preload()
+    qr_code = generate_qr_code(TICKET_ID)
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(send_ticket_email(
+        recipient_email='bench@example.com',
+        recipient_name='Bench Person',
+        event_name='Bench Event',
+        event_date='2026-01-01 10:00',
+        ticket_id=TICKET_ID,
+        qr_code_base64=qr_code,
+        event_id=1
+    ))
+
+
+# -- printed tickets --
+
+@benchmark('tickets.render_badge')
+def _render_badge():
+    from app.utils.ticket_badge import render_badge
+    ticket = {
+        'ticket_id': TICKET_ID,
+        'name': 'Bench Person',
+        'college': 'Bench College',
+        'event_name': 'Bench Event',
+        'event_date': 'January 01, 2026 at 10:00 AM'
+    }
+    return lambda: render_badge(ticket)
+
+
+# -- check-in decisions --
+
+def _checkin_fixture():
+    """CheckInService over a seeded fake: event 1 with 200 tickets and 200 participants, plus event 2"""
+    from app.services.checkin_service import CheckInService
+    from app.services.csv_service import CSVService
+
+    db = _use_db(FakeSupabase())
+    event_id = seed_event(db, registrations=200, participants=200)
+    other_event = seed_event(db, registrations=1, participants=0)
+    service = CheckInService(csv_service=CSVService())
+    registrations = [r for r in db.tables['registrations'] if r['event_id'] == event_id]
+    db.tables.setdefault('check_ins', [])
+    return db, service, event_id, other_event, registrations
+
+
+@benchmark('checkin.qr_success')
+def _checkin_qr_success():
+    db, service, event_id, _, registrations = _checkin_fixture()
+    registration = registrations[100]
+
+    def run():
+        _use_db(db)
+        registration['checked_in'] = False
+        db.tables['check_ins'].clear()
+        return service.check_in_by_qr(registration['ticket_id'], event_id)
+    return run
+
+
+@benchmark('checkin.qr_already_checked_in')
+def _checkin_qr_already():
+    db, service, event_id, _, registrations = _checkin_fixture()
+    registration = registrations[100]
+    service.check_in_by_qr(registration['ticket_id'], event_id)
+
+    def run():
+        _use_db(db)
+        return service.check_in_by_qr(registration['ticket_id'], event_id)
+    return run
+
+
+@benchmark('checkin.qr_wrong_event')
+def _checkin_qr_wrong_event():
+    db, service, _, other_event, registrations = _checkin_fixture()
+    registration = registrations[100]
+
+    def run():
+        _use_db(db)
+        return service.check_in_by_qr(registration['ticket_id'], other_event)
+    return run
+
+
+@benchmark('checkin.qr_not_found')
+def _checkin_qr_not_found():
+    db, service, event_id, _, _ = _checkin_fixture()
+
+    def run():
+        _use_db(db)
+        return service.check_in_by_qr('EVT9999-REG999999-NOPE00', event_id)
+    return run
+
+
+@benchmark('checkin.email_success')
+def _checkin_email_success():
+    db, service, event_id, _, _ = _checkin_fixture()
+
+    def run():
+        _use_db(db)
+        db.tables['check_ins'].clear()
+        return service.check_in_by_email('hacker100@example.com', event_id)
+    return run
+
+
+@benchmark('checkin.email_already_checked_in')
+def _checkin_email_already():
+    db, service, event_id, _, _ = _checkin_fixture()
+    service.check_in_by_email('hacker100@example.com', event_id)
+
+    def run():
+        _use_db(db)
+        return service.check_in_by_email('hacker100@example.com', event_id)
+    return run
+
+
+@benchmark('checkin.email_has_ticket')
+def _checkin_email_has_ticket():
+    db, service, event_id, _, _ = _checkin_fixture()
+
+    def run():
+        _use_db(db)
+        return service.check_in_by_email('reg100@example.com', event_id)
+    return run
+
+
+# -- runner --
+
+def _time(func: Callable[[], object], repeat: int, min_time: float) -> Dict:
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        func()  # warm-up: lazy imports, template compile, caches
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+            number *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+        rounds = [elapsed / number]
+        for _ in range(repeat - 1):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            rounds.append((time.perf_counter() - start) / number)
+
+    return {
+        'min_us': round(min(rounds) * 1e6, 3),
+        'median_us': round(statistics.median(rounds) * 1e6, 3),
+        'number': number,
+        'repeat': repeat
+    }
+
+
+def run_suite(filter_text: Optional[str] = None, repeat: int = 5, min_time: float = 0.1) -> Dict:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if filter_text and filter_text not in name:
+            continue
+        results[name] = _time(setup(), repeat, min_time)
+        print(f"  {name:<34} {results[name]['min_us']:>12.1f} us  (median {results[name]['median_us']:.1f})")
+    return {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'machine': platform.machine()
+        },
+        'benchmarks': results
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """
+    Print a comparison table
+
+    Returns:
+        Names of benchmarks slower than baseline by more than `threshold`
+    """
+    regressions = []
+    base, cur = baseline['benchmarks'], current['benchmarks']
+    print(f"\n  {'benchmark':<34} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name in sorted(set(base) | set(cur)):
+        if name not in cur:
+            print(f"  {name:<34} {base[name]['min_us']:>10.1f}us {'-':>12} {'missing':>9}")
+            continue
+        if name not in base:
+            print(f"  {name:<34} {'-':>12} {cur[name]['min_us']:>10.1f}us {'new':>9}")
+            continue
+        change = cur[name]['min_us'] / base[name]['min_us'] - 1 if base[name]['min_us'] else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  << SLOWER'
+        print(f"  {name:<34} {base[name]['min_us']:>10.1f}us {cur[name]['min_us']:>10.1f}us {change:>+8.1%}{flag}")
+    return regressions
+
+
+def _load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save(results: Dict, path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"\nSaved results to {path}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description='Micro-benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='List benchmark names')
+
+    run_parser = commands.add_parser('run', help='Run benchmarks')
+    compare_parser = commands.add_parser('compare', help='Compare against a stored baseline')
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('-k', dest='filter', help='Only benchmarks whose name contains this text')
+        sub.add_argument('--repeat', type=int, default=5)
+        sub.add_argument('--min-time', type=float, default=0.1, help='Minimum seconds per round')
+    run_parser.add_argument('--save', nargs='?', const=BASELINE_PATH, help=f'Write results as JSON (default path: {BASELINE_PATH})')
+    compare_parser.add_argument('--baseline', default=BASELINE_PATH)
+    compare_parser.add_argument('--current', help='Results JSON to compare instead of running the suite')
+    compare_parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown as a fraction (default 0.25)')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        print('\n'.join(BENCHMARKS))
+        return 0
+
+    if args.command == 'run':
+        results = run_suite(args.filter, args.repeat, args.min_time)
+        if args.save:
+            _save(results, args.save)
+        return 0
+
+    baseline = _load(args.baseline)
+    current = _load(args.current) if args.current else run_suite(args.filter, args.repeat, args.min_time)
+    if args.filter:
+        baseline['benchmarks'] = {k: v for k, v in baseline['benchmarks'].items() if args.filter in k}
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -76,8 +76,116 @@ CREATE TABLE IF NOT EXISTS check_ins (
 );
 
 -- Indexes
-CREATE INDEX idx_checkins_event ON check_ins(event_id);
 CREATE INDEX idx_checkins_email ON check_ins(email);
+-- One check-in per attendee per event (lets the app upsert with ON CONFLICT DO NOTHING)
+CREATE UNIQUE INDEX idx_checkins_unique_event_email ON check_ins(event_id, email);
+-- Per-event stats and recent check-ins
+CREATE INDEX idx_checkins_event_time ON check_ins(event_id, checked_in_at DESC) INCLUDE (source);
+
+-- ================================================
+-- CHECK-IN ROLLUPS (per event, minute and source; kept by trigger)
+-- ================================================
+CREATE TABLE IF NOT EXISTS checkin_rollups (
+    event_id BIGINT NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    minute TIMESTAMPTZ NOT NULL,
+    source VARCHAR(20) NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_id, minute, source)
+);
+
+-- ================================================
+-- ARCHIVED EVENTS (summary of events moved to Parquet cold storage)
+-- ================================================
+CREATE TABLE IF NOT EXISTS archived_events (
+    event_id BIGINT PRIMARY KEY REFERENCES events(id) ON DELETE CASCADE,
+    name VARCHAR(200) NOT NULL,
+    event_type VARCHAR(50) NOT NULL,
+    event_date TIMESTAMPTZ NOT NULL,
+    capacity INTEGER NOT NULL,
+    total_registrations INTEGER NOT NULL,
+    checked_in_registrations INTEGER NOT NULL,
+    csv_checkins INTEGER NOT NULL,
+    total_checkins INTEGER NOT NULL,
+    checkins_by_source JSONB,
+    first_checkin_at TIMESTAMPTZ,
+    last_checkin_at TIMESTAMPTZ,
+    archive_uri TEXT NOT NULL,
+    archived_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- ================================================
+-- IDEMPOTENCY KEYS (stored outcomes for retried POSTs)
+-- ================================================
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(300) PRIMARY KEY,
+    fingerprint VARCHAR(64) NOT NULL,
+    status_code INTEGER NOT NULL,
+    response JSONB,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX idx_idempotency_expires ON idempotency_keys(expires_at);
+
+-- ================================================
+-- CAMPAIGNS (bulk announcement emails to registrants)
+-- ================================================
+CREATE TABLE IF NOT EXISTS campaigns (
+    id BIGSERIAL PRIMARY KEY,
+    event_id BIGINT NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    subject VARCHAR(200) NOT NULL,
+    body TEXT NOT NULL,
+    audience VARCHAR(20) NOT NULL DEFAULT 'all',  -- 'all', 'checked_in', 'not_checked_in'
+    status VARCHAR(20) NOT NULL DEFAULT 'draft',  -- 'draft', 'running', 'pausing', 'paused', 'completed', 'cancelled'
+    total INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    cursor_id BIGINT NOT NULL DEFAULT 0,  -- last registration id sent (keyset position)
+    run_token VARCHAR(64),  -- worker currently sending
+    heartbeat_at TIMESTAMPTZ,  -- refreshed by that worker; stale means it is gone
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_campaigns_event ON campaigns(event_id);
+
+-- ================================================
+-- EMAIL EVENTS (SendGrid event webhook)
+-- ================================================
+CREATE TABLE IF NOT EXISTS email_events (
+    id BIGSERIAL PRIMARY KEY,
+    sg_event_id VARCHAR(100) UNIQUE,  -- webhook retries are ignored
+    sg_message_id VARCHAR(200),
+    email VARCHAR(255) NOT NULL,
+    event VARCHAR(30) NOT NULL,  -- processed, deferred, delivered, bounce, dropped, open, click, spamreport, ...
+    reason TEXT,
+    ticket_id VARCHAR(50),
+    event_id BIGINT,
+    campaign_id BIGINT,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    received_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_events_ticket ON email_events(ticket_id, occurred_at DESC) WHERE ticket_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_email_events_campaign ON email_events(campaign_id, event) WHERE campaign_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_email_events_event_ticket ON email_events(event_id, ticket_id, occurred_at DESC) WHERE ticket_id IS NOT NULL AND campaign_id IS NULL;
+
+-- Latest delivery state of each ticket email
+CREATE OR REPLACE VIEW ticket_delivery_status AS
+SELECT DISTINCT ON (ticket_id)
+    ticket_id,
+    event_id,
+    email,
+    event AS status,
+    reason,
+    occurred_at
+FROM email_events
+WHERE ticket_id IS NOT NULL
+  AND campaign_id IS NULL
+  AND event IN ('processed', 'deferred', 'delivered', 'bounce', 'dropped')
+ORDER BY ticket_id, occurred_at DESC, (event = 'processed') ASC, id DESC;
 
 -- ================================================
 -- AUTOMATIC TIMESTAMP UPDATES
@@ -103,6 +211,144 @@ CREATE TRIGGER update_registrations_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- ================================================
+-- CHECK-IN ROLLUP MAINTENANCE
+-- ================================================
+
+-- Keep checkin_rollups in step with check_ins
+CREATE OR REPLACE FUNCTION rollup_check_in()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO checkin_rollups (event_id, minute, source, count)
+        VALUES (NEW.event_id, date_trunc('minute', COALESCE(NEW.checked_in_at, NOW())), NEW.source, 1)
+        ON CONFLICT (event_id, minute, source)
+        DO UPDATE SET count = checkin_rollups.count + 1;
+        RETURN NEW;
+    END IF;
+
+    -- Archival moves check-ins to cold storage; they still happened
+    IF current_setting('app.archiving', TRUE) = 'on' THEN
+        RETURN OLD;
+    END IF;
+
+    UPDATE checkin_rollups
+    SET count = count - 1
+    WHERE event_id = OLD.event_id
+      AND minute = date_trunc('minute', OLD.checked_in_at)
+      AND source = OLD.source;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER check_ins_rollup
+    AFTER INSERT OR DELETE ON check_ins
+    FOR EACH ROW
+    EXECUTE FUNCTION rollup_check_in();
+
+-- Recompute one event's rollups from check_ins (backfill / repair)
+CREATE OR REPLACE FUNCTION rebuild_checkin_rollups(p_event_id BIGINT)
+RETURNS INTEGER AS $$
+DECLARE
+    rows_written INTEGER;
+BEGIN
+    DELETE FROM checkin_rollups WHERE event_id = p_event_id;
+
+    INSERT INTO checkin_rollups (event_id, minute, source, count)
+    SELECT event_id, date_trunc('minute', checked_in_at), source, COUNT(*)
+    FROM check_ins
+    WHERE event_id = p_event_id
+    GROUP BY event_id, date_trunc('minute', checked_in_at), source;
+
+    GET DIAGNOSTICS rows_written = ROW_COUNT;
+    RETURN rows_written;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- EVENT ARCHIVAL
+-- ================================================
+
+-- Delete archived rows and record the summary in one transaction
+CREATE OR REPLACE FUNCTION archive_event_rows(
+    p_summary JSONB,
+    p_registration_ids BIGINT[],
+    p_check_in_ids BIGINT[]
+)
+RETURNS JSONB AS $$
+DECLARE
+    deleted_check_ins INTEGER;
+    deleted_registrations INTEGER;
+BEGIN
+    PERFORM set_config('app.archiving', 'on', TRUE);
+
+    DELETE FROM check_ins WHERE id = ANY(p_check_in_ids);
+    GET DIAGNOSTICS deleted_check_ins = ROW_COUNT;
+
+    DELETE FROM registrations WHERE id = ANY(p_registration_ids);
+    GET DIAGNOSTICS deleted_registrations = ROW_COUNT;
+
+    INSERT INTO archived_events
+    SELECT * FROM jsonb_populate_record(NULL::archived_events, p_summary);
+
+    PERFORM set_config('app.archiving', 'off', TRUE);
+
+    RETURN jsonb_build_object(
+        'registrations', deleted_registrations,
+        'check_ins', deleted_check_ins
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- EVENT MODE ADMISSIONS
+-- ================================================
+
+-- Mark a write-through batch checked in, one timestamp per registration
+CREATE OR REPLACE FUNCTION admit_registrations(p_admissions JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    rows_updated INTEGER;
+BEGIN
+    UPDATE registrations r
+    SET checked_in = TRUE,
+        checked_in_at = (a->>'checked_in_at')::TIMESTAMPTZ
+    FROM jsonb_array_elements(p_admissions) AS a
+    WHERE r.id = (a->>'registration_id')::BIGINT
+      AND r.checked_in = FALSE;
+
+    GET DIAGNOSTICS rows_updated = ROW_COUNT;
+    RETURN rows_updated;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ================================================
+-- TICKET DELIVERY FAILURES
+-- ================================================
+
+-- One event's tickets whose latest email bounced or was dropped; filters by
+-- event before DISTINCT ON (the view can only filter after it)
+CREATE OR REPLACE FUNCTION ticket_delivery_failures(p_event_id BIGINT)
+RETURNS SETOF ticket_delivery_status AS $$
+    SELECT *
+    FROM (
+        SELECT DISTINCT ON (ticket_id)
+            ticket_id,
+            event_id,
+            email,
+            event AS status,
+            reason,
+            occurred_at
+        FROM email_events
+        WHERE event_id = p_event_id
+          AND ticket_id IS NOT NULL
+          AND campaign_id IS NULL
+          AND event IN ('processed', 'deferred', 'delivered', 'bounce', 'dropped')
+        ORDER BY ticket_id, occurred_at DESC, (event = 'processed') ASC, id DESC
+    ) latest
+    WHERE status IN ('bounce', 'dropped');
+$$ LANGUAGE sql STABLE;
+
 -- ================================================
 -- ROW LEVEL SECURITY (Optional - for added security)
 -- ================================================
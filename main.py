@@ -1,16 +1,52 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
-from app.routes import events, registrations, csv_upload, checkin
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, ORJSONResponse
+from contextlib import asynccontextmanager
+from app.routes import events, registrations, csv_upload, checkin, analytics, archive, search, campaigns, webhooks, tickets, profiling, static_assets
+from app.routes.static_assets import asset_response
+from app.dependencies import init_services, warm_up_until_ready, get_assets
+from app.services.static_assets import AssetPipeline, REVALIDATE_CACHE_CONTROL
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
+from app.services.invalidation_bus import get_invalidation_bus
+from app.services.mail_transport import get_mail_transport
 from app.config import settings
+import asyncio
 import os
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build shared services, then warm connections in the background
+
+    The server starts accepting requests immediately; /ready turns green
+    once the Supabase connection is warm.
+    """
+    init_services(app)
+    bus = get_invalidation_bus()
+    bus.start()
+    app.state.checkin_journal.start()
+    app.state.email_events.start()
+    warm_task = asyncio.create_task(warm_up_until_ready(app))
+    yield
+    warm_task.cancel()
+    await app.state.campaign_service.shutdown()
+    app.state.event_mode.shutdown()
+    app.state.checkin_journal.shutdown()
+    app.state.email_events.shutdown()
+    app.state.ticket_renderer.shutdown()
+    await get_mail_transport().close()
+    bus.stop()
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="Event ticketing system with QR code generation and email delivery",
-    version="2.0.0 - Phase 2"
+    version="2.0.0 - Phase 2",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware (adjust origins as needed)
@@ -22,14 +58,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files directory
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Opt-in request profiling (X-Profile header or /debug/profiling toggle)
+app.add_middleware(ProfilingMiddleware)
+
+# Mark each client's writes so its own dashboard reads skip the replica
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Compress large JSON/HTML responses (zstd or gzip, by Accept-Encoding)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size)
+
+# Static files are served from memory (fingerprinted, precompressed)
+app.include_router(static_assets.router)
 
 # Include routers
 app.include_router(events.router)
 app.include_router(registrations.router)
 app.include_router(csv_upload.router)
 app.include_router(checkin.router)
+app.include_router(analytics.router)
+app.include_router(archive.router)
+app.include_router(search.router)
+app.include_router(campaigns.router)
+app.include_router(webhooks.router)
+app.include_router(tickets.router)
+app.include_router(profiling.router)
 
 
 @app.get("/")
@@ -52,16 +104,52 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until database connections are warm"""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
+
+
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard():
-    """Admin Dashboard"""
-    with open("templates/dashboard.html" , "r",encoding='utf-8') as f:
-        return f.read()
+async def dashboard(request: Request, assets: AssetPipeline = Depends(get_assets)):
+    """Admin Dashboard (cached in memory, asset URLs fingerprinted)"""
+    return asset_response(request, assets.page("dashboard.html"), REVALIDATE_CACHE_CONTROL)
 
 
 
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description=settings.app_name)
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Print a `python -X importtime` summary for importing the app and exit"
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.workers,
+        help="Number of worker processes (default: WORKERS setting)"
+    )
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from app.utils.startup_profiler import print_import_summary
+        print_import_summary("main")
+    elif args.workers > 1:
+        import uvicorn
+        if settings.invalidation_backend == "local":
+            print("⚠️ Running several workers with the 'local' invalidation backend; "
+                  "caches will not be invalidated across workers")
+        # Workers import the app by path, each running its own lifespan
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port)
\ No newline at end of file
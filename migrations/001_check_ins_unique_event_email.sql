@@ -0,0 +1,38 @@
+-- ================================================
+-- MIGRATION 001: DUPLICATE-PROOF CHECK-INS
+-- ================================================
+-- One check-in per (event_id, email), so the app can insert with
+-- ON CONFLICT (event_id, email) DO NOTHING RETURNING * and detect a
+-- duplicate check-in in a single round-trip.
+-- Run once in the Supabase SQL editor on databases created from an
+-- older db_schema.sql.
+
+BEGIN;
+
+-- Remove existing duplicates, keeping the earliest check-in (rows without
+-- a timestamp last, so NULLs never escape the comparison)
+DELETE FROM check_ins
+WHERE id IN (
+    SELECT id
+    FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY event_id, email
+            ORDER BY checked_in_at NULLS LAST, id
+        ) AS position
+        FROM check_ins
+    ) ranked
+    WHERE position > 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_checkins_unique_event_email
+    ON check_ins(event_id, email);
+
+-- Per-event stats and recent check-ins: index-only scans ordered by time
+CREATE INDEX IF NOT EXISTS idx_checkins_event_time
+    ON check_ins(event_id, checked_in_at DESC) INCLUDE (source);
+
+-- Covered by the composite indexes above (idx_checkins_email stays: it
+-- serves lookups by email across events)
+DROP INDEX IF EXISTS idx_checkins_event;
+
+COMMIT;
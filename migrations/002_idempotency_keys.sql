@@ -0,0 +1,17 @@
+-- ================================================
+-- MIGRATION 002: IDEMPOTENCY KEYS
+-- ================================================
+-- Stored outcomes for retried POST /registrations/ and POST /checkin/qr
+-- when IDEMPOTENCY_BACKEND=database. Rows expire after IDEMPOTENCY_TTL
+-- seconds and are purged by the app.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(300) PRIMARY KEY,
+    fingerprint VARCHAR(64) NOT NULL,
+    status_code INTEGER NOT NULL,
+    response JSONB,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys(expires_at);
@@ -0,0 +1,63 @@
+-- ================================================
+-- MIGRATION 003: PER-MINUTE CHECK-IN ROLLUPS
+-- ================================================
+-- checkin_rollups holds one row per (event, minute, source) with the
+-- number of check-ins in that minute. A trigger keeps it current on every
+-- insert/delete in check_ins, so analytics never scan check_ins.
+-- rebuild_checkin_rollups(event_id) recomputes an event's rollups from
+-- check_ins (backfill after this migration, or repair).
+
+CREATE TABLE IF NOT EXISTS checkin_rollups (
+    event_id BIGINT NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    minute TIMESTAMPTZ NOT NULL,
+    source VARCHAR(20) NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_id, minute, source)
+);
+
+CREATE OR REPLACE FUNCTION rollup_check_in()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO checkin_rollups (event_id, minute, source, count)
+        VALUES (NEW.event_id, date_trunc('minute', COALESCE(NEW.checked_in_at, NOW())), NEW.source, 1)
+        ON CONFLICT (event_id, minute, source)
+        DO UPDATE SET count = checkin_rollups.count + 1;
+        RETURN NEW;
+    END IF;
+
+    UPDATE checkin_rollups
+    SET count = count - 1
+    WHERE event_id = OLD.event_id
+      AND minute = date_trunc('minute', OLD.checked_in_at)
+      AND source = OLD.source;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS check_ins_rollup ON check_ins;
+CREATE TRIGGER check_ins_rollup
+    AFTER INSERT OR DELETE ON check_ins
+    FOR EACH ROW
+    EXECUTE FUNCTION rollup_check_in();
+
+CREATE OR REPLACE FUNCTION rebuild_checkin_rollups(p_event_id BIGINT)
+RETURNS INTEGER AS $$
+DECLARE
+    rows_written INTEGER;
+BEGIN
+    DELETE FROM checkin_rollups WHERE event_id = p_event_id;
+
+    INSERT INTO checkin_rollups (event_id, minute, source, count)
+    SELECT event_id, date_trunc('minute', checked_in_at), source, COUNT(*)
+    FROM check_ins
+    WHERE event_id = p_event_id
+    GROUP BY event_id, date_trunc('minute', checked_in_at), source;
+
+    GET DIAGNOSTICS rows_written = ROW_COUNT;
+    RETURN rows_written;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Backfill existing events
+SELECT rebuild_checkin_rollups(id) FROM events;
@@ -0,0 +1,23 @@
+-- ================================================
+-- MIGRATION 004: ARCHIVED EVENT SUMMARIES
+-- ================================================
+-- One row per event whose registrations and check-ins were moved to
+-- Parquet cold storage (see app/services/archive_service.py). The events
+-- row itself is kept.
+
+CREATE TABLE IF NOT EXISTS archived_events (
+    event_id BIGINT PRIMARY KEY REFERENCES events(id) ON DELETE CASCADE,
+    name VARCHAR(200) NOT NULL,
+    event_type VARCHAR(50) NOT NULL,
+    event_date TIMESTAMPTZ NOT NULL,
+    capacity INTEGER NOT NULL,
+    total_registrations INTEGER NOT NULL,
+    checked_in_registrations INTEGER NOT NULL,
+    csv_checkins INTEGER NOT NULL,
+    total_checkins INTEGER NOT NULL,
+    checkins_by_source JSONB,
+    first_checkin_at TIMESTAMPTZ,
+    last_checkin_at TIMESTAMPTZ,
+    archive_uri TEXT NOT NULL,
+    archived_at TIMESTAMPTZ DEFAULT NOW()
+);
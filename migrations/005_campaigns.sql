@@ -0,0 +1,28 @@
+-- ================================================
+-- MIGRATION 005: ANNOUNCEMENT CAMPAIGNS
+-- ================================================
+-- One row per bulk email campaign to an event's registrants. cursor_id is
+-- the last registration id sent (keyset position), so a paused or
+-- interrupted campaign resumes where it stopped. run_token identifies the
+-- worker currently sending; progress updates that no longer match it stop
+-- that worker.
+
+CREATE TABLE IF NOT EXISTS campaigns (
+    id BIGSERIAL PRIMARY KEY,
+    event_id BIGINT NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    subject VARCHAR(200) NOT NULL,
+    body TEXT NOT NULL,
+    audience VARCHAR(20) NOT NULL DEFAULT 'all',  -- 'all', 'checked_in', 'not_checked_in'
+    status VARCHAR(20) NOT NULL DEFAULT 'draft',  -- 'draft', 'running', 'pausing', 'paused', 'completed', 'cancelled'
+    total INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    cursor_id BIGINT NOT NULL DEFAULT 0,
+    run_token VARCHAR(64),
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    completed_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_campaigns_event ON campaigns(event_id);
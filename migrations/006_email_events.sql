@@ -0,0 +1,41 @@
+-- ================================================
+-- MIGRATION 006: SENDGRID DELIVERY EVENTS
+-- ================================================
+-- email_events stores every event SendGrid posts to /webhooks/sendgrid.
+-- Outgoing mail carries ticket_id / event_id / campaign_id custom args,
+-- which come back on each event. sg_event_id is unique so webhook
+-- retries are ignored (ON CONFLICT DO NOTHING).
+-- ticket_delivery_status gives the latest delivery state of each ticket
+-- email (campaign mail excluded).
+
+CREATE TABLE IF NOT EXISTS email_events (
+    id BIGSERIAL PRIMARY KEY,
+    sg_event_id VARCHAR(100) UNIQUE,
+    sg_message_id VARCHAR(200),
+    email VARCHAR(255) NOT NULL,
+    event VARCHAR(30) NOT NULL,  -- processed, deferred, delivered, bounce, dropped, open, click, spamreport, ...
+    reason TEXT,
+    ticket_id VARCHAR(50),
+    event_id BIGINT,
+    campaign_id BIGINT,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    received_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_events_ticket ON email_events(ticket_id, occurred_at DESC) WHERE ticket_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_email_events_campaign ON email_events(campaign_id, event) WHERE campaign_id IS NOT NULL;
+
+CREATE OR REPLACE VIEW ticket_delivery_status AS
+SELECT DISTINCT ON (ticket_id)
+    ticket_id,
+    event_id,
+    email,
+    event AS status,
+    reason,
+    occurred_at
+FROM email_events
+WHERE ticket_id IS NOT NULL
+  AND campaign_id IS NULL
+  AND event IN ('processed', 'deferred', 'delivered', 'bounce', 'dropped')
+-- 'processed' precedes the outcome when both land in the same second
+ORDER BY ticket_id, occurred_at DESC, (event = 'processed') ASC, id DESC;
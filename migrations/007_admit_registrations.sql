@@ -0,0 +1,25 @@
+-- ================================================
+-- MIGRATION 007: BATCHED EVENT MODE ADMISSIONS
+-- ================================================
+-- admit_registrations(admissions) marks a whole write-through batch of
+-- event mode admissions as checked in with one statement, each with its
+-- own timestamp. Registrations already checked in elsewhere keep theirs.
+--
+-- admissions: JSON array of {"registration_id": ..., "checked_in_at": ...}
+
+CREATE OR REPLACE FUNCTION admit_registrations(p_admissions JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    rows_updated INTEGER;
+BEGIN
+    UPDATE registrations r
+    SET checked_in = TRUE,
+        checked_in_at = (a->>'checked_in_at')::TIMESTAMPTZ
+    FROM jsonb_array_elements(p_admissions) AS a
+    WHERE r.id = (a->>'registration_id')::BIGINT
+      AND r.checked_in = FALSE;
+
+    GET DIAGNOSTICS rows_updated = ROW_COUNT;
+    RETURN rows_updated;
+END;
+$$ LANGUAGE plpgsql;
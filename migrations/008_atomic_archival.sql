@@ -0,0 +1,67 @@
+-- ================================================
+-- MIGRATION 008: ATOMIC EVENT ARCHIVAL
+-- ================================================
+-- archive_event_rows(summary, registration_ids, check_in_ids) finishes an
+-- archival in one transaction: it deletes exactly the rows that were
+-- written to Parquet and then inserts the archived_events summary. A
+-- failure leaves the hot tables and the summary untouched, so the
+-- archival can simply be re-run.
+--
+-- Rows are deleted with app.archiving set for the transaction, and the
+-- rollup trigger skips its decrement then, so archived events keep their
+-- check-in timeline in checkin_rollups.
+
+CREATE OR REPLACE FUNCTION rollup_check_in()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO checkin_rollups (event_id, minute, source, count)
+        VALUES (NEW.event_id, date_trunc('minute', COALESCE(NEW.checked_in_at, NOW())), NEW.source, 1)
+        ON CONFLICT (event_id, minute, source)
+        DO UPDATE SET count = checkin_rollups.count + 1;
+        RETURN NEW;
+    END IF;
+
+    -- Archival moves check-ins to cold storage; they still happened
+    IF current_setting('app.archiving', TRUE) = 'on' THEN
+        RETURN OLD;
+    END IF;
+
+    UPDATE checkin_rollups
+    SET count = count - 1
+    WHERE event_id = OLD.event_id
+      AND minute = date_trunc('minute', OLD.checked_in_at)
+      AND source = OLD.source;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION archive_event_rows(
+    p_summary JSONB,
+    p_registration_ids BIGINT[],
+    p_check_in_ids BIGINT[]
+)
+RETURNS JSONB AS $$
+DECLARE
+    deleted_check_ins INTEGER;
+    deleted_registrations INTEGER;
+BEGIN
+    PERFORM set_config('app.archiving', 'on', TRUE);
+
+    DELETE FROM check_ins WHERE id = ANY(p_check_in_ids);
+    GET DIAGNOSTICS deleted_check_ins = ROW_COUNT;
+
+    DELETE FROM registrations WHERE id = ANY(p_registration_ids);
+    GET DIAGNOSTICS deleted_registrations = ROW_COUNT;
+
+    INSERT INTO archived_events
+    SELECT * FROM jsonb_populate_record(NULL::archived_events, p_summary);
+
+    PERFORM set_config('app.archiving', 'off', TRUE);
+
+    RETURN jsonb_build_object(
+        'registrations', deleted_registrations,
+        'check_ins', deleted_check_ins
+    );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,33 @@
+-- ================================================
+-- MIGRATION 009: PER-EVENT DELIVERY FAILURES
+-- ================================================
+-- A filter on ticket_delivery_status.event_id is applied after the view's
+-- DISTINCT ON (ticket_id), so every query sorted the whole email_events
+-- table. ticket_delivery_failures(event_id) picks the event's ticket
+-- email events first (index below) and only then takes each ticket's
+-- latest state, returning those that bounced or were dropped.
+
+CREATE INDEX IF NOT EXISTS idx_email_events_event_ticket
+    ON email_events(event_id, ticket_id, occurred_at DESC)
+    WHERE ticket_id IS NOT NULL AND campaign_id IS NULL;
+
+CREATE OR REPLACE FUNCTION ticket_delivery_failures(p_event_id BIGINT)
+RETURNS SETOF ticket_delivery_status AS $$
+    SELECT *
+    FROM (
+        SELECT DISTINCT ON (ticket_id)
+            ticket_id,
+            event_id,
+            email,
+            event AS status,
+            reason,
+            occurred_at
+        FROM email_events
+        WHERE event_id = p_event_id
+          AND ticket_id IS NOT NULL
+          AND campaign_id IS NULL
+          AND event IN ('processed', 'deferred', 'delivered', 'bounce', 'dropped')
+        ORDER BY ticket_id, occurred_at DESC, (event = 'processed') ASC, id DESC
+    ) latest
+    WHERE status IN ('bounce', 'dropped');
+$$ LANGUAGE sql STABLE;
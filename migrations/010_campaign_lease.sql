@@ -0,0 +1,10 @@
+-- ================================================
+-- MIGRATION 010: CAMPAIGN RUN LEASE
+-- ================================================
+-- The worker sending a campaign refreshes heartbeat_at while it runs.
+-- When a 'running' or 'pausing' campaign's heartbeat is older than
+-- settings.campaign_lease_timeout, its worker is gone (killed or crashed)
+-- and start() may take the campaign over: it is moved to 'paused' and
+-- resumed from cursor_id.
+
+ALTER TABLE campaigns ADD COLUMN IF NOT EXISTS heartbeat_at TIMESTAMPTZ;